@@ -0,0 +1,289 @@
+import asyncio
+import os
+import random
+import sys
+import threading
+import time
+import weakref
+
+import httpx
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common_functions.utils.logging_config import logger
+
+# Status codes that are retried with jittered exponential backoff (idempotent methods, except the ones below)
+RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+# Rejected before processing, so every method is retried: 429, and 503 when it carries Retry-After
+RATE_LIMIT_STATUS_CODE = 429
+
+# Methods that are safe to send again after the server may have processed them
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+# Errors raised before the request was sent, so every method can be retried
+CONNECT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+class api_client_manager:
+    """
+    Pooled HTTP clients for the API calls of a test run.
+
+    One client is kept per (environment, base URL), so keep-alive and TLS
+    connections are reused across test cases. Default headers are computed once
+    per client from the test_run_config of the environment.
+    """
+
+    # Dictionaries to store active clients, keyed by (environment, base_url);
+    # async clients are bound to an event loop, so they are kept per loop
+    clients = {}
+    async_clients = weakref.WeakKeyDictionary()
+    _lock = threading.Lock()
+
+    # Client settings, change them with configure() before the first request
+    settings = {
+        "http2": False,
+        "max_connections": 100,
+        "max_keepalive_connections": 20,
+        "keepalive_expiry": 30.0,
+        "timeout": 30.0,
+        "connect_timeout": 10.0,
+        "max_retries": 3,
+        "backoff_base": 0.5,
+        "backoff_max": 10.0,
+        "auth_header_name": "Authorization",
+        "auth_header_template": "Bearer {access_token}",
+    }
+
+    @classmethod
+    def configure(cls, **settings):
+        """
+        Update client settings (pool sizes, HTTP/2, timeouts, retries, auth header).
+
+        HTTP/2 needs the optional ``h2`` package (``pip install httpx[http2]``).
+        Settings apply to clients created afterwards.
+        """
+        unknown = set(settings) - set(cls.settings)
+        if unknown:
+            raise ValueError(f"Unknown api client settings: {sorted(unknown)}")
+        cls.settings.update(settings)
+
+    @classmethod
+    def build_default_headers(cls, test_run_config):
+        """
+        Build the default headers (user agent, referer and access token) for an environment.
+        """
+        headers = {}
+        if test_run_config.get("global_api_user_agent"):
+            headers["User-Agent"] = test_run_config["global_api_user_agent"]
+        if test_run_config.get("referer_domain"):
+            headers["Referer"] = test_run_config["referer_domain"]
+        if test_run_config.get("access_token"):
+            headers[cls.settings["auth_header_name"]] = cls.settings["auth_header_template"].format(
+                access_token=test_run_config["access_token"])
+        return headers
+
+    @classmethod
+    def _client_kwargs(cls, test_run_config, base_url):
+        settings = cls.settings
+        return {
+            "base_url": base_url,
+            "headers": cls.build_default_headers(test_run_config),
+            "http2": settings["http2"],
+            "limits": httpx.Limits(
+                max_connections=settings["max_connections"],
+                max_keepalive_connections=settings["max_keepalive_connections"],
+                keepalive_expiry=settings["keepalive_expiry"],
+            ),
+            "timeout": httpx.Timeout(settings["timeout"], connect=settings["connect_timeout"]),
+        }
+
+    @classmethod
+    def _client_key(cls, test_run_config, base_url_key):
+        base_url = test_run_config.get(base_url_key)
+        if not base_url:
+            raise ValueError(f"'{base_url_key}' is not set for environment '{test_run_config.get('environment')}'")
+        return (test_run_config.get("environment"), base_url)
+
+    @classmethod
+    def get_client(cls, test_run_config, base_url_key="api_base_url"):
+        """
+        Get (or create) the pooled sync client for a base URL of the environment.
+        :param test_run_config: Config returned by test_config.get_var_by_environment
+        :param base_url_key: Config key of the base URL, e.g. "efp_api_base_url"
+        :return: httpx.Client
+        """
+        key = cls._client_key(test_run_config, base_url_key)
+        client = cls.clients.get(key)
+        if client is None:
+            with cls._lock:
+                client = cls.clients.get(key)
+                if client is None:
+                    client = httpx.Client(**cls._client_kwargs(test_run_config, key[1]))
+                    cls.clients[key] = client
+        return client
+
+    @classmethod
+    def get_async_client(cls, test_run_config, base_url_key="api_base_url"):
+        """
+        Get (or create) the pooled async client for a base URL of the environment.
+        Must be called from a running event loop; each loop gets its own client.
+        :return: httpx.AsyncClient
+        """
+        key = cls._client_key(test_run_config, base_url_key)
+        loop = asyncio.get_running_loop()
+        with cls._lock:
+            loop_clients = cls.async_clients.get(loop)
+            if loop_clients is None:
+                loop_clients = cls.async_clients[loop] = {}
+            client = loop_clients.get(key)
+            if client is None:
+                client = loop_clients[key] = httpx.AsyncClient(**cls._client_kwargs(test_run_config, key[1]))
+        return client
+
+    @classmethod
+    def _retry_delay(cls, attempt, response=None):
+        # Honour a numeric Retry-After header, otherwise use full-jitter exponential backoff
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                return min(float(retry_after), cls.settings["backoff_max"])
+        backoff = min(cls.settings["backoff_max"], cls.settings["backoff_base"] * (2 ** attempt))
+        return random.uniform(0, backoff)
+
+    @classmethod
+    def _should_retry(cls, method, attempt, max_retries, response=None, error=None):
+        if attempt >= (cls.settings["max_retries"] if max_retries is None else max_retries):
+            return False
+        if error is not None:
+            # A request that failed after it was sent (e.g. ReadTimeout) may have been processed
+            return isinstance(error, CONNECT_ERRORS) or (
+                isinstance(error, httpx.TransportError) and method.upper() in IDEMPOTENT_METHODS)
+        if response.status_code == RATE_LIMIT_STATUS_CODE or (
+                response.status_code == 503 and "Retry-After" in response.headers):
+            return True
+        return method.upper() in IDEMPOTENT_METHODS and response.status_code in RETRY_STATUS_CODES
+
+    @staticmethod
+    def _record_latency(latency_recorder, test_run_config, api_name, phase, start, test_case_id):
+        if latency_recorder is not None:
+            latency_recorder.record(api_name, test_run_config.get("environment"), phase,
+                                    time.perf_counter_ns() - start, test_case_id)
+
+    @classmethod
+    def request(cls, test_run_config, method, url, base_url_key="api_base_url",
+                latency_recorder=None, api_name=None, test_case_id=None, max_retries=None, **kwargs):
+        """
+        Send a request through the pooled client with retries.
+
+        Connect errors (the request was never sent), 429 responses and 503 responses
+        with Retry-After (rejected without processing) are retried for every method;
+        other 5xx responses and transport errors only for idempotent methods, so a
+        POST that may have been processed is never sent twice.
+        :param method: HTTP method, e.g. "POST"
+        :param url: Path relative to the base URL (or an absolute URL)
+        :param max_retries: Override of the max_retries setting, e.g. 0 to disable retries
+        :param latency_recorder: Optional LatencyRecorder for connect/TLS/TTFB/body/total timings per
+            attempt, plus retry_backoff for the sleeps between attempts
+        :param api_name: api_name the timings are recorded under
+        :param test_case_id: Optional test case the timings belong to
+        :param kwargs: Passed to httpx.Client.request (json, params, headers, ...)
+        :return: httpx.Response of the last attempt
+        """
+        client = cls.get_client(test_run_config, base_url_key)
+        if latency_recorder is not None:
+            kwargs["extensions"] = {**kwargs.get("extensions", {}), "trace": latency_recorder.httpx_trace(
+                api_name, test_run_config.get("environment"), test_case_id)}
+        attempt = 0
+        while True:
+            start = time.perf_counter_ns()
+            try:
+                response = client.request(method, url, **kwargs)
+            except httpx.TransportError as e:
+                if not cls._should_retry(method, attempt, max_retries, error=e):
+                    raise
+                delay = cls._retry_delay(attempt)
+                logger.info(f"{method} {url} failed with {e!r}, retrying in {delay:.2f}s")
+            else:
+                # "total" is the latency of each attempt; backoff sleeps are recorded as "retry_backoff"
+                cls._record_latency(latency_recorder, test_run_config, api_name, "total", start, test_case_id)
+                if not cls._should_retry(method, attempt, max_retries, response=response):
+                    return response
+                delay = cls._retry_delay(attempt, response)
+                logger.info(f"{method} {url} returned {response.status_code}, retrying in {delay:.2f}s")
+                response.close()
+            start = time.perf_counter_ns()
+            time.sleep(delay)
+            cls._record_latency(latency_recorder, test_run_config, api_name, "retry_backoff", start, test_case_id)
+            attempt += 1
+
+    @classmethod
+    async def arequest(cls, test_run_config, method, url, base_url_key="api_base_url",
+                       latency_recorder=None, api_name=None, test_case_id=None, max_retries=None, **kwargs):
+        """
+        Async version of request(), using the pooled async client.
+        :return: httpx.Response of the last attempt
+        """
+        client = cls.get_async_client(test_run_config, base_url_key)
+        if latency_recorder is not None:
+            kwargs["extensions"] = {**kwargs.get("extensions", {}), "trace": latency_recorder.httpx_async_trace(
+                api_name, test_run_config.get("environment"), test_case_id)}
+        attempt = 0
+        while True:
+            start = time.perf_counter_ns()
+            try:
+                response = await client.request(method, url, **kwargs)
+            except httpx.TransportError as e:
+                if not cls._should_retry(method, attempt, max_retries, error=e):
+                    raise
+                delay = cls._retry_delay(attempt)
+                logger.info(f"{method} {url} failed with {e!r}, retrying in {delay:.2f}s")
+            else:
+                # "total" is the latency of each attempt; backoff sleeps are recorded as "retry_backoff"
+                cls._record_latency(latency_recorder, test_run_config, api_name, "total", start, test_case_id)
+                if not cls._should_retry(method, attempt, max_retries, response=response):
+                    return response
+                delay = cls._retry_delay(attempt, response)
+                logger.info(f"{method} {url} returned {response.status_code}, retrying in {delay:.2f}s")
+                await response.aclose()
+            start = time.perf_counter_ns()
+            await asyncio.sleep(delay)
+            cls._record_latency(latency_recorder, test_run_config, api_name, "retry_backoff", start, test_case_id)
+            attempt += 1
+
+    @classmethod
+    def close_all_clients(cls):
+        """
+        Close all active sync clients.
+        """
+        with cls._lock:
+            for key, client in cls.clients.items():
+                client.close()
+                logger.info(f"Closed api client for {key[1]} ({key[0]}).")
+            cls.clients.clear()
+
+    @classmethod
+    async def aclose_all_clients(cls):
+        """
+        Close all active async clients of the running event loop.
+        """
+        with cls._lock:
+            async_clients = list(cls.async_clients.pop(asyncio.get_running_loop(), {}).items())
+        for key, client in async_clients:
+            await client.aclose()
+            logger.info(f"Closed async api client for {key[1]} ({key[0]}).")
+
+
+    ### Usage example: ###
+    # test_run_config = get_var_by_environment("qa")
+    # api_client_manager.configure(http2=True, max_connections=200)
+
+    # # Sync
+    # response = api_client_manager.request(test_run_config, "POST", "/rates", base_url_key="ais_api_base_url", json=payload)
+    # response = api_client_manager.request(test_run_config, "GET", "/rates/1", max_retries=0)  # negative test expecting a 5xx
+
+    # # Async
+    # response = await api_client_manager.arequest(test_run_config, "POST", "/rates", base_url_key="ais_api_base_url", json=payload)
+
+    # api_client_manager.close_all_clients()
+    # await api_client_manager.aclose_all_clients()
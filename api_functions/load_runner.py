@@ -0,0 +1,283 @@
+import asyncio
+import json
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api_functions.api_client import api_client_manager
+from common_functions.file_functions.default_payload import lookup_default_payload
+from common_functions.file_functions.excel_operations import save_dataframe_to_csv
+from common_functions.utils.latency_metrics import LatencyHistogram
+from common_functions.utils.logging_config import logger
+from common_functions.utils.payload_patch import FrozenPayloadDict, patch_payload
+
+
+def select_test_cases(test_cases, api_names=None, test_case_ids=None):
+    """
+    Pick the subset of the Excel suite to replay.
+    :param test_cases: Test case dicts from get_tc_data_from_excel
+    :param api_names: Optional api_name values to keep
+    :param test_case_ids: Optional test_case_id values to keep
+    :return: List of test case dicts
+    """
+    selected = []
+    for test_case in test_cases:
+        tc_meta = test_case["tc_meta"][0]
+        if api_names and tc_meta.get("api_name") not in api_names:
+            continue
+        if test_case_ids and test_case["test_case_id"] not in test_case_ids:
+            continue
+        selected.append(test_case)
+    return selected
+
+
+def build_load_request(test_case, excel_data, environment, sheet_name="default_payload",
+                       payload_column="default_api_payload"):
+    """
+    Build (method, url, payload) for a test case with the regular payload pipeline.
+
+    The default payload comes from the test case meta, or from the default
+    payload sheet row of the environment when it is "nan", and is then patched
+    with tc_modify_data. Sheet templates are parsed once per workbook and
+    patched copy-on-write, so unpatched subtrees are shared between requests.
+    """
+    tc_meta = test_case["tc_meta"][0]
+    payload = tc_meta.get("default_api_payload", "nan")
+    if payload == "nan":
+        default_payload = lookup_default_payload(tc_meta["api_name"], excel_data, sheet_name, environment,
+                                                 deep_copy=False)
+        payload = default_payload[payload_column]
+    copy_on_write = isinstance(payload, FrozenPayloadDict)
+    if isinstance(payload, str):
+        payload = json.loads(payload)
+    payload = patch_payload(test_case["tc_modify_data"][0], payload, copy_on_write=copy_on_write)
+    return tc_meta["api_method"], tc_meta["api_url"], payload
+
+
+def _error_rate(errors, dropped, requests):
+    # Dropped arrivals are requests the service could not take, so they count as errors
+    attempted = requests + dropped
+    return round((errors + dropped) / attempted, 4) if attempted else 0.0
+
+
+class LoadStats:
+    """
+    Throughput, error and latency statistics of a load run, overall and per time window.
+
+    Latency is measured from the scheduled start of each request, so in the
+    open model a saturated service shows up as growing latency instead of
+    being hidden by a slower send rate (coordinated omission). Arrivals dropped
+    at the in-flight limit count as errors in the error rates.
+    """
+
+    def __init__(self, window_s=1.0):
+        self.window_s = window_s
+        self.start = None
+        self.end = None
+        self.overall = LatencyHistogram()
+        self.requests = 0
+        self.errors = 0
+        self.dropped = 0
+        self.windows = {}
+
+    def _window(self, scheduled_at):
+        window_index = int((scheduled_at - self.start) // self.window_s)
+        window = self.windows.get(window_index)
+        if window is None:
+            window = self.windows[window_index] = {"requests": 0, "errors": 0, "dropped": 0,
+                                                   "histogram": LatencyHistogram()}
+        return window
+
+    def record(self, scheduled_at, finished_at, is_error):
+        """Record one completed request, bucketed by its scheduled start time."""
+        window = self._window(scheduled_at)
+        latency_ns = int((finished_at - scheduled_at) * 1e9)
+        window["requests"] += 1
+        window["histogram"].record(latency_ns)
+        self.requests += 1
+        self.overall.record(latency_ns)
+        if is_error:
+            window["errors"] += 1
+            self.errors += 1
+
+    def record_dropped(self, scheduled_at):
+        """Record an arrival that was not sent because max_in_flight requests were open."""
+        self._window(scheduled_at)["dropped"] += 1
+        self.dropped += 1
+
+    def report(self):
+        """Return the overall summary and the per-window timeline."""
+        elapsed = max((self.end or time.perf_counter()) - self.start, 1e-9)
+        summary = {
+            "requests": self.requests,
+            "errors": self.errors,
+            "dropped": self.dropped,
+            "duration_s": round(elapsed, 3),
+            "throughput_rps": round(self.requests / elapsed, 2),
+            "error_rate": _error_rate(self.errors, self.dropped, self.requests),
+            **self.overall.summary(),
+        }
+        timeline = []
+        for index in sorted(self.windows):
+            window = self.windows[index]
+            timeline.append({
+                "window_start_s": round(index * self.window_s, 3),
+                "throughput_rps": round(window["requests"] / self.window_s, 2),
+                "dropped": window["dropped"],
+                "error_rate": _error_rate(window["errors"], window["dropped"], window["requests"]),
+                **window["histogram"].summary(),
+            })
+        return {"summary": summary, "timeline": timeline}
+
+
+async def _send(test_run_config, base_url_key, load_request, expected_status_codes):
+    method, url, payload = load_request
+    try:
+        # No retries: a retried failure would count as a success and its backoff as latency
+        response = await api_client_manager.arequest(test_run_config, method, url, base_url_key=base_url_key,
+                                                     max_retries=0, json=payload)
+        return response.status_code not in expected_status_codes
+    except Exception as e:
+        logger.info(f"Load request {method} {url} failed: {e}")
+        return True
+
+
+async def run_open_model(load_requests, test_run_config, rps, duration_s, base_url_key="api_base_url",
+                         max_in_flight=1000, expected_status_codes=(200,), window_s=1.0):
+    """
+    Replay requests at a constant arrival rate, independent of response times.
+    :param load_requests: List of (method, url, payload) tuples, replayed round-robin
+    :param rps: Target arrival rate (requests per second)
+    :param duration_s: Length of the run in seconds
+    :param max_in_flight: Arrivals beyond this many open requests are dropped and counted as errors
+    :return: LoadStats
+    """
+    stats = LoadStats(window_s)
+    in_flight = set()
+    interval = 1.0 / rps
+    total_requests = int(rps * duration_s)
+    stats.start = time.perf_counter()
+
+    async def fire(load_request, scheduled_at):
+        is_error = await _send(test_run_config, base_url_key, load_request, expected_status_codes)
+        stats.record(scheduled_at, time.perf_counter(), is_error)
+
+    for i in range(total_requests):
+        scheduled_at = stats.start + i * interval
+        delay = scheduled_at - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if len(in_flight) >= max_in_flight:
+            stats.record_dropped(scheduled_at)
+            continue
+        task = asyncio.ensure_future(fire(load_requests[i % len(load_requests)], scheduled_at))
+        in_flight.add(task)
+        task.add_done_callback(in_flight.discard)
+
+    if in_flight:
+        await asyncio.gather(*in_flight)
+    stats.end = time.perf_counter()
+    return stats
+
+
+async def run_closed_model(load_requests, test_run_config, vus, duration_s, base_url_key="api_base_url",
+                           think_time_s=0.0, expected_status_codes=(200,), window_s=1.0):
+    """
+    Replay requests with a fixed number of virtual users, each sending its next
+    request as soon as the previous one completes (plus optional think time).
+    :param load_requests: List of (method, url, payload) tuples, replayed round-robin
+    :param vus: Number of concurrent virtual users
+    :param duration_s: Length of the run in seconds
+    :return: LoadStats
+    """
+    stats = LoadStats(window_s)
+    stats.start = time.perf_counter()
+    deadline = stats.start + duration_s
+
+    async def virtual_user(vu_index):
+        i = vu_index
+        while time.perf_counter() < deadline:
+            scheduled_at = time.perf_counter()
+            is_error = await _send(test_run_config, base_url_key, load_requests[i % len(load_requests)],
+                                   expected_status_codes)
+            stats.record(scheduled_at, time.perf_counter(), is_error)
+            i += vus
+            if think_time_s:
+                await asyncio.sleep(think_time_s)
+
+    await asyncio.gather(*(virtual_user(vu_index) for vu_index in range(vus)))
+    stats.end = time.perf_counter()
+    return stats
+
+
+def run_load_test(test_cases, excel_data, test_run_config, mode="open", rps=10, vus=10, duration_s=60,
+                  base_url_key="api_base_url", sheet_name="default_payload", window_s=1.0, **kwargs):
+    """
+    Replay a subset of the Excel suite as a throughput benchmark.
+    :param test_cases: Test case dicts to replay (see select_test_cases)
+    :param mode: "open" (constant arrival rate, uses rps) or "closed" (fixed VUs, uses vus)
+    :param kwargs: Passed to run_open_model / run_closed_model
+    :return: Report dict with "summary" and "timeline"
+    """
+    if not test_cases:
+        raise ValueError("No test cases selected for the load run")
+    load_requests = [build_load_request(test_case, excel_data, test_run_config["environment"], sheet_name)
+                     for test_case in test_cases]
+
+    async def run():
+        try:
+            if mode == "open":
+                return await run_open_model(load_requests, test_run_config, rps, duration_s,
+                                            base_url_key=base_url_key, window_s=window_s, **kwargs)
+            elif mode == "closed":
+                return await run_closed_model(load_requests, test_run_config, vus, duration_s,
+                                              base_url_key=base_url_key, window_s=window_s, **kwargs)
+            raise ValueError(f"Invalid load mode '{mode}'. Please use 'open' or 'closed'.")
+        finally:
+            await api_client_manager.aclose_all_clients()
+
+    report = asyncio.run(run()).report()
+    logger.info(f"Load run summary: {report['summary']}")
+    return report
+
+
+def check_load_thresholds(report, max_error_rate=None, max_p99_ms=None, min_throughput_rps=None):
+    """
+    Compare a load report against regression thresholds.
+    :return: List of violation messages (empty when the run passes)
+    """
+    summary = report["summary"]
+    violations = []
+    if max_error_rate is not None and summary["error_rate"] > max_error_rate:
+        violations.append(f"error_rate {summary['error_rate']} > {max_error_rate}")
+    if max_p99_ms is not None and summary.get("p99_ms", 0) > max_p99_ms:
+        violations.append(f"p99_ms {summary['p99_ms']} > {max_p99_ms}")
+    if min_throughput_rps is not None and summary["throughput_rps"] < min_throughput_rps:
+        violations.append(f"throughput_rps {summary['throughput_rps']} < {min_throughput_rps}")
+    return violations
+
+
+def save_load_report(report, csv_path=None, json_path=None):
+    """Save the per-window timeline to CSV and the full report to JSON."""
+    if csv_path:
+        save_dataframe_to_csv(pd.DataFrame(report["timeline"]), csv_path)
+    if json_path:
+        directory = os.path.dirname(json_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(json_path, "w") as f:
+            json.dump(report, f, indent=4)
+        logger.info(f"Load report saved to {json_path}")
+
+
+### Usage example: ###
+# test_run_config = get_var_by_environment("qa")
+# test_cases = select_test_cases(all_test_cases, api_names=["ais_jerry_transform_rates"])
+# report = run_load_test(test_cases, excel_data, test_run_config, mode="open", rps=50, duration_s=300,
+#                        base_url_key="ais_api_base_url")
+# save_load_report(report, "results/load_timeline.csv", "results/load_report.json")
+# assert not check_load_thresholds(report, max_error_rate=0.01, max_p99_ms=800)
@@ -1,79 +1,164 @@
-from fastapi import FastAPI, HTTPException, Depends, Security, Request
+from fastapi import FastAPI, HTTPException, Depends, Security, Request, Query
 from fastapi.security import APIKeyHeader
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
+from contextlib import asynccontextmanager
+from typing import Optional
 import sqlite3
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError
 from dotenv import load_dotenv
+import json
 import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api_functions.mock_db import MockDatabase
+
+# orjson is optional; it (de)serializes streamed and bulk rows several times faster than json
+try:
+    import orjson
+
+    def dumps_json(value):
+        return orjson.dumps(value)
+
+    def loads_json(data):
+        return orjson.loads(data)
+except ImportError:
+    def dumps_json(value):
+        return json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+    def loads_json(data):
+        return json.loads(data)
 
 # Load environment variables
 load_dotenv()
 
 TEST_MOKE_API_KEY = os.getenv("TEST_MOKE_API_KEY")
 
-app = FastAPI(title="Order API with Auth & SQLite")
+# Threads (and pooled SQLite connections) serving DB work for the async handlers
+DB_WORKERS = int(os.getenv("MOCK_API_DB_WORKERS", "8"))
 
 # ---------------- API Key Auth ----------------
 API_KEY = TEST_MOKE_API_KEY
 api_key_header = APIKeyHeader(name="X-API-Key", auto_error=False)
 
-def get_api_key(api_key_header: str = Security(api_key_header)):
+async def get_api_key(api_key_header: str = Security(api_key_header)):
     if api_key_header == API_KEY:
         return api_key_header
     raise HTTPException(status_code=403, detail="Invalid or missing API Key")
 
 # ---------------- DB Helper ----------------
-DB_NAME = "orders.db"
+# "file" keeps orders in DB_NAME; "memory" uses a shared-cache in-memory database of that name
+DB_MODES = ("file", "memory")
+DB_MODE = os.getenv("MOCK_API_DB_MODE", "file")
+DB_NAME = os.getenv("MOCK_API_DB_NAME", "orders.db")
+
+# Snapshot taken after init_db(); POST /api/admin/reset restores it
+INITIAL_SNAPSHOT = "initial"
+# Directory for snapshot files saved/restored through the admin API; unset disables them
+SNAPSHOT_DIR = os.getenv("MOCK_API_SNAPSHOT_DIR")
+
+def create_database(mode=DB_MODE, db_name=DB_NAME):
+    """Create the MockDatabase for the given storage mode"""
+    if mode not in DB_MODES:
+        raise ValueError(f"Invalid MOCK_API_DB_MODE '{mode}'. Please use one of {DB_MODES}.")
+    if mode == "memory":
+        return MockDatabase.in_memory(os.path.splitext(db_name)[0])
+    return MockDatabase(db_name)
+
+# One pooled connection per worker thread, WAL mode (see mock_db.py)
+db = create_database()
+
+# SQL is kept constant so each connection reuses its prepared statements
+INIT_DB_SQL = """
+    BEGIN;
+
+    -- Users table
+    CREATE TABLE IF NOT EXISTS users (
+        user_id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        role TEXT NOT NULL
+    );
+
+    -- Products table
+    CREATE TABLE IF NOT EXISTS products (
+        product_id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        price REAL NOT NULL
+    );
+
+    -- Orders table
+    CREATE TABLE IF NOT EXISTS orders (
+        order_id INTEGER PRIMARY KEY,
+        user_id INTEGER,
+        product_id INTEGER,
+        quantity INTEGER,
+        address TEXT,
+        payment_method TEXT,
+        FOREIGN KEY(user_id) REFERENCES users(user_id),
+        FOREIGN KEY(product_id) REFERENCES products(product_id)
+    );
+
+    -- Indexes for the user_id/product_id filters with keyset pagination on order_id
+    CREATE INDEX IF NOT EXISTS idx_orders_user_id_order_id ON orders (user_id, order_id);
+    CREATE INDEX IF NOT EXISTS idx_orders_product_id_order_id ON orders (product_id, order_id);
+
+    -- Insert sample users
+    INSERT OR IGNORE INTO users (user_id, name, role) VALUES (1, 'Karthick', 'QA Engineer');
+    INSERT OR IGNORE INTO users (user_id, name, role) VALUES (2, 'Priya', 'Developer');
+
+    -- Insert sample products
+    INSERT OR IGNORE INTO products (product_id, name, price) VALUES (1, 'Laptop', 1200.50);
+    INSERT OR IGNORE INTO products (product_id, name, price) VALUES (2, 'Mouse', 25.75);
+
+    COMMIT;
+"""
+SELECT_FIXED_USER_SQL = "SELECT user_id, name, role FROM users LIMIT 1"
+SELECT_ORDERS_SQL = """
+    SELECT o.order_id, u.name, p.name, o.quantity, o.address, o.payment_method
+    FROM orders o
+    JOIN users u ON o.user_id = u.user_id
+    JOIN products p ON o.product_id = p.product_id
+"""
+# Rows per fetchmany() call of a streamed GET /api/orders
+ORDERS_STREAM_BATCH_SIZE = 1000
+USER_EXISTS_SQL = "SELECT 1 FROM users WHERE user_id=?"
+PRODUCT_EXISTS_SQL = "SELECT 1 FROM products WHERE product_id=?"
+INSERT_ORDER_SQL = "INSERT INTO orders (order_id, user_id, product_id, quantity, address, payment_method) VALUES (?, ?, ?, ?, ?, ?)"
+SELECT_USER_IDS_SQL = "SELECT user_id FROM users"
+SELECT_PRODUCT_IDS_SQL = "SELECT product_id FROM products"
+SELECT_EXISTING_ORDER_IDS_SQL = "SELECT order_id FROM orders WHERE order_id IN ({placeholders})"
+# order_ids per duplicate-check query (below SQLite's bound parameter limit)
+BULK_ORDER_ID_CHUNK_SIZE = 500
+
+# user_id/product_id sets for bulk validation; users and products are only seeded, so they are loaded once
+valid_user_ids = frozenset()
+valid_product_ids = frozenset()
 
 def init_db():
     """Initialize the database with users, products, and orders"""
-    with sqlite3.connect(DB_NAME, check_same_thread=False, timeout=10) as conn:
-        cursor = conn.cursor()
-        
-        # Users table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                user_id INTEGER PRIMARY KEY,
-                name TEXT NOT NULL,
-                role TEXT NOT NULL
-            )
-        """)
-        
-        # Products table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS products (
-                product_id INTEGER PRIMARY KEY,
-                name TEXT NOT NULL,
-                price REAL NOT NULL
-            )
-        """)
-        
-        # Orders table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS orders (
-                order_id INTEGER PRIMARY KEY,
-                user_id INTEGER,
-                product_id INTEGER,
-                quantity INTEGER,
-                address TEXT,
-                payment_method TEXT,
-                FOREIGN KEY(user_id) REFERENCES users(user_id),
-                FOREIGN KEY(product_id) REFERENCES products(product_id)
-            )
-        """)
-
-        # Insert sample users
-        cursor.execute("INSERT OR IGNORE INTO users (user_id, name, role) VALUES (1, 'Karthick', 'QA Engineer')")
-        cursor.execute("INSERT OR IGNORE INTO users (user_id, name, role) VALUES (2, 'Priya', 'Developer')")
-
-        # Insert sample products
-        cursor.execute("INSERT OR IGNORE INTO products (product_id, name, price) VALUES (1, 'Laptop', 1200.50)")
-        cursor.execute("INSERT OR IGNORE INTO products (product_id, name, price) VALUES (2, 'Mouse', 25.75)")
-
-        conn.commit()
-
-# Run on startup
-init_db()
+    db.executescript(INIT_DB_SQL)
+
+def load_reference_ids():
+    """Load the user and product ids that bulk orders are validated against"""
+    global valid_user_ids, valid_product_ids
+    valid_user_ids = frozenset(r[0] for r in db.fetchall(SELECT_USER_IDS_SQL))
+    valid_product_ids = frozenset(r[0] for r in db.fetchall(SELECT_PRODUCT_IDS_SQL))
+
+# ---------------- App Lifespan ----------------
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Startup: DB thread pool and schema; shutdown: stop the pool and close connections
+    db.start_executor(DB_WORKERS)
+    await db.run(init_db)
+    await db.run(load_reference_ids)
+    if INITIAL_SNAPSHOT not in db.snapshot_names():
+        # An in-memory db outlives app restarts in the same process; keep its first snapshot
+        await db.run(db.snapshot, INITIAL_SNAPSHOT)
+    yield
+    db.shutdown()
+
+app = FastAPI(title="Order API with Auth & SQLite", lifespan=lifespan)
 
 # ---------------- Pydantic Models ----------------
 class Order(BaseModel):
@@ -86,12 +171,9 @@ class Order(BaseModel):
 
 # ---------------- GET APIs ----------------
 @app.get("/api/fixeddata", dependencies=[Depends(get_api_key)])
-def get_fixed_data():
+async def get_fixed_data():
     try:
-        with sqlite3.connect(DB_NAME, check_same_thread=False, timeout=10) as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT user_id, name, role FROM users LIMIT 1")
-            row = cursor.fetchone()
+        row = await db.run(db.fetchone, SELECT_FIXED_USER_SQL)
         return {
             "status": "success",
             "code": 200,
@@ -101,59 +183,111 @@ def get_fixed_data():
     except sqlite3.OperationalError:
         raise HTTPException(status_code=500, detail="Database is locked")
 
+def build_orders_query(after_order_id=None, user_id=None, product_id=None, limit=None):
+    """Build the orders SELECT for the given cursor, filters and page size (keyset pagination on order_id)"""
+    conditions, params = [], []
+    if after_order_id is not None:
+        conditions.append("o.order_id > ?")
+        params.append(after_order_id)
+    if user_id is not None:
+        conditions.append("o.user_id = ?")
+        params.append(user_id)
+    if product_id is not None:
+        conditions.append("o.product_id = ?")
+        params.append(product_id)
+    sql = SELECT_ORDERS_SQL
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += " ORDER BY o.order_id"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    return sql, tuple(params)
+
+def order_row_to_dict(r):
+    return {
+        "order_id": r[0],
+        "user": r[1],
+        "product": r[2],
+        "quantity": r[3],
+        "address": r[4],
+        "payment_method": r[5]
+    }
+
+async def stream_orders(after_order_id=None, user_id=None, product_id=None, limit=None):
+    """
+    Yield the orders response as JSON bytes, reading the rows in keyset-paginated batches.
+
+    Each batch is a short read of its own, so a long stream doesn't hold a read lock
+    (in memory mode, writes and restores would otherwise wait for it or fail).
+    """
+    yield b'{"status":"success","code":200,"message":"Orders fetched successfully","data":['
+    separator = b""
+    remaining = limit
+    while remaining is None or remaining > 0:
+        batch_size = ORDERS_STREAM_BATCH_SIZE if remaining is None else min(ORDERS_STREAM_BATCH_SIZE, remaining)
+        sql, params = build_orders_query(after_order_id, user_id, product_id, batch_size)
+        rows = await db.run(db.fetchall, sql, params)
+        if rows:
+            yield separator + b",".join(dumps_json(order_row_to_dict(r)) for r in rows)
+            separator = b","
+            after_order_id = rows[-1][0]
+        if len(rows) < batch_size:
+            break
+        if remaining is not None:
+            remaining -= len(rows)
+    yield b"]}"
+
 @app.get("/api/orders", dependencies=[Depends(get_api_key)])
-def get_orders():
+async def get_orders(
+    limit: Optional[int] = Query(None, ge=1, description="Page size; omit to return every matching order"),
+    after_order_id: Optional[int] = Query(None, description="Cursor: return orders with a larger order_id"),
+    user_id: Optional[int] = None,
+    product_id: Optional[int] = None,
+    stream: bool = Query(False, description="Stream the response instead of building it in memory"),
+):
+    if stream:
+        return StreamingResponse(stream_orders(after_order_id, user_id, product_id, limit),
+                                 media_type="application/json")
+    sql, params = build_orders_query(after_order_id, user_id, product_id, limit)
     try:
-        with sqlite3.connect(DB_NAME, check_same_thread=False, timeout=10) as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT o.order_id, u.name, p.name, o.quantity, o.address, o.payment_method
-                FROM orders o
-                JOIN users u ON o.user_id = u.user_id
-                JOIN products p ON o.product_id = p.product_id
-            """)
-            rows = cursor.fetchall()
-        return {
+        rows = await db.run(db.fetchall, sql, params)
+        response = {
             "status": "success",
             "code": 200,
             "message": "Orders fetched successfully",
-            "data": [
-                {
-                    "order_id": r[0],
-                    "user": r[1],
-                    "product": r[2],
-                    "quantity": r[3],
-                    "address": r[4],
-                    "payment_method": r[5]
-                }
-                for r in rows
-            ]
+            "data": [order_row_to_dict(r) for r in rows]
         }
+        if limit is not None:
+            # Pass next_after_order_id as after_order_id to get the next page; None on the last page
+            response["pagination"] = {
+                "limit": limit,
+                "next_after_order_id": rows[-1][0] if len(rows) == limit else None
+            }
+        return response
     except sqlite3.OperationalError:
         raise HTTPException(status_code=500, detail="Database is locked")
 
 # ---------------- POST API ----------------
+def insert_order(order: Order):
+    with db.write_transaction() as conn:
+        # Ensure user exists
+        if not conn.execute(USER_EXISTS_SQL, (order.user_id,)).fetchone():
+            raise HTTPException(status_code=400, detail="Invalid user_id")
+
+        # Ensure product exists
+        if not conn.execute(PRODUCT_EXISTS_SQL, (order.product_id,)).fetchone():
+            raise HTTPException(status_code=400, detail="Invalid product_id")
+
+        conn.execute(
+            INSERT_ORDER_SQL,
+            (order.order_id, order.user_id, order.product_id, order.quantity, order.address, order.payment_method)
+        )
+
 @app.post("/api/orders", dependencies=[Depends(get_api_key)])
-def create_order(order: Order):
+async def create_order(order: Order):
     try:
-        with sqlite3.connect(DB_NAME, check_same_thread=False, timeout=10) as conn:
-            cursor = conn.cursor()
-
-            # Ensure user exists
-            cursor.execute("SELECT 1 FROM users WHERE user_id=?", (order.user_id,))
-            if not cursor.fetchone():
-                raise HTTPException(status_code=400, detail="Invalid user_id")
-
-            # Ensure product exists
-            cursor.execute("SELECT 1 FROM products WHERE product_id=?", (order.product_id,))
-            if not cursor.fetchone():
-                raise HTTPException(status_code=400, detail="Invalid product_id")
-
-            cursor.execute(
-                "INSERT INTO orders (order_id, user_id, product_id, quantity, address, payment_method) VALUES (?, ?, ?, ?, ?, ?)",
-                (order.order_id, order.user_id, order.product_id, order.quantity, order.address, order.payment_method)
-            )
-            conn.commit()
+        await db.run(insert_order, order)
     except sqlite3.IntegrityError:
         raise HTTPException(status_code=400, detail="Order ID already exists")
     except sqlite3.OperationalError:
@@ -166,6 +300,154 @@ def create_order(order: Order):
         "data": order.dict()
     }
 
+def parse_bulk_orders(body: bytes, content_type: str):
+    """Split a JSON array or NDJSON body into (index, item) pairs and (index, error) parse errors"""
+    items, errors = [], []
+    if "ndjson" not in content_type and body.lstrip()[:1] == b"[":
+        try:
+            items = list(enumerate(loads_json(body)))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid JSON array: {e}")
+        return items, errors
+    index = 0
+    for line in body.splitlines():
+        if not line.strip():
+            continue
+        try:
+            items.append((index, loads_json(line)))
+        except ValueError as e:
+            errors.append({"index": index, "order_id": None, "error": f"Invalid JSON: {e}"})
+        index += 1
+    return items, errors
+
+def validate_bulk_order(item):
+    """Return (Order, None) for a valid bulk item, or (None, error message)"""
+    if not isinstance(item, dict):
+        return None, "Order must be a JSON object"
+    try:
+        order = Order(**item)
+    except ValidationError as e:
+        return None, "; ".join(f"{'.'.join(str(loc) for loc in err['loc'])}: {err['msg']}" for err in e.errors())
+    if order.user_id not in valid_user_ids:
+        return None, "Invalid user_id"
+    if order.product_id not in valid_product_ids:
+        return None, "Invalid product_id"
+    return order, None
+
+def insert_orders_bulk(orders):
+    """Insert (index, Order) pairs in one transaction, skipping duplicate order_ids; returns (created, errors)"""
+    errors = []
+    with db.write_transaction() as conn:
+        order_ids = [order.order_id for _, order in orders]
+        existing_order_ids = set()
+        for start in range(0, len(order_ids), BULK_ORDER_ID_CHUNK_SIZE):
+            chunk = order_ids[start:start + BULK_ORDER_ID_CHUNK_SIZE]
+            sql = SELECT_EXISTING_ORDER_IDS_SQL.format(placeholders=",".join("?" * len(chunk)))
+            existing_order_ids.update(r[0] for r in conn.execute(sql, chunk))
+
+        rows = []
+        for index, order in orders:
+            if order.order_id in existing_order_ids:
+                errors.append({"index": index, "order_id": order.order_id, "error": "Order ID already exists"})
+                continue
+            # Later items with the same order_id in this request are duplicates too
+            existing_order_ids.add(order.order_id)
+            rows.append((order.order_id, order.user_id, order.product_id, order.quantity, order.address, order.payment_method))
+        conn.executemany(INSERT_ORDER_SQL, rows)
+    return len(rows), errors
+
+@app.post("/api/orders/bulk", dependencies=[Depends(get_api_key)])
+async def create_orders_bulk(request: Request):
+    """Create many orders from a JSON array or NDJSON (Content-Type: application/x-ndjson) body"""
+    items, errors = parse_bulk_orders(await request.body(), request.headers.get("content-type", ""))
+    orders = []
+    for index, item in items:
+        order, error = validate_bulk_order(item)
+        if error:
+            errors.append({"index": index, "order_id": item.get("order_id") if isinstance(item, dict) else None,
+                           "error": error})
+        else:
+            orders.append((index, order))
+
+    try:
+        created, duplicate_errors = await db.run(insert_orders_bulk, orders)
+    except sqlite3.OperationalError:
+        raise HTTPException(status_code=500, detail="Database is locked")
+    errors = sorted(errors + duplicate_errors, key=lambda error: error["index"])
+
+    return {
+        "status": "success" if not errors else "partial",
+        "code": 201,
+        "message": f"{created} orders created, {len(errors)} failed",
+        "data": {"created": created, "failed": len(errors), "errors": errors}
+    }
+
+# ---------------- Admin APIs ----------------
+class Snapshot(BaseModel):
+    name: str = "default"
+    # File name relative to MOCK_API_SNAPSHOT_DIR
+    path: Optional[str] = None
+
+def resolve_snapshot_path(path):
+    """Return the snapshot file for a client-supplied path, which must stay inside SNAPSHOT_DIR"""
+    if path is None:
+        return None
+    if not SNAPSHOT_DIR:
+        raise HTTPException(status_code=400, detail="Snapshot files are disabled, set MOCK_API_SNAPSHOT_DIR")
+    snapshot_dir = os.path.realpath(SNAPSHOT_DIR)
+    snapshot_path = os.path.realpath(os.path.join(snapshot_dir, path))
+    if os.path.commonpath([snapshot_dir, snapshot_path]) != snapshot_dir or snapshot_path == snapshot_dir:
+        raise HTTPException(status_code=400, detail=f"Snapshot path '{path}' is outside the snapshot directory")
+    return snapshot_path
+
+def restore_snapshot(name, path=None):
+    db.restore(name, path)
+    # A snapshot may hold other users/products than the current data
+    load_reference_ids()
+
+@app.post("/api/admin/snapshot", dependencies=[Depends(get_api_key)])
+async def create_snapshot(snapshot: Snapshot = Snapshot()):
+    """Save the current data as a named snapshot (in memory, or in the SQLite file at path in MOCK_API_SNAPSHOT_DIR)"""
+    path = resolve_snapshot_path(snapshot.path)
+    try:
+        await db.run(db.snapshot, snapshot.name, path)
+    except sqlite3.Error as e:
+        raise HTTPException(status_code=500, detail=f"Snapshot failed: {e}")
+    return {
+        "status": "success",
+        "code": 201,
+        "message": f"Snapshot '{snapshot.name}' saved",
+        "data": {"snapshots": db.snapshot_names()}
+    }
+
+@app.post("/api/admin/restore", dependencies=[Depends(get_api_key)])
+async def restore_from_snapshot(snapshot: Snapshot = Snapshot()):
+    """Replace the data with a snapshot saved by /api/admin/snapshot"""
+    path = resolve_snapshot_path(snapshot.path)
+    try:
+        await db.run(restore_snapshot, snapshot.name, path)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    except sqlite3.Error as e:
+        raise HTTPException(status_code=500, detail=f"Restore failed: {e}")
+    return {
+        "status": "success",
+        "code": 200,
+        "message": f"Snapshot '{snapshot.path or snapshot.name}' restored",
+        "data": {"snapshots": db.snapshot_names()}
+    }
+
+@app.post("/api/admin/reset", dependencies=[Depends(get_api_key)])
+async def reset_data():
+    """Restore the data the API started with"""
+    await db.run(restore_snapshot, INITIAL_SNAPSHOT)
+    return {
+        "status": "success",
+        "code": 200,
+        "message": "Data reset to the initial snapshot",
+        "data": {"snapshots": db.snapshot_names()}
+    }
+
 # ---------------- Global Error Handlers ----------------
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request: Request, exc: HTTPException):
@@ -189,3 +471,29 @@ async def global_exception_handler(request: Request, exc: Exception):
         }
     )
 
+# ---------------- Standalone Server ----------------
+if __name__ == "__main__":
+    import argparse
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run the mock order API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--db-mode", choices=DB_MODES, default=DB_MODE)
+    parser.add_argument("--db-name", default=os.getenv("MOCK_API_DB_NAME"),
+                        help="Database name; defaults to orders_<port>.db so instances on other ports are isolated")
+    args = parser.parse_args()
+
+    # Handlers use the module-level db, so replacing it before startup switches every endpoint
+    db = create_database(args.db_mode, args.db_name or f"orders_{args.port}.db")
+    uvicorn.run(app, host=args.host, port=args.port)
+
+### Usage example: ###
+# Parallel CI shards, each with its own in-memory database:
+#   python api_functions/mock_api.py --port 8001 --db-mode memory &
+#   python api_functions/mock_api.py --port 8002 --db-mode memory &
+# Between test suites:
+#   POST /api/admin/snapshot {"name": "baseline"}  ... run suite ...  POST /api/admin/restore {"name": "baseline"}
+#   POST /api/admin/reset  (back to the seed data)
+# Sharing a snapshot file between instances (both started with MOCK_API_SNAPSHOT_DIR=/tmp/mock_snapshots):
+#   POST /api/admin/snapshot {"name": "baseline", "path": "baseline.db"}  on one, restore it on the other
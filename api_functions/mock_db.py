@@ -0,0 +1,293 @@
+import asyncio
+import os
+import sqlite3
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common_functions.utils.logging_config import logger
+
+# Pragmas applied to every pooled connection. WAL lets readers run while one
+# writer commits, and synchronous=NORMAL only syncs the WAL at checkpoints.
+DEFAULT_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -64 * 1024,  # negative values are KiB, i.e. 64 MiB per connection
+    "mmap_size": 256 * 1024 * 1024,
+    "busy_timeout": 10000,  # ms to wait for a lock before SQLITE_BUSY
+    "temp_store": "MEMORY",
+}
+
+# Size of each connection's prepared statement cache (sqlite3 cached_statements)
+STATEMENT_CACHE_SIZE = 256
+
+
+
+def memory_database_uri(name):
+    """URI of a named in-memory database shared by every connection of this process."""
+    return f"file:{name}?mode=memory&cache=shared"
+
+
+class ReadWriteLock:
+    """
+    Lock shared by any number of readers or held by one writer.
+
+    Waiting writers block new readers, so a steady stream of reads cannot starve
+    them. The lock is not owned by a thread; acquire and release it in the same call.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+
+    @contextmanager
+    def read(self):
+        with self._condition:
+            while self._writer or self._waiting_writers:
+                self._condition.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._readers -= 1
+                if not self._readers:
+                    self._condition.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self._condition:
+            self._waiting_writers += 1
+            try:
+                while self._writer or self._readers:
+                    self._condition.wait()
+            finally:
+                self._waiting_writers -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writer = False
+                self._condition.notify_all()
+
+
+class MockDatabase:
+    """
+    SQLite access layer for the mock API with one pooled connection per thread.
+
+    Connections are opened lazily by each worker thread and reused for every
+    request it serves, so statements stay prepared in the per-connection cache
+    (keep the SQL text constant and pass values as parameters). Connections run
+    in autocommit mode; writes go through write_transaction(), which takes the
+    write lock up front with BEGIN IMMEDIATE so concurrent writers queue on
+    busy_timeout instead of failing with "database is locked".
+
+    Async handlers call run(), which executes the blocking DB work on a
+    dedicated, explicitly sized thread pool (start_executor), so the pool size
+    also bounds the number of open connections.
+
+    A database created with in_memory() lives in a shared-cache in-memory
+    SQLite database instead of a file. An anchor connection keeps it alive
+    while the pool is closed and reopened, and snapshot()/restore() copy it
+    with the SQLite backup API to reset tests to a known dataset. Shared-cache
+    connections fail at once with "database table is locked" instead of
+    waiting on busy_timeout, so in that mode every read, write, snapshot and
+    restore goes through a ReadWriteLock: reads run together, and writes and
+    restores run alone.
+    """
+
+    def __init__(self, db_name, timeout=10, pragmas=None, uri=False):
+        self.db_name = db_name
+        self.timeout = timeout
+        self.uri = uri
+        self.shared_memory = uri and "mode=memory" in db_name
+        self.pragmas = {**DEFAULT_PRAGMAS, **(pragmas or {})}
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        # Shared-cache table locks fail with SQLITE_LOCKED instead of waiting, so access is serialized here
+        self._access_lock = ReadWriteLock() if self.shared_memory else None
+        self._executor = None
+        self._snapshots = {}
+        # The in-memory database is dropped when its last connection closes
+        self._anchor = self._connect() if self.shared_memory else None
+
+    @classmethod
+    def in_memory(cls, name, timeout=10, pragmas=None):
+        """Create a MockDatabase backed by the named shared-cache in-memory database."""
+        return cls(memory_database_uri(name), timeout=timeout, pragmas=pragmas, uri=True)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_name, timeout=self.timeout, check_same_thread=False,
+                               isolation_level=None, cached_statements=STATEMENT_CACHE_SIZE, uri=self.uri)
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name}={value}")
+        return conn
+
+    def open_connection(self):
+        """
+        Open a dedicated (unpooled) connection; the caller closes it.
+
+        Its reads bypass the shared-cache lock, so with in_memory() they can fail
+        while a write or restore runs.
+        """
+        return self._connect()
+
+    def connection(self):
+        """Return the calling thread's connection, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    @contextmanager
+    def write_transaction(self):
+        """
+        Run the enclosed statements in one write transaction.
+
+        Example:
+            with db.write_transaction() as conn:
+                conn.execute(INSERT_ORDER_SQL, values)
+        """
+        conn = self.connection()
+        with self._exclusive_access():
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except BaseException:
+                # Also after a failed COMMIT, so the pooled connection never keeps an open transaction
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+
+    @contextmanager
+    def _shared_access(self):
+        if self._access_lock is None:
+            yield
+            return
+        with self._access_lock.read():
+            yield
+
+    @contextmanager
+    def _exclusive_access(self):
+        if self._access_lock is None:
+            yield
+            return
+        with self._access_lock.write():
+            yield
+
+    def fetchone(self, sql, params=()):
+        with self._shared_access():
+            cursor = self.connection().execute(sql, params)
+            try:
+                return cursor.fetchone()
+            finally:
+                # Reset the statement so it releases its table read locks before the lock does
+                cursor.close()
+
+    def fetchall(self, sql, params=()):
+        with self._shared_access():
+            return self.connection().execute(sql, params).fetchall()
+
+    def executescript(self, script):
+        """Run DDL/seed statements (the script manages its own transaction)."""
+        with self._exclusive_access():
+            self.connection().executescript(script)
+
+    def snapshot(self, name="default", path=None):
+        """
+        Copy the current database into a named snapshot with the SQLite backup API.
+
+        Snapshots are kept in memory, or written to path when one is given (restore
+        then reads it from that file, also from another process).
+        """
+        target = sqlite3.connect(path or ":memory:", check_same_thread=False)
+        with self._shared_access():
+            self.connection().backup(target)
+        if path:
+            target.close()
+            target = None
+        with self._lock:
+            previous = self._snapshots.get(name)
+            self._snapshots[name] = target if target is not None else path
+        if isinstance(previous, sqlite3.Connection):
+            previous.close()
+        logger.info(f"Saved snapshot '{name}' of {self.db_name}" + (f" to {path}" if path else ""))
+
+    def restore(self, name="default", path=None):
+        """
+        Replace the database contents with a snapshot taken by snapshot().
+
+        Raises:
+            KeyError: when no snapshot with that name (and no path) exists.
+        """
+        source = path
+        if source is None:
+            with self._lock:
+                if name not in self._snapshots:
+                    raise KeyError(f"Snapshot '{name}' does not exist")
+                source = self._snapshots[name]
+        if isinstance(source, sqlite3.Connection):
+            self._restore_from(source)
+        else:
+            if not os.path.exists(source):
+                raise KeyError(f"Snapshot file '{source}' does not exist")
+            conn = sqlite3.connect(source, check_same_thread=False)
+            try:
+                self._restore_from(conn)
+            finally:
+                conn.close()
+        logger.info(f"Restored snapshot '{path or name}' into {self.db_name}")
+
+    def _restore_from(self, source):
+        # The backup takes the destination's write lock, so it waits like any other writer
+        # (in shared-cache mode, until every reader and writer is done)
+        with self._exclusive_access():
+            source.backup(self.connection())
+
+    def snapshot_names(self):
+        with self._lock:
+            return sorted(self._snapshots)
+
+    def start_executor(self, max_workers):
+        """Create the thread pool used by run(); call once at application startup."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="mock-db")
+            logger.info(f"Started mock DB executor with {max_workers} workers for {self.db_name}")
+
+    async def run(self, func, *args, **kwargs):
+        """Run a blocking DB function on the DB thread pool and await its result."""
+        if self._executor is None:
+            raise RuntimeError("Mock DB executor is not started, call start_executor() first")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(func, *args, **kwargs))
+
+    def shutdown(self):
+        """Stop the DB thread pool and close every pooled connection."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self.close_all()
+
+    def close_all(self):
+        """Close every pooled connection (not the in-memory anchor); threads open new ones on their next call."""
+        with self._lock:
+            connections, self._connections = self._connections, []
+            self._local = threading.local()
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.ProgrammingError:
+                pass
+        logger.info(f"Closed {len(connections)} mock DB connections to {self.db_name}")
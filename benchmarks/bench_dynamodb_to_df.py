@@ -0,0 +1,96 @@
+"""
+Benchmark dynamodb_operations_manager.query_results_to_df against the previous row-by-row conversion.
+
+Builds synthetic items in DynamoDB's typed wire format (1M by default) and times both converters.
+
+Usage:
+    python benchmarks/bench_dynamodb_to_df.py --items 1000000
+"""
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common_functions.aws_service.aws_common_function import dynamodb_operations_manager
+
+
+def build_synthetic_items(count):
+    items = []
+    for i in range(count):
+        item = {
+            "search_id": {"S": f"SID_{i:08d}"},
+            "amount": {"N": str(i * 0.25)},
+            "quantity": {"N": str(i % 97)},
+            "is_active": {"BOOL": i % 3 == 0},
+            "status": {"S": "OK" if i % 5 else "RETRY"},
+        }
+        if i % 4:
+            item["comment"] = {"S": f"row {i}"}
+        else:
+            item["comment"] = {"NULL": True}
+        if i % 10 == 0:
+            item["rates"] = {"L": [{"N": "1.5"}, {"M": {"code": {"S": "INR"}, "value": {"N": "83.1"}}}]}
+        items.append(item)
+    return items
+
+
+def legacy_convert_value(value):
+    # Recursive form of the if/elif chain the row-by-row converter used
+    if 'S' in value:
+        return value['S']
+    elif 'N' in value:
+        return float(value['N'])
+    elif 'BOOL' in value:
+        return value['BOOL']
+    elif 'L' in value:
+        return [legacy_convert_value(v) for v in value['L']]
+    elif 'M' in value:
+        return {k: legacy_convert_value(v) for k, v in value['M'].items()}
+    elif 'NULL' in value:
+        return None
+
+
+def legacy_query_results_to_df(items):
+    # The row-by-row converter that query_results_to_df replaced
+    converted_items = []
+    for item in items:
+        converted_item = {}
+        for key, value in item.items():
+            converted_item[key] = legacy_convert_value(value)
+        converted_items.append(converted_item)
+    return pd.DataFrame(converted_items)
+
+
+def normalize_missing(df):
+    # Missing attributes are None in the columnar frame and NaN in the row-by-row frame
+    return df.astype(object).where(df.notna(), None)
+
+
+def time_converter(converter, items):
+    start = time.perf_counter()
+    result = converter(items)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    items = build_synthetic_items(args.items)
+
+    legacy_time, legacy_df = time_converter(legacy_query_results_to_df, items)
+    columnar_time, columnar_df = time_converter(dynamodb_operations_manager.query_results_to_df, items)
+
+    pd.testing.assert_frame_equal(normalize_missing(columnar_df), normalize_missing(legacy_df))
+    print(f"items={args.items} columns={len(columnar_df.columns)}")
+    print(f"row-by-row converter: {legacy_time:8.3f}s")
+    print(f"columnar converter:   {columnar_time:8.3f}s  ({legacy_time / columnar_time:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Benchmark sustained concurrent POST /api/orders throughput of the mock API.
+
+Starts the mock API with uvicorn in a temporary directory (so it gets a fresh
+orders.db), posts orders with unique ids from many concurrent clients for a
+fixed duration, and reports throughput, latency percentiles and the number of
+"Database is locked" errors.
+
+With --bulk-orders N it also seeds N orders through POST /api/orders/bulk
+(NDJSON batches of --bulk-batch-size) and reports the seeding rate.
+
+Usage:
+    python benchmarks/bench_mock_api_orders.py --concurrency 64 --duration 20 --db-workers 8
+    python benchmarks/bench_mock_api_orders.py --duration 0 --bulk-orders 100000
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(REPO_ROOT)
+
+from common_functions.utils.latency_metrics import LatencyHistogram
+
+API_KEY = "bench-api-key"
+
+# Per-request httpx INFO logs would dominate the client's CPU time
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+
+def get_free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_mock_api(port, work_dir, extra_env=None):
+    env = {**os.environ, "TEST_MOKE_API_KEY": API_KEY, "PYTHONPATH": REPO_ROOT, **(extra_env or {})}
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api_functions.mock_api:app", "--port", str(port), "--log-level", "warning"],
+        cwd=work_dir, env=env,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/api/fixeddata", headers={"X-API-Key": API_KEY}, timeout=1)
+            return process
+        except httpx.TransportError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("mock API did not start within 30s")
+
+
+async def post_orders(port, concurrency, duration_s):
+    order_ids = itertools.count(1)
+    histogram = LatencyHistogram()
+    status_counts = {}
+    lock_errors = 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", headers={"X-API-Key": API_KEY},
+                                 limits=limits, timeout=30) as client:
+        deadline = time.perf_counter() + duration_s
+
+        async def worker():
+            nonlocal lock_errors
+            while time.perf_counter() < deadline:
+                order_id = next(order_ids)
+                order = {"order_id": order_id, "user_id": 1 + order_id % 2, "product_id": 1 + order_id % 2,
+                         "quantity": 1, "address": "bench street", "payment_method": "card"}
+                start = time.perf_counter_ns()
+                response = await client.post("/api/orders", json=order)
+                histogram.record(time.perf_counter_ns() - start)
+                status_counts[response.status_code] = status_counts.get(response.status_code, 0) + 1
+                if response.status_code == 500 and "locked" in response.text:
+                    lock_errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return histogram, status_counts, lock_errors, elapsed
+
+
+def seed_orders_bulk(port, order_count, batch_size, first_order_id):
+    created = 0
+    start = time.perf_counter()
+    with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=120,
+                      headers={"X-API-Key": API_KEY, "Content-Type": "application/x-ndjson"}) as client:
+        for batch_start in range(first_order_id, first_order_id + order_count, batch_size):
+            batch_end = min(batch_start + batch_size, first_order_id + order_count)
+            body = "".join(
+                json.dumps({"order_id": order_id, "user_id": 1 + order_id % 2, "product_id": 1 + order_id % 2,
+                            "quantity": 1, "address": "bench street", "payment_method": "card"}) + "\n"
+                for order_id in range(batch_start, batch_end)
+            )
+            response = client.post("/api/orders/bulk", content=body)
+            response.raise_for_status()
+            created += response.json()["data"]["created"]
+    return created, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--db-workers", type=int, default=8, help="MOCK_API_DB_WORKERS of the mock API")
+    parser.add_argument("--db-mode", choices=("file", "memory"), default="file", help="MOCK_API_DB_MODE of the mock API")
+    parser.add_argument("--bulk-orders", type=int, default=0, help="Orders to seed through /api/orders/bulk")
+    parser.add_argument("--bulk-batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        port = get_free_port()
+        process = start_mock_api(port, work_dir, {"MOCK_API_DB_WORKERS": str(args.db_workers),
+                                                   "MOCK_API_DB_MODE": args.db_mode})
+        try:
+            histogram, status_counts, lock_errors, elapsed = asyncio.run(
+                post_orders(port, args.concurrency, args.duration))
+            if args.bulk_orders:
+                # Start above the ids used by the single-order run
+                created, bulk_elapsed = seed_orders_bulk(port, args.bulk_orders, args.bulk_batch_size,
+                                                         histogram.count + 10 ** 9)
+        finally:
+            process.terminate()
+            process.wait()
+
+    if args.bulk_orders:
+        print(f"bulk seeding: {created} orders in {bulk_elapsed:.2f}s ({created / bulk_elapsed:.0f} orders/s)")
+    if not histogram.count:
+        return
+    print(f"concurrency={args.concurrency} db_workers={args.db_workers} db_mode={args.db_mode} duration={elapsed:.1f}s requests={histogram.count}")
+    print(f"throughput: {histogram.count / elapsed:8.1f} orders/s")
+    print(f"latency:    {histogram.summary()}")
+    print(f"statuses:   {status_counts}")
+    print(f"lock errors: {lock_errors}")
+
+
+if __name__ == "__main__":
+    main()
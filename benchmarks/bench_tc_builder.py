@@ -0,0 +1,85 @@
+"""
+Benchmark get_tc_data_from_excel against the previous iterrows() implementation.
+
+Builds a synthetic test case sheet (100k rows by default) and times both builders.
+
+Usage:
+    python benchmarks/bench_tc_builder.py --rows 100000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main_function import get_tc_data_from_excel
+
+TC_META_COLUMNS = ["to_process", "test_case_id", "test_case_name", "api_name", "api_method",
+                   "default_api_payload", "expected_result"]
+
+
+def build_synthetic_sheet(rows, modify_columns=20, nan_ratio=0.7, seed=7):
+    rng = np.random.default_rng(seed)
+    data = {
+        "to_process": np.where(rng.random(rows) < 0.9, "Yes", "No"),
+        "test_case_id": [f"TC_{i:06d}" for i in range(rows)],
+        "test_case_name": [f"test case {i}" for i in range(rows)],
+        "api_name": rng.choice(["ais_jerry_transform_rates", "ais_platform_rates"], rows),
+        "api_method": "POST",
+        "default_api_payload": "nan",
+        "expected_result": "200",
+    }
+    for col in range(modify_columns):
+        values = rng.integers(0, 1000, rows).astype(str).astype(object)
+        values[rng.random(rows) < nan_ratio] = "nan"
+        data[f"input_data[field_{col}]"] = values
+    return pd.DataFrame(data).astype(str)
+
+
+def legacy_get_tc_data_from_excel(excel_data, tc_master_column_data, tc_sheet_name):
+    # The row-by-row builder that get_tc_data_from_excel replaced
+    tc_master_data = excel_data[tc_sheet_name]
+    tc_master_data = tc_master_data[tc_master_data['to_process'] == 'Yes']
+    tc_modify_data_columns = [col for col in tc_master_data.columns if col not in tc_master_column_data]
+    json_data = []
+    for _, row in tc_master_data.iterrows():
+        tc_meta = {col: row[col] for col in tc_master_column_data if col in row}
+        tc_modify_data = {col: row[col] for col in tc_modify_data_columns if col in row}
+        tc_modify_data = {key: value for key, value in tc_modify_data.items() if value != "nan"}
+        json_data.append({
+            "test_case_id": row['test_case_id'],
+            "tc_meta": [tc_meta],
+            "tc_modify_data": [tc_modify_data]
+        })
+    return json_data
+
+
+def time_builder(builder, excel_data):
+    start = time.perf_counter()
+    result = builder(excel_data, TC_META_COLUMNS, "tc")
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--modify-columns", type=int, default=20)
+    args = parser.parse_args()
+
+    excel_data = {"tc": build_synthetic_sheet(args.rows, args.modify_columns)}
+
+    legacy_time, legacy_result = time_builder(legacy_get_tc_data_from_excel, excel_data)
+    vectorized_time, vectorized_result = time_builder(get_tc_data_from_excel, excel_data)
+
+    assert vectorized_result == legacy_result, "vectorized builder output differs from the iterrows builder"
+    print(f"rows={args.rows} test_cases={len(vectorized_result)}")
+    print(f"iterrows builder:   {legacy_time:8.3f}s")
+    print(f"vectorized builder: {vectorized_time:8.3f}s  ({legacy_time / vectorized_time:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,22 @@
+import asyncio
+import atexit
+import itertools
+import numbers
 import os
+import queue
+import random
 import sys
+import threading
 import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from decimal import Decimal
 import boto3
-from botocore.exceptions import ClientError
+from boto3.exceptions import Boto3Error
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from botocore.exceptions import BotoCoreError, ClientError
+import numpy as np
 import pandas as pd
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
@@ -13,10 +27,52 @@ qa_aws_access_key_id = (os.getenv("DEV_ACCOUNT_AWS_ACCESS_KEY_ID"))
 qa_aws_secret_access_key = (os.getenv("DEV_ACCOUNT_AWS_SECRET_ACCESS_KEY"))
 qa_region_name = (os.getenv("DEV_ACCOUNT_AWS_REGION"))
 
+
+def _chunked(items, chunk_size):
+    """Split a list into consecutive chunks of at most chunk_size items."""
+    return [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+
+
+def _unique_search_id_values(search_ids):
+    """Drop empty and duplicate search ids, keeping the first-seen order: dict of str(id) to the id."""
+    unique_ids = {}
+    for search_id in search_ids:
+        if search_id not in (None, '', 'nan'):
+            unique_ids.setdefault(str(search_id), search_id)
+    return unique_ids
+
+
+def _unique_search_ids(search_ids):
+    """Drop empty and duplicate search ids, keeping the first-seen order, as strings."""
+    return list(_unique_search_id_values(search_ids))
+
+
 class aws_clien_manager:
-    
-    # Dictionary to store active clients
+    """
+    Pooled boto3 clients, created once and shared by every thread.
+
+    Clients are keyed by the session they were created from, so share one
+    session per account across workers: every boto3.Session built by a worker
+    gets its own clients (and connection pools).
+    """
+
+    # Dictionary to store active clients, keyed by
+    # (service, account, region, endpoint_url, session id, client settings)
     clients = {}
+    _clients_lock = threading.Lock()
+    _session_ids = itertools.count(1)
+    # Ids of garbage-collected sessions whose clients are still open. The finalizer may run
+    # on a thread that holds _clients_lock, so it only queues the id; get_client closes them.
+    _closed_session_ids = queue.SimpleQueue()
+
+    # botocore settings for new clients, change them with configure_clients()
+    client_settings = {
+        "max_pool_connections": 50,
+        "retries_mode": "adaptive",
+        "max_attempts": 5,
+        "connect_timeout": 10,
+        "read_timeout": 60,
+    }
 
     @classmethod
     def create_session(cls, aws_access_key_id=qa_aws_access_key_id, aws_secret_access_key=qa_aws_secret_access_key, region_name=qa_region_name):
@@ -30,48 +86,159 @@ class aws_clien_manager:
         )
 
     @classmethod
-    def activate_s3_client(cls, session):
+    def configure_clients(cls, **settings):
+        """
+        Update the botocore settings used for clients created afterwards.
+        Supported keys: max_pool_connections, retries_mode ("legacy", "standard" or
+        "adaptive"), max_attempts, connect_timeout, read_timeout.
+        """
+        unknown = set(settings) - set(cls.client_settings)
+        if unknown:
+            raise ValueError(f"Unknown aws client settings: {sorted(unknown)}")
+        cls.client_settings.update(settings)
+
+    @classmethod
+    def _merged_client_settings(cls, client_settings=None):
+        unknown = set(client_settings or ()) - set(cls.client_settings)
+        if unknown:
+            raise ValueError(f"Unknown aws client settings: {sorted(unknown)}")
+        return {**cls.client_settings, **(client_settings or {})}
+
+    @classmethod
+    def build_client_config(cls, client_settings=None):
+        """
+        Build the botocore Config for new clients from client_settings.
+        :param client_settings: Optional overrides of client_settings for this config
+        """
+        settings = cls._merged_client_settings(client_settings)
+        return Config(
+            max_pool_connections=settings["max_pool_connections"],
+            retries={"mode": settings["retries_mode"], "max_attempts": settings["max_attempts"]},
+            connect_timeout=settings["connect_timeout"],
+            read_timeout=settings["read_timeout"],
+        )
+
+    @classmethod
+    def _session_identity(cls, session):
+        """
+        Return (session_id, account label) of a session, assigned on its first use.
+
+        Refreshable and assumed-role credentials rotate their access key, so the
+        key is read once as a label and clients are keyed by the session itself.
+        Clients of a session are closed after the session is garbage collected.
+        """
+        identity = getattr(session, "_pooled_client_identity", None)
+        if identity is None:
+            with cls._clients_lock:
+                identity = getattr(session, "_pooled_client_identity", None)
+                if identity is None:
+                    credentials = session.get_credentials()
+                    identity = (next(cls._session_ids), credentials.access_key if credentials else None)
+                    session._pooled_client_identity = identity
+                    weakref.finalize(session, cls._closed_session_ids.put, identity[0])
+        return identity
+
+    @classmethod
+    def _client_key(cls, session, service_name, endpoint_url, account, settings):
+        session_id, session_account = cls._session_identity(session)
+        return (service_name, session_account if account is None else account, session.region_name, endpoint_url,
+                session_id, tuple(sorted(settings.items())))
+
+    @classmethod
+    def get_client(cls, session, service_name, endpoint_url=None, account=None, client_settings=None):
+        """
+        Get (or lazily create) a client for a service, shared per session, region, endpoint and settings.
+        Safe to call from many threads; each client is created exactly once.
+        :param session: Boto3 session providing the credentials and region; share one per account
+        :param service_name: AWS service name, e.g. "s3"
+        :param endpoint_url: Optional endpoint (e.g. a local MinIO or DynamoDB Local)
+        :param account: Optional account label; defaults to the session's access key id at first use
+        :param client_settings: Optional overrides of client_settings for this client, e.g. {"read_timeout": 300}
+        """
+        cls._close_collected_session_clients()
+        settings = cls._merged_client_settings(client_settings)
+        key = cls._client_key(session, service_name, endpoint_url, account, settings)
+        client = cls.clients.get(key)
+        if client is None:
+            with cls._clients_lock:
+                client = cls.clients.get(key)
+                if client is None:
+                    client = session.client(service_name, endpoint_url=endpoint_url,
+                                            config=cls.build_client_config(settings))
+                    cls.clients[key] = client
+        return client
+
+    @classmethod
+    def activate_s3_client(cls, session, endpoint_url=None, account=None):
         """
         Activate and return an S3 client.
         """
-        if 's3' not in cls.clients:
-            cls.clients['s3'] = session.client('s3')
-        return cls.clients['s3']
+        return cls.get_client(session, 's3', endpoint_url=endpoint_url, account=account)
 
     @classmethod
-    def activate_athena_client(cls, session):
+    def activate_athena_client(cls, session, endpoint_url=None, account=None):
         """
         Activate and return an Athena client.
         """
-        if 'athena' not in cls.clients:
-            cls.clients['athena'] = session.client('athena')
-        return cls.clients['athena']
+        return cls.get_client(session, 'athena', endpoint_url=endpoint_url, account=account)
 
     @classmethod
-    def activate_dynamodb_client(cls, session):
+    def activate_dynamodb_client(cls, session, endpoint_url=None, account=None):
         """
         Activate and return a DynamoDB client.
         """
-        if 'dynamodb' not in cls.clients:
-            cls.clients['dynamodb'] = session.client('dynamodb')
-        return cls.clients['dynamodb']
+        return cls.get_client(session, 'dynamodb', endpoint_url=endpoint_url, account=account)
+
+    @classmethod
+    def _close_client(cls, key, client):
+        try:
+            client.close()
+            logger.info(f"Closed {key[0]} client ({key[2]}).")
+        except AttributeError:
+            logger.info(f"{key[0]} client does not support explicit closure.")
+
+    @classmethod
+    def _close_collected_session_clients(cls):
+        session_ids = set()
+        while True:
+            try:
+                session_ids.add(cls._closed_session_ids.get_nowait())
+            except queue.Empty:
+                break
+        if not session_ids:
+            return
+        with cls._clients_lock:
+            closing = [(key, cls.clients.pop(key)) for key in list(cls.clients) if key[4] in session_ids]
+        for key, client in closing:
+            cls._close_client(key, client)
+
+    @classmethod
+    def close_clients(cls, service_name=None, account=None, region_name=None):
+        """
+        Close the active clients matching the given service, account and/or region.
+        """
+        cls._close_collected_session_clients()
+        with cls._clients_lock:
+            keys = [
+                key for key in cls.clients
+                if (service_name is None or key[0] == service_name)
+                and (account is None or key[1] == account)
+                and (region_name is None or key[2] == region_name)
+            ]
+            closing = [(key, cls.clients.pop(key)) for key in keys]
+        for key, client in closing:
+            cls._close_client(key, client)
 
     @classmethod
     def close_all_clients(cls):
         """
         Close all active clients.
         """
-        for service_name, client in cls.clients.items():
-            try:
-                client.close()
-                logger.info(f"Closed {service_name} client.")
-            except AttributeError:
-                logger.info(f"{service_name} client does not support explicit closure.")
-        cls.clients.clear()
+        cls.close_clients()
 
 
     # ## Usage example: ###
-    # # Create a session (use default credentials or provide your own)
+    # # Create a session (use default credentials or provide your own), once per account for all workers
     # session = aws_clien_manager.create_session()
 
     # # Activate and use the S3 client
@@ -93,21 +260,68 @@ class aws_clien_manager:
 
     # print("Hi")
 
+# Release pooled connections when the interpreter exits
+atexit.register(aws_clien_manager.close_all_clients)
+
 class s3_operations_manager:
     # Dictionary to store active operations
     operations = {}
 
+    # Shared thread pool for bulk transfers and prefix fan-out listing
+    max_transfer_workers = 16
+    _transfer_executor = None
+    _transfer_executor_lock = threading.Lock()
+
     @classmethod
-    def upload_file(cls, s3_client, file_path, bucket, s3_key):
+    def get_transfer_executor(cls):
+        """
+        Return the shared thread pool used by bulk transfers, creating it on first use.
+        """
+        if cls._transfer_executor is None:
+            with cls._transfer_executor_lock:
+                if cls._transfer_executor is None:
+                    cls._transfer_executor = ThreadPoolExecutor(
+                        max_workers=cls.max_transfer_workers, thread_name_prefix="s3-transfer")
+        return cls._transfer_executor
+
+    @classmethod
+    def shutdown_transfer_executor(cls):
+        """
+        Shut down the shared transfer thread pool.
+        """
+        with cls._transfer_executor_lock:
+            if cls._transfer_executor is not None:
+                cls._transfer_executor.shutdown(wait=True)
+                cls._transfer_executor = None
+
+    @classmethod
+    def get_transfer_config(cls, multipart_threshold=16 * 1024 * 1024, multipart_chunksize=16 * 1024 * 1024,
+                            max_concurrency=10, use_threads=True):
+        """
+        Build a TransferConfig for upload/download
+        :param multipart_threshold: Files larger than this (bytes) use multipart transfers
+        :param multipart_chunksize: Part size in bytes
+        :param max_concurrency: Threads used per multipart file
+        """
+        return TransferConfig(
+            multipart_threshold=multipart_threshold,
+            multipart_chunksize=multipart_chunksize,
+            max_concurrency=max_concurrency,
+            use_threads=use_threads,
+        )
+
+    @classmethod
+    def upload_file(cls, s3_client, file_path, bucket, s3_key, transfer_config=None):
         """
         Upload a file to S3 bucket
         :param s3_client: Active S3 client
         :param file_path: Local path of the file
         :param bucket: S3 bucket name
         :param s3_key: S3 object key (path in bucket)
+        :param transfer_config: Optional TransferConfig (see get_transfer_config)
         """
         try:
-            s3_client.upload_file(file_path, bucket, s3_key)
+            s3_client.upload_file(file_path, bucket, s3_key, Config=transfer_config)
             logger.info(f"Successfully uploaded {file_path} to {bucket}/{s3_key}")
             return True
         except ClientError as e:
@@ -115,17 +329,18 @@ class s3_operations_manager:
             return False
 
     @classmethod
-    def download_file(cls, s3_client, bucket, s3_key, local_path):
+    def download_file(cls, s3_client, bucket, s3_key, local_path, transfer_config=None):
         """
         Download a file from S3 bucket
         :param s3_client: Active S3 client
         :param bucket: S3 bucket name
         :param s3_key: S3 object key (path in bucket)
         :param local_path: Local path to save the file
+        :param transfer_config: Optional TransferConfig (see get_transfer_config)
         """
         try:
             os.makedirs(os.path.dirname(local_path), exist_ok=True)
-            s3_client.download_file(bucket, s3_key, local_path)
+            s3_client.download_file(bucket, s3_key, local_path, Config=transfer_config)
             logger.info(f" \n Successfully downloaded {bucket}/{s3_key} to {local_path}")
             return True
         except ClientError as e:
@@ -149,21 +364,356 @@ class s3_operations_manager:
             return None
 
     @classmethod
-    def list_files(cls, s3_client, bucket, prefix=''):
+    def _get_object_body(cls, s3_client, bucket, s3_key, byte_range=None):
+        params = {'Bucket': bucket, 'Key': s3_key}
+        if byte_range:
+            params['Range'] = byte_range
+        return s3_client.get_object(**params)
+
+    @classmethod
+    def iter_file_chunks(cls, s3_client, bucket, s3_key, chunk_size=1024 * 1024):
         """
-        List files in S3 bucket with given prefix
+        Stream a file from S3 bucket as bytes chunks, without loading it into memory
         :param s3_client: Active S3 client
         :param bucket: S3 bucket name
-        :param prefix: Prefix to filter files
-        :return: List of file keys
+        :param s3_key: S3 object key (path in bucket)
+        :param chunk_size: Bytes per chunk
         """
         try:
-            response = s3_client.list_objects_v2(Bucket=bucket, Prefix=prefix)
-            return [obj['Key'] for obj in response.get('Contents', [])]
+            body = cls._get_object_body(s3_client, bucket, s3_key)['Body']
+            try:
+                yield from body.iter_chunks(chunk_size)
+            finally:
+                body.close()
         except ClientError as e:
-            logger.info(f"Error listing files: {e}")
-            return []
-        
+            logger.info(f"Error reading file: {e}")
+
+    @classmethod
+    def iter_file_lines(cls, s3_client, bucket, s3_key, encoding='utf-8', chunk_size=1024 * 1024):
+        """
+        Stream a text file from S3 bucket line by line
+        :param s3_client: Active S3 client
+        :param bucket: S3 bucket name
+        :param s3_key: S3 object key (path in bucket)
+        :param encoding: Text encoding of the file
+        :param chunk_size: Bytes read from the network per chunk
+        """
+        try:
+            body = cls._get_object_body(s3_client, bucket, s3_key)['Body']
+            try:
+                for line in body.iter_lines(chunk_size):
+                    yield line.decode(encoding)
+            finally:
+                body.close()
+        except ClientError as e:
+            logger.info(f"Error reading file: {e}")
+
+    @classmethod
+    def read_file_range(cls, s3_client, bucket, s3_key, start, end=None):
+        """
+        Read a byte range of a file from S3 bucket
+        :param s3_client: Active S3 client
+        :param bucket: S3 bucket name
+        :param s3_key: S3 object key (path in bucket)
+        :param start: First byte offset
+        :param end: Last byte offset (inclusive); None reads to the end of the file
+        :return: Bytes of the range, or None on error
+        """
+        try:
+            byte_range = f"bytes={start}-{'' if end is None else end}"
+            return cls._get_object_body(s3_client, bucket, s3_key, byte_range)['Body'].read()
+        except ClientError as e:
+            logger.info(f"Error reading file range: {e}")
+            return None
+
+    @classmethod
+    def read_file_header_line(cls, s3_client, bucket, s3_key, encoding='utf-8', probe_size=64 * 1024):
+        """
+        Read only the first line (e.g. the CSV header row) of a file from S3 bucket
+        :return: First line as string (the whole file when it has no newline), or None on error
+        """
+        start, head = 0, b''
+        while True:
+            try:
+                response = cls._get_object_body(s3_client, bucket, s3_key,
+                                                 f"bytes={start}-{start + probe_size - 1}")
+            except ClientError as e:
+                if e.response.get('Error', {}).get('Code') != 'InvalidRange':
+                    logger.info(f"Error reading file range: {e}")
+                    return None
+                # The range starts at the end of the file (e.g. an empty file): head is the whole file
+                break
+            data = response['Body'].read()
+            head += data
+            if b'\n' in data:
+                break
+            # Stop at a short read or at the object size from Content-Range ("bytes 0-99/1234")
+            object_size = int(response.get('ContentRange', '').rpartition('/')[2] or len(head))
+            if len(data) < probe_size or start + len(data) >= object_size:
+                break
+            start += len(data)
+        newline = head.find(b'\n')
+        return (head if newline == -1 else head[:newline]).decode(encoding).rstrip('\r')
+
+    @classmethod
+    def read_file_into_buffer(cls, s3_client, bucket, s3_key, buffer=None, chunk_size=8 * 1024 * 1024):
+        """
+        Read a file from S3 bucket into a preallocated buffer, without the extra
+        bytes and str copies made by read_file_content
+        :param s3_client: Active S3 client
+        :param bucket: S3 bucket name
+        :param s3_key: S3 object key (path in bucket)
+        :param buffer: Optional writable buffer (e.g. a reused bytearray) at least as large as the file
+        :param chunk_size: Bytes read per call
+        :return: memoryview over the file content, or None on error
+        """
+        try:
+            response = cls._get_object_body(s3_client, bucket, s3_key)
+            size = response['ContentLength']
+            if buffer is None:
+                buffer = bytearray(size)
+            view = memoryview(buffer)
+            if len(view) < size:
+                raise ValueError(f"Buffer of {len(view)} bytes is too small for {size} bytes")
+
+            body = response['Body']
+            readinto = getattr(body, 'readinto', None)
+            offset = 0
+            try:
+                while offset < size:
+                    if readinto is not None:
+                        read = readinto(view[offset:offset + chunk_size])
+                    else:
+                        chunk = body.read(min(chunk_size, size - offset))
+                        read = len(chunk)
+                        view[offset:offset + read] = chunk
+                    if not read:
+                        break
+                    offset += read
+            finally:
+                body.close()
+            return view[:offset]
+        except ClientError as e:
+            logger.info(f"Error reading file: {e}")
+            return None
+
+    @classmethod
+    def read_csv_in_chunks(cls, s3_client, bucket, s3_key, chunksize=100000, **read_csv_kwargs):
+        """
+        Stream a CSV file (e.g. an Athena result) from S3 bucket as DataFrames of
+        at most chunksize rows, keeping memory bounded regardless of file size
+        :param read_csv_kwargs: Passed to pandas.read_csv (dtype, usecols, ...)
+        """
+        try:
+            body = cls._get_object_body(s3_client, bucket, s3_key)['Body']
+            try:
+                yield from pd.read_csv(body, chunksize=chunksize, **read_csv_kwargs)
+            finally:
+                body.close()
+        except ClientError as e:
+            logger.info(f"Error reading file: {e}")
+
+    @classmethod
+    def iter_csv_record_batches(cls, s3_client, bucket, s3_key, block_size=16 * 1024 * 1024):
+        """
+        Stream a CSV file from S3 bucket as pyarrow RecordBatches (needs the optional pyarrow package)
+        :param block_size: Bytes parsed per batch
+        """
+        try:
+            import pyarrow as pa
+            from pyarrow import csv as pa_csv
+        except ImportError as e:
+            raise ImportError("iter_csv_record_batches needs pyarrow: pip install pyarrow") from e
+
+        try:
+            body = cls._get_object_body(s3_client, bucket, s3_key)['Body']
+            try:
+                reader = pa_csv.open_csv(pa.PythonFile(body, mode='r'),
+                                         read_options=pa_csv.ReadOptions(block_size=block_size))
+                yield from reader
+            finally:
+                body.close()
+        except ClientError as e:
+            logger.info(f"Error reading file: {e}")
+
+    @classmethod
+    def _list_page_keys(cls, s3_client, bucket, prefix, delimiter=None, page_size=1000):
+        """
+        Page through list_objects_v2, returning (keys, common_prefixes) for the prefix.
+        """
+        params = {'Bucket': bucket, 'Prefix': prefix, 'PaginationConfig': {'PageSize': page_size}}
+        if delimiter:
+            params['Delimiter'] = delimiter
+        keys, common_prefixes = [], []
+        for page in s3_client.get_paginator('list_objects_v2').paginate(**params):
+            keys.extend(obj['Key'] for obj in page.get('Contents', []))
+            common_prefixes.extend(cp['Prefix'] for cp in page.get('CommonPrefixes', []))
+        return keys, common_prefixes
+
+    @classmethod
+    def iter_files(cls, s3_client, bucket, prefix='', delimiter=None, fan_out=False, page_size=1000,
+                   raise_errors=False):
+        """
+        Yield every file key under a prefix, following continuation tokens
+        :param s3_client: Active S3 client
+        :param bucket: S3 bucket name
+        :param prefix: Prefix to filter files
+        :param delimiter: Optional delimiter (e.g. '/'); without fan_out only keys directly
+                          under the prefix are yielded
+        :param fan_out: List the sub-prefixes found with the delimiter (default '/') in
+                        parallel on the shared transfer pool and yield their keys as well
+        :param page_size: Keys requested per list_objects_v2 call (max 1000)
+        :param raise_errors: Raise listing errors instead of logging them and stopping, so an
+                             incomplete listing can't be mistaken for a complete one
+        """
+        try:
+            if not fan_out:
+                paginator = s3_client.get_paginator('list_objects_v2')
+                params = {'Bucket': bucket, 'Prefix': prefix, 'PaginationConfig': {'PageSize': page_size}}
+                if delimiter:
+                    params['Delimiter'] = delimiter
+                for page in paginator.paginate(**params):
+                    for obj in page.get('Contents', []):
+                        yield obj['Key']
+                return
+
+            keys, sub_prefixes = cls._list_page_keys(s3_client, bucket, prefix, delimiter or '/', page_size)
+            yield from keys
+            executor = cls.get_transfer_executor()
+            futures = [
+                executor.submit(cls._list_page_keys, s3_client, bucket, sub_prefix, None, page_size)
+                for sub_prefix in sub_prefixes
+            ]
+            for future in as_completed(futures):
+                yield from future.result()[0]
+        except (ClientError, BotoCoreError) as e:
+            if raise_errors:
+                raise
+            logger.info(f"Error listing files, the listing is incomplete: {e}")
+
+    @classmethod
+    def list_files(cls, s3_client, bucket, prefix='', delimiter=None, fan_out=False, raise_errors=False):
+        """
+        List files in S3 bucket with given prefix
+        :param s3_client: Active S3 client
+        :param bucket: S3 bucket name
+        :param prefix: Prefix to filter files
+        :param delimiter: Optional delimiter, see iter_files
+        :param fan_out: List sub-prefixes in parallel, see iter_files
+        :param raise_errors: Raise listing errors, see iter_files
+        :return: List of all file keys (not limited to the first 1,000)
+        """
+        return list(cls.iter_files(s3_client, bucket, prefix, delimiter=delimiter, fan_out=fan_out,
+                                   raise_errors=raise_errors))
+
+    @classmethod
+    def _run_bulk_transfer(cls, transfer, items, action):
+        """
+        Run transfer(item) -> bytes moved for every item on the shared pool and report aggregate throughput.
+        """
+        start = time.perf_counter()
+        executor = cls.get_transfer_executor()
+        futures = {executor.submit(transfer, item): item for item in items}
+        succeeded, failed, total_bytes = [], [], 0
+        for future in as_completed(futures):
+            item = futures[future]
+            try:
+                total_bytes += future.result()
+                succeeded.append(item)
+            except (ClientError, BotoCoreError, Boto3Error, OSError) as e:
+                logger.info(f"Error during bulk {action} of {item}: {e}")
+                failed.append(item)
+        seconds = time.perf_counter() - start
+        summary = {
+            "succeeded": succeeded,
+            "failed": failed,
+            "bytes": total_bytes,
+            "seconds": round(seconds, 3),
+            "throughput_mb_s": round(total_bytes / (1024 * 1024) / seconds, 2) if seconds else 0.0,
+        }
+        logger.info(f"Bulk {action}: {len(succeeded)} succeeded, {len(failed)} failed, "
+                    f"{total_bytes} bytes in {summary['seconds']}s ({summary['throughput_mb_s']} MB/s)")
+        return summary
+
+    @classmethod
+    def bulk_upload_files(cls, s3_client, files, bucket, transfer_config=None):
+        """
+        Upload many files in parallel on the shared transfer pool
+        :param s3_client: Active S3 client
+        :param files: Iterable of (file_path, s3_key) tuples
+        :param bucket: S3 bucket name
+        :param transfer_config: Optional TransferConfig (see get_transfer_config)
+        :return: Dict with succeeded/failed items, bytes, seconds and throughput_mb_s
+        """
+        transfer_config = transfer_config or cls.get_transfer_config()
+
+        def upload(item):
+            file_path, s3_key = item
+            s3_client.upload_file(file_path, bucket, s3_key, Config=transfer_config)
+            return os.path.getsize(file_path)
+
+        return cls._run_bulk_transfer(upload, list(files), "upload")
+
+    @classmethod
+    def bulk_download_files(cls, s3_client, bucket, files, transfer_config=None):
+        """
+        Download many files in parallel on the shared transfer pool
+        :param s3_client: Active S3 client
+        :param bucket: S3 bucket name
+        :param files: Iterable of (s3_key, local_path) tuples
+        :param transfer_config: Optional TransferConfig (see get_transfer_config)
+        :return: Dict with succeeded/failed items, bytes, seconds and throughput_mb_s
+        """
+        transfer_config = transfer_config or cls.get_transfer_config()
+
+        def download(item):
+            s3_key, local_path = item
+            os.makedirs(os.path.dirname(local_path) or '.', exist_ok=True)
+            s3_client.download_file(bucket, s3_key, local_path, Config=transfer_config)
+            return os.path.getsize(local_path)
+
+        return cls._run_bulk_transfer(download, list(files), "download")
+
+    @classmethod
+    def download_prefix(cls, s3_client, bucket, prefix, local_dir, transfer_config=None):
+        """
+        Download every file under a prefix into local_dir, keeping the key layout
+        :param prefix: Key prefix, treated as a folder ('results/run1' lists 'results/run1/')
+        :return: Same summary dict as bulk_download_files; keys that would resolve outside
+                 local_dir are not downloaded and are reported as failed
+        :raises ClientError/BotoCoreError: When the prefix can't be listed completely
+        """
+        # Without the trailing '/' the listing also returns siblings like 'results/run1_extra/x'
+        if prefix and not prefix.endswith('/'):
+            prefix += '/'
+        local_root = os.path.abspath(local_dir)
+        files, rejected = [], []
+        for s3_key in cls.iter_files(s3_client, bucket, prefix, fan_out=True, raise_errors=True):
+            if s3_key.endswith('/'):
+                continue
+            local_path = os.path.abspath(os.path.join(local_root, s3_key[len(prefix):]))
+            if os.path.commonpath([local_root, local_path]) != local_root or local_path == local_root:
+                logger.info(f"Skipping {s3_key}: it resolves outside {local_dir}")
+                rejected.append((s3_key, local_path))
+                continue
+            files.append((s3_key, local_path))
+        summary = cls.bulk_download_files(s3_client, bucket, files, transfer_config)
+        summary["failed"].extend(rejected)
+        return summary
+
+    @classmethod
+    def create_multipart_stream(cls, s3_client, bucket, s3_key, part_size=8 * 1024 * 1024, max_in_flight_parts=4):
+        """
+        Open a writable stream that uploads to S3 with a multipart upload while data is written
+        :param s3_client: Active S3 client
+        :param bucket: S3 bucket name
+        :param s3_key: S3 object key (path in bucket)
+        :param part_size: Bytes per uploaded part (at least 5 MiB)
+        :param max_in_flight_parts: Parts uploaded concurrently before write() blocks
+        :return: s3_multipart_stream; call close() to complete the object
+        """
+        return s3_multipart_stream(s3_client, bucket, s3_key, part_size, max_in_flight_parts)
+
     @classmethod
     def generate_presigned_url(cls, s3_client, bucket, s3_key, expiration=3600):
         """
@@ -202,12 +752,166 @@ class s3_operations_manager:
     # s3_operations_manager.upload_file(s3_client, 'local_file.txt', 'my-bucket', 'path/in/s3/file.txt')
     # s3_operations_manager.download_file(s3_client, 'my-bucket', 'path/in/s3/file.txt', 'downloaded_file.txt')
     # content = s3_operations_manager.read_file_content(s3_client, 'my-bucket', 'path/in/s3/file.txt')
+    # header = s3_operations_manager.read_file_header_line(s3_client, 'my-bucket', 'athena/result.csv')
+    # for df_chunk in s3_operations_manager.read_csv_in_chunks(s3_client, 'my-bucket', 'athena/result.csv', dtype=str):
+    #     validate(df_chunk)
     # files = s3_operations_manager.list_files(s3_client, 'my-bucket', 'path/in/s3/')
+    # for s3_key in s3_operations_manager.iter_files(s3_client, 'my-bucket', 'results/', fan_out=True):
+    #     print(s3_key)
+    # s3_operations_manager.bulk_upload_files(s3_client, [('a.csv', 'results/a.csv'), ('b.csv', 'results/b.csv')], 'my-bucket')
+    # with s3_operations_manager.create_multipart_stream(s3_client, 'my-bucket', 'results/run.jsonl') as stream:
+    #     stream.write(b'{"test_case_id": "TC_1"}\n')
+
+
+class s3_multipart_stream:
+    """
+    Write-only stream to one S3 object, uploaded part by part as data arrives.
+
+    Parts are uploaded on the shared transfer pool of s3_operations_manager, at
+    most max_in_flight_parts at a time, so memory stays bounded by roughly
+    (max_in_flight_parts + 1) * part_size. Objects smaller than one part are
+    sent with a single put_object on close(). The object only becomes visible
+    once close() completes the upload; on error the upload is aborted.
+    """
+
+    # S3 rejects parts smaller than 5 MiB, except the last one
+    MIN_PART_SIZE = 5 * 1024 * 1024
+
+    def __init__(self, s3_client, bucket, s3_key, part_size=8 * 1024 * 1024, max_in_flight_parts=4):
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.s3_key = s3_key
+        self.part_size = max(part_size, self.MIN_PART_SIZE)
+        self.max_in_flight_parts = max(1, max_in_flight_parts)
+        self.upload_id = None
+        self.bytes_written = 0
+        self.closed = False
+        self._buffer = bytearray()
+        self._part_futures = []
+
+    def write(self, data):
+        """
+        Buffer data and upload every full part
+        :param data: bytes, or str encoded as UTF-8
+        :return: Number of bytes written
+        """
+        if self.closed:
+            raise ValueError(f"Write to closed S3 stream s3://{self.bucket}/{self.s3_key}")
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        self._buffer += data
+        self.bytes_written += len(data)
+        while len(self._buffer) >= self.part_size:
+            part = bytes(self._buffer[:self.part_size])
+            del self._buffer[:self.part_size]
+            self._upload_part(part)
+        return len(data)
+
+    def _upload_part(self, body):
+        if self.upload_id is None:
+            response = self.s3_client.create_multipart_upload(Bucket=self.bucket, Key=self.s3_key)
+            self.upload_id = response['UploadId']
+        # Keep memory bounded: wait for the part submitted max_in_flight_parts parts ago
+        if len(self._part_futures) >= self.max_in_flight_parts:
+            self._part_futures[-self.max_in_flight_parts].result()
+        future = s3_operations_manager.get_transfer_executor().submit(
+            self.s3_client.upload_part, Bucket=self.bucket, Key=self.s3_key, UploadId=self.upload_id,
+            PartNumber=len(self._part_futures) + 1, Body=body)
+        self._part_futures.append(future)
+
+    def close(self):
+        """
+        Upload the remaining data and complete the object
+        """
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            if self.upload_id is None:
+                self.s3_client.put_object(Bucket=self.bucket, Key=self.s3_key, Body=bytes(self._buffer))
+            else:
+                if self._buffer:
+                    self._upload_part(bytes(self._buffer))
+                parts = [
+                    {'ETag': future.result()['ETag'], 'PartNumber': part_number}
+                    for part_number, future in enumerate(self._part_futures, start=1)
+                ]
+                self.s3_client.complete_multipart_upload(Bucket=self.bucket, Key=self.s3_key, UploadId=self.upload_id,
+                                                         MultipartUpload={'Parts': parts})
+            logger.info(f"Uploaded {self.bytes_written} bytes to {self.bucket}/{self.s3_key}")
+        except (ClientError, Boto3Error):
+            self.abort()
+            raise
+        finally:
+            self._buffer = bytearray()
+
+    def abort(self):
+        """
+        Abort the multipart upload and drop any buffered data
+        """
+        self.closed = True
+        self._buffer = bytearray()
+        if self.upload_id is None:
+            return
+        for future in self._part_futures:
+            future.exception()
+        try:
+            self.s3_client.abort_multipart_upload(Bucket=self.bucket, Key=self.s3_key, UploadId=self.upload_id)
+            logger.info(f"Aborted multipart upload to {self.bucket}/{self.s3_key}")
+        except ClientError as e:
+            logger.info(f"Error aborting multipart upload: {e}")
+        self.upload_id = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
 
 class athena_operations_manager:
     # Dictionary to store active operations
     operations = {}
 
+    FINAL_STATES = ('SUCCEEDED', 'FAILED', 'CANCELLED')
+
+    # Overall deadline in seconds of iter_query_completions when no timeout is given
+    DEFAULT_QUERIES_TIMEOUT = 30 * 60
+    # Polls in a row a query may come back unprocessed (or fail) before it is reported as 'ERROR'
+    MAX_UNPROCESSED_POLLS = 5
+
+    # Python converters for Athena column types (anything else stays a string)
+    COLUMN_TYPE_CONVERTERS = {
+        'boolean': lambda value: value == 'true',
+        'tinyint': int,
+        'smallint': int,
+        'integer': int,
+        'bigint': int,
+        'float': float,
+        'real': float,
+        'double': float,
+        'decimal': Decimal,
+    }
+    # NumPy dtypes for as_numpy results; integer/boolean columns with NULLs fall back to float64/object
+    COLUMN_TYPE_DTYPES = {
+        'boolean': np.bool_,
+        'tinyint': np.int64,
+        'smallint': np.int64,
+        'integer': np.int64,
+        'bigint': np.int64,
+        'float': np.float64,
+        'real': np.float64,
+        'double': np.float64,
+    }
+    # Maximum number of IDs accepted by batch_get_query_execution
+    BATCH_GET_QUERY_EXECUTION_LIMIT = 50
+    # Maximum length of an Athena query string
+    MAX_QUERY_LENGTH = 262144
+
     @classmethod
     def execute_query(cls, athena_client, query, database, s3_output):
         """
@@ -260,21 +964,392 @@ class athena_operations_manager:
             return None
 
     @classmethod
-    def wait_for_query_completion(cls, athena_client, query_execution_id, check_interval=2):
+    def wait_for_query_completion(cls, athena_client, query_execution_id, check_interval=2, timeout=None):
         """
         Wait for query to complete
         :param athena_client: Active Athena client
         :param query_execution_id: ID of the query execution
         :param check_interval: Time between status checks in seconds
-        :return: Final query status
+        :param timeout: Optional maximum wait in seconds
+        :return: Final query status, or 'TIMEOUT' when the timeout is reached first
         """
+        deadline = None if timeout is None else time.monotonic() + timeout
         while True:
             status = cls.check_query_status(athena_client, query_execution_id)
-            if status in ['SUCCEEDED', 'FAILED', 'CANCELLED']:
+            if status in cls.FINAL_STATES:
                 return status
+            if deadline is not None and time.monotonic() >= deadline:
+                logger.info(f"Athena query {query_execution_id} did not finish within {timeout}s")
+                return 'TIMEOUT'
             logger.info("Athena Query is still running...")
             time.sleep(check_interval)
 
+    @classmethod
+    def execute_queries(cls, athena_client, queries, database, s3_output, max_workers=8):
+        """
+        Submit many queries at once
+        :param athena_client: Active Athena client
+        :param queries: List of SQL queries
+        :param database: Database name
+        :param s3_output: S3 location for query results
+        :param max_workers: Number of concurrent start_query_execution calls
+        :return: List of query execution IDs in the order of queries (None where submission failed)
+        """
+        if not queries:
+            return []
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(queries))) as executor:
+            return list(executor.map(lambda query: cls.execute_query(athena_client, query, database, s3_output), queries))
+
+    @classmethod
+    def _batch_query_states(cls, athena_client, query_execution_ids):
+        """
+        Get the states of up to 50 queries with one batch_get_query_execution call
+        :return: Dict of query execution ID to state (unprocessed IDs are left out)
+        """
+        try:
+            response = athena_client.batch_get_query_execution(QueryExecutionIds=query_execution_ids)
+        except ClientError as e:
+            logger.info(f"Error checking query statuses: {e}")
+            return {}
+        for unprocessed in response.get('UnprocessedQueryExecutionIds', []):
+            logger.info(f"Athena query {unprocessed.get('QueryExecutionId')} was not processed: "
+                        f"{unprocessed.get('ErrorCode')} {unprocessed.get('ErrorMessage')}")
+        return {
+            execution['QueryExecutionId']: execution['Status']['State']
+            for execution in response.get('QueryExecutions', [])
+        }
+
+    @classmethod
+    def _poll_pending_queries(cls, athena_client, pending, unprocessed_polls):
+        finished = []
+        for chunk in _chunked(list(pending), cls.BATCH_GET_QUERY_EXECUTION_LIMIT):
+            states = cls._batch_query_states(athena_client, chunk)
+            for query_execution_id in chunk:
+                state = states.get(query_execution_id)
+                if state is None:
+                    # Unprocessed or failed lookups are retried a few times, then reported instead of re-polled forever
+                    unprocessed_polls[query_execution_id] = unprocessed_polls.get(query_execution_id, 0) + 1
+                    if unprocessed_polls[query_execution_id] >= cls.MAX_UNPROCESSED_POLLS:
+                        logger.info(f"Giving up on Athena query {query_execution_id}: "
+                                    f"no status after {cls.MAX_UNPROCESSED_POLLS} polls")
+                        pending.discard(query_execution_id)
+                        finished.append((query_execution_id, 'ERROR'))
+                    continue
+                unprocessed_polls.pop(query_execution_id, None)
+                if state in cls.FINAL_STATES:
+                    pending.discard(query_execution_id)
+                    finished.append((query_execution_id, state))
+        return finished
+
+    @classmethod
+    def _timed_out_queries(cls, athena_client, pending, cancel_on_timeout):
+        timed_out = []
+        for query_execution_id in sorted(pending):
+            if cancel_on_timeout:
+                try:
+                    athena_client.stop_query_execution(QueryExecutionId=query_execution_id)
+                except ClientError as e:
+                    logger.info(f"Error cancelling query {query_execution_id}: {e}")
+            timed_out.append((query_execution_id, 'TIMEOUT'))
+        logger.info(f"{len(timed_out)} Athena queries did not finish before the deadline")
+        pending.clear()
+        return timed_out
+
+    @classmethod
+    def iter_query_completions(cls, athena_client, query_execution_ids, timeout=DEFAULT_QUERIES_TIMEOUT,
+                               initial_interval=0.5, max_interval=5, backoff_factor=1.5, cancel_on_timeout=False):
+        """
+        Poll many queries together and yield each one as soon as it finishes
+        :param athena_client: Active Athena client
+        :param query_execution_ids: Query execution IDs to wait for
+        :param timeout: Overall deadline in seconds for all queries (DEFAULT_QUERIES_TIMEOUT);
+                        None waits without a deadline
+        :param initial_interval: First delay between polls in seconds
+        :param max_interval: Upper bound of the exponential poll delay
+        :param backoff_factor: Growth factor of the poll delay
+        :param cancel_on_timeout: Stop the queries still running at the deadline
+        :return: Generator of (query_execution_id, state); queries still running at
+                 the deadline are yielded with state 'TIMEOUT', queries whose status
+                 can't be read after MAX_UNPROCESSED_POLLS polls with state 'ERROR'
+        """
+        pending = {query_execution_id for query_execution_id in query_execution_ids if query_execution_id}
+        deadline = None if timeout is None else time.monotonic() + timeout
+        interval = initial_interval
+        unprocessed_polls = {}
+        while pending:
+            yield from cls._poll_pending_queries(athena_client, pending, unprocessed_polls)
+            if not pending:
+                return
+            if deadline is not None and time.monotonic() >= deadline:
+                yield from cls._timed_out_queries(athena_client, pending, cancel_on_timeout)
+                return
+            sleep_time = interval if deadline is None else min(interval, max(0, deadline - time.monotonic()))
+            time.sleep(sleep_time)
+            interval = min(max_interval, interval * backoff_factor)
+
+    @classmethod
+    def wait_for_queries_completion(cls, athena_client, query_execution_ids, timeout=DEFAULT_QUERIES_TIMEOUT,
+                                    **poll_kwargs):
+        """
+        Wait for many queries at once; takes as long as the slowest query
+        :return: Dict of query execution ID to final state (or 'TIMEOUT'/'ERROR')
+        """
+        return dict(cls.iter_query_completions(athena_client, query_execution_ids, timeout=timeout, **poll_kwargs))
+
+    @classmethod
+    async def aiter_query_completions(cls, athena_client, query_execution_ids, timeout=DEFAULT_QUERIES_TIMEOUT,
+                                      initial_interval=0.5, max_interval=5, backoff_factor=1.5,
+                                      cancel_on_timeout=False):
+        """
+        Async version of iter_query_completions; boto3 calls run in the default
+        executor so the event loop keeps serving other work while queries run
+        :return: Async generator of (query_execution_id, state)
+        """
+        loop = asyncio.get_running_loop()
+        pending = {query_execution_id for query_execution_id in query_execution_ids if query_execution_id}
+        deadline = None if timeout is None else loop.time() + timeout
+        interval = initial_interval
+        unprocessed_polls = {}
+        while pending:
+            finished = await loop.run_in_executor(
+                None, cls._poll_pending_queries, athena_client, pending, unprocessed_polls)
+            for completion in finished:
+                yield completion
+            if not pending:
+                return
+            if deadline is not None and loop.time() >= deadline:
+                timed_out = await loop.run_in_executor(
+                    None, cls._timed_out_queries, athena_client, pending, cancel_on_timeout)
+                for completion in timed_out:
+                    yield completion
+                return
+            sleep_time = interval if deadline is None else min(interval, max(0, deadline - loop.time()))
+            await asyncio.sleep(sleep_time)
+            interval = min(max_interval, interval * backoff_factor)
+
+    @classmethod
+    def iter_query_result_pages(cls, athena_client, query_execution_id, page_size=1000, raise_errors=False):
+        """
+        Page through all results of a completed query, following NextToken
+        :param athena_client: Active Athena client
+        :param query_execution_id: ID of the query execution
+        :param page_size: Rows per get_query_results call (max 1000)
+        :param raise_errors: Raise errors instead of logging them and stopping with partial results
+        :return: Generator of ResultSet dicts
+        """
+        try:
+            paginator = athena_client.get_paginator('get_query_results')
+            for page in paginator.paginate(QueryExecutionId=query_execution_id,
+                                           PaginationConfig={'PageSize': page_size}):
+                yield page['ResultSet']
+        except ClientError as e:
+            if raise_errors:
+                raise
+            logger.info(f"Error getting query results: {e}")
+
+    @classmethod
+    def get_query_results_columnar(cls, athena_client, query_execution_id, as_numpy=False, page_size=1000,
+                                   raise_errors=False):
+        """
+        Get all results of a completed query as columns typed from ResultSetMetadata
+        :param athena_client: Active Athena client
+        :param query_execution_id: ID of the query execution
+        :param as_numpy: Return NumPy arrays instead of lists
+        :param page_size: Rows per get_query_results call (max 1000)
+        :param raise_errors: Raise errors instead of returning partial results
+        :return: Dict of column name to list (or NumPy array) of values; NULLs are None
+        """
+        columns, column_types, values = None, None, None
+        for result_set in cls.iter_query_result_pages(athena_client, query_execution_id, page_size, raise_errors):
+            rows = result_set.get('Rows', [])
+            if columns is None:
+                column_info = result_set['ResultSetMetadata']['ColumnInfo']
+                columns = [info['Name'] for info in column_info]
+                column_types = [info['Type'].lower() for info in column_info]
+                values = [[] for _ in columns]
+                # SELECT results repeat the column names as the first row of the first page
+                if rows and [cell.get('VarCharValue') for cell in rows[0]['Data']] == columns:
+                    rows = rows[1:]
+            for index, column_type in enumerate(column_types):
+                raw_values = [row['Data'][index].get('VarCharValue') for row in rows]
+                converter = cls.COLUMN_TYPE_CONVERTERS.get(column_type)
+                if converter is not None:
+                    raw_values = [None if value is None else converter(value) for value in raw_values]
+                values[index].extend(raw_values)
+
+        if columns is None:
+            return {}
+        if as_numpy:
+            return {
+                column: cls._to_numpy_column(column_values, column_type)
+                for column, column_type, column_values in zip(columns, column_types, values)
+            }
+        return dict(zip(columns, values))
+
+    @classmethod
+    def _to_numpy_column(cls, column_values, column_type):
+        dtype = cls.COLUMN_TYPE_DTYPES.get(column_type)
+        if dtype is None:
+            return np.array(column_values, dtype=object)
+        if any(value is None for value in column_values):
+            if dtype is np.bool_:
+                return np.array(column_values, dtype=object)
+            return np.array([np.nan if value is None else value for value in column_values], dtype=np.float64)
+        return np.array(column_values, dtype=dtype)
+
+    @classmethod
+    def get_query_results_df(cls, athena_client, query_execution_id, page_size=1000):
+        """
+        Get all results of a completed query as a pandas DataFrame built from columns
+        """
+        return pd.DataFrame(cls.get_query_results_columnar(athena_client, query_execution_id, as_numpy=True, page_size=page_size))
+
+    @classmethod
+    def get_query_output_location(cls, athena_client, query_execution_id):
+        """
+        Get the S3 bucket and key of the CSV file Athena wrote for a query
+        :return: (bucket, key) tuple, or None on error
+        """
+        try:
+            response = athena_client.get_query_execution(QueryExecutionId=query_execution_id)
+        except ClientError as e:
+            logger.info(f"Error getting query output location: {e}")
+            return None
+        output_location = response['QueryExecution']['ResultConfiguration']['OutputLocation']
+        bucket, _, key = output_location.replace('s3://', '', 1).partition('/')
+        return bucket, key
+
+    @classmethod
+    def read_query_results_from_s3(cls, athena_client, s3_client, query_execution_id, chunksize=100000, **read_csv_kwargs):
+        """
+        Stream the results of a completed query straight from its CSV in the S3
+        OutputLocation, skipping get_query_results; memory stays bounded by chunksize
+        :param athena_client: Active Athena client
+        :param s3_client: Active S3 client
+        :param query_execution_id: ID of the query execution
+        :param chunksize: Rows per DataFrame chunk
+        :param read_csv_kwargs: Passed to pandas.read_csv (dtype, usecols, ...)
+        :return: Generator of DataFrames
+        """
+        output_location = cls.get_query_output_location(athena_client, query_execution_id)
+        if output_location is None:
+            return
+        bucket, key = output_location
+        yield from s3_operations_manager.read_csv_in_chunks(s3_client, bucket, key, chunksize=chunksize, **read_csv_kwargs)
+
+    @classmethod
+    def _search_id_literal(cls, search_id, search_id_type):
+        if search_id_type == 'number' or (
+                search_id_type == 'auto' and isinstance(search_id, numbers.Number) and not isinstance(search_id, bool)):
+            literal = str(search_id)
+            # Only finite numbers go into the SQL unquoted
+            try:
+                is_number = Decimal(literal).is_finite()
+            except ArithmeticError:
+                is_number = False
+            if not is_number:
+                raise ValueError(f"Search id {search_id!r} is not a number")
+            return literal
+        return "'" + str(search_id).replace("'", "''") + "'"
+
+    @classmethod
+    def _build_in_list_chunks(cls, query_template, search_ids, chunk_size, max_query_length, search_id_type):
+        """Return (query, [search ids as str]) for each chunk of search ids."""
+        base_length = len(query_template.format(search_ids=''))
+        chunks, literals, chunk_ids, chunk_length = [], [], [], base_length
+        for key, search_id in _unique_search_id_values(search_ids).items():
+            literal = cls._search_id_literal(search_id, search_id_type)
+            # +2 for the ", " separator
+            if literals and (len(literals) >= chunk_size or chunk_length + len(literal) + 2 > max_query_length):
+                chunks.append((query_template.format(search_ids=', '.join(literals)), chunk_ids))
+                literals, chunk_ids, chunk_length = [], [], base_length
+            literals.append(literal)
+            chunk_ids.append(key)
+            chunk_length += len(literal) + 2
+        if literals:
+            chunks.append((query_template.format(search_ids=', '.join(literals)), chunk_ids))
+        return chunks
+
+    @classmethod
+    def build_in_list_queries(cls, query_template, search_ids, chunk_size=1000, max_query_length=MAX_QUERY_LENGTH,
+                              search_id_type='auto'):
+        """
+        Build one query per chunk of search ids from a template with a {search_ids} placeholder
+        :param query_template: SQL with an IN list placeholder, e.g. "SELECT * FROM t WHERE search_id IN ({search_ids})"
+        :param search_ids: Search ids to look up (empty and duplicate ids are dropped)
+        :param chunk_size: Maximum number of ids per query
+        :param max_query_length: Maximum length of each generated query
+        :param search_id_type: 'auto' (numbers unquoted, everything else quoted), 'string' or
+                               'number' (e.g. numeric strings read from Excel, for a bigint column)
+        :return: List of SQL queries
+        """
+        return [query for query, _ in cls._build_in_list_chunks(
+            query_template, search_ids, chunk_size, max_query_length, search_id_type)]
+
+    @classmethod
+    def batch_lookup_search_ids(cls, athena_client, query_template, search_ids, database, s3_output,
+                                search_id_column='search_id', chunk_size=1000, timeout=DEFAULT_QUERIES_TIMEOUT,
+                                max_workers=8, search_id_type='auto'):
+        """
+        Look up many search ids with a few IN-list queries run concurrently
+        :param athena_client: Active Athena client
+        :param query_template: SQL with a {search_ids} placeholder (see build_in_list_queries)
+        :param search_ids: Search ids to look up
+        :param database: Database name
+        :param s3_output: S3 location for query results
+        :param search_id_column: Result column holding the search id; it must be selected
+        :param chunk_size: Maximum number of ids per query
+        :param timeout: Overall deadline in seconds for all queries
+        :param max_workers: Number of concurrent submissions and result fetches
+        :param search_id_type: How ids are written in the IN list, see build_in_list_queries
+        :return: Tuple (rows_by_search_id, unresolved_search_ids). rows_by_search_id maps
+                 each found search id to its list of row dicts. unresolved_search_ids lists
+                 the ids whose query could not be submitted, failed, timed out or whose
+                 results could not be read; they are unknown, not missing.
+        :raises ValueError: When the results don't have search_id_column
+        """
+        chunks = cls._build_in_list_chunks(query_template, search_ids, chunk_size, cls.MAX_QUERY_LENGTH, search_id_type)
+        query_ids = cls.execute_queries(athena_client, [query for query, _ in chunks], database, s3_output, max_workers)
+        logger.info(f"Submitted {len(chunks)} Athena lookup queries for {len(_unique_search_ids(search_ids))} search ids")
+
+        chunk_ids_by_query = {}
+        unresolved = []
+        for query_id, (_, chunk_ids) in zip(query_ids, chunks):
+            if query_id is None:
+                unresolved.extend(chunk_ids)
+            else:
+                chunk_ids_by_query[query_id] = chunk_ids
+
+        results = {}
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # Fetch the results of each query as soon as it finishes, while the others keep running
+            futures = {}
+            for query_id, status in cls.iter_query_completions(athena_client, list(chunk_ids_by_query),
+                                                                timeout=timeout):
+                if status == 'SUCCEEDED':
+                    future = executor.submit(cls.get_query_results_columnar, athena_client, query_id,
+                                             raise_errors=True)
+                    futures[future] = query_id
+                else:
+                    logger.info(f"Athena lookup query {query_id} ended with status {status}")
+                    unresolved.extend(chunk_ids_by_query[query_id])
+            for future in as_completed(futures):
+                try:
+                    columns = future.result()
+                except (ClientError, BotoCoreError) as e:
+                    logger.info(f"Error reading results of Athena lookup query {futures[future]}: {e}")
+                    unresolved.extend(chunk_ids_by_query[futures[future]])
+                    continue
+                if columns and search_id_column not in columns:
+                    raise ValueError(f"Lookup results have no '{search_id_column}' column: {list(columns)}")
+                names = list(columns)
+                for row_values in zip(*columns.values()):
+                    row = dict(zip(names, row_values))
+                    results.setdefault(str(row[search_id_column]), []).append(row)
+        if unresolved:
+            logger.info(f"{len(unresolved)} search ids could not be looked up in Athena")
+        return results, unresolved
+
     @classmethod
     def format_query_results(cls, results):
         """
@@ -323,12 +1398,29 @@ class athena_operations_manager:
     # # Wait for completion
     # status = athena_operations_manager.wait_for_query_completion(athena_client, query_id)
 
+    # # Submit many queries and handle each one as soon as it finishes
+    # query_ids = athena_operations_manager.execute_queries(athena_client, queries, database, s3_output)
+    # for query_id, status in athena_operations_manager.iter_query_completions(athena_client, query_ids, timeout=600):
+    #     logger.info(f"{query_id} --> {status}")
+
     # if status == 'SUCCEEDED':
     #     # Get and format results
     #     results = athena_operations_manager.get_query_results(athena_client, query_id)
     #     formatted_results = athena_operations_manager.format_query_results(results)
     #     logger.info(formatted_results)
 
+    #     # All rows (not only the first 1,000) as typed columns
+    #     columns = athena_operations_manager.get_query_results_columnar(athena_client, query_id)
+
+    #     # Large results: read the CSV Athena already wrote to S3, in chunks
+    #     for df_chunk in athena_operations_manager.read_query_results_from_s3(athena_client, s3_client, query_id):
+    #         logger.info(len(df_chunk))
+
+    # # Verify many search ids with a handful of IN-list queries
+    # rows_by_search_id, unresolved_search_ids = athena_operations_manager.batch_lookup_search_ids(
+    #     athena_client, 'SELECT * FROM "fb_shipper_staging"."fb_offers_response" WHERE search_id IN ({search_ids})',
+    #     tc_search_ids, database, s3_output)
+
 
     # # Close all clients
     # aws_clien_manager.close_all_clients()
@@ -339,6 +1431,134 @@ class dynamodb_operations_manager:
     # Dictionary to store active operations
     operations = {}
 
+    # Maximum number of keys accepted by batch_get_item
+    BATCH_GET_ITEM_LIMIT = 100
+    # Guards consumed_capacity dicts shared by parallel scan segments
+    _capacity_lock = threading.Lock()
+    # Type tags whose wire value is already the Python value (numbers are parsed per column)
+    SCALAR_TYPE_TAGS = ('S', 'N', 'BOOL', 'B')
+
+    @classmethod
+    def _batch_get_chunk(cls, dynamodb_client, table_name, keys, request_options, max_retries):
+        """
+        Get up to 100 items with batch_get_item, retrying UnprocessedKeys with jittered backoff
+        :return: Tuple (items found, keys that could not be read)
+        """
+        items = []
+        request_items = {table_name: {'Keys': keys, **request_options}}
+        attempt = 0
+        while request_items:
+            try:
+                response = dynamodb_client.batch_get_item(RequestItems=request_items)
+            except (ClientError, BotoCoreError) as e:
+                logger.info(f"Error batch getting items: {e}")
+                return items, request_items[table_name]['Keys']
+            items.extend(response.get('Responses', {}).get(table_name, []))
+            request_items = response.get('UnprocessedKeys') or {}
+            if request_items:
+                if attempt >= max_retries:
+                    unprocessed = request_items.get(table_name, {}).get('Keys', [])
+                    logger.info(f"Giving up on {len(unprocessed)} unprocessed keys of {table_name} after {max_retries} retries")
+                    return items, unprocessed
+                time.sleep(random.uniform(0, min(5, 0.05 * (2 ** attempt))))
+                attempt += 1
+        return items, []
+
+    @classmethod
+    def batch_get_items(cls, dynamodb_client, table_name, keys, projection_expression=None,
+                        expression_attribute_names=None, consistent_read=False, max_workers=8, max_retries=8,
+                        unprocessed_keys=None):
+        """
+        Get many items by primary key with concurrent batch_get_item calls
+        :param dynamodb_client: Active DynamoDB client
+        :param table_name: Name of the DynamoDB table
+        :param keys: List of primary key dicts, e.g. [{'id': {'S': '1168'}}]
+        :param projection_expression: Optional attributes to return
+        :param expression_attribute_names: Names used in projection_expression
+        :param consistent_read: Use strongly consistent reads
+        :param max_workers: Number of concurrent batch_get_item chunks
+        :param max_retries: Retries of UnprocessedKeys per chunk
+        :param unprocessed_keys: Optional list, extended with the keys that could not be read
+                                 (errors or UnprocessedKeys left after max_retries)
+        :return: List of items found (in no particular order)
+        """
+        if not keys:
+            return []
+        request_options = {'ConsistentRead': consistent_read}
+        if projection_expression:
+            request_options['ProjectionExpression'] = projection_expression
+        if expression_attribute_names:
+            request_options['ExpressionAttributeNames'] = expression_attribute_names
+
+        chunks = _chunked(list(keys), cls.BATCH_GET_ITEM_LIMIT)
+        items = []
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(chunks))) as executor:
+            futures = [
+                executor.submit(cls._batch_get_chunk, dynamodb_client, table_name, chunk, request_options, max_retries)
+                for chunk in chunks
+            ]
+            for future in as_completed(futures):
+                chunk_items, chunk_unprocessed = future.result()
+                items.extend(chunk_items)
+                if unprocessed_keys is not None:
+                    unprocessed_keys.extend(chunk_unprocessed)
+        return items
+
+    @classmethod
+    def batch_lookup_search_ids(cls, dynamodb_client, table_name, search_ids, key_attribute='search_id',
+                                key_type='S', **batch_get_kwargs):
+        """
+        Look up many search ids stored as the partition key of a table
+        :param dynamodb_client: Active DynamoDB client
+        :param table_name: Name of the DynamoDB table
+        :param search_ids: Search ids to look up (empty and duplicate ids are dropped)
+        :param key_attribute: Partition key attribute holding the search id
+        :param key_type: DynamoDB type of the key attribute ('S' or 'N')
+        :param batch_get_kwargs: Passed to batch_get_items
+        :return: Tuple (items_by_search_id, unresolved_search_ids), both holding the search ids as
+                 passed in (e.g. int ids stay int). Ids not found are left out of items_by_search_id;
+                 unresolved_search_ids lists the ids that could not be read because of errors or
+                 unprocessed keys, so they are unknown, not missing.
+        :raises ValueError: When projection_expression doesn't return key_attribute, or an 'N' id
+                            is not a number
+        """
+        projection_expression = batch_get_kwargs.get('projection_expression')
+        if projection_expression:
+            attribute_names = batch_get_kwargs.get('expression_attribute_names') or {}
+            projected = {attribute_names.get(name.strip(), name.strip()) for name in projection_expression.split(',')}
+            if key_attribute not in projected:
+                raise ValueError(f"projection_expression must include the key attribute '{key_attribute}'")
+        # Requested and returned ids are compared in one canonical form: numbers by value
+        # ('12', 12 and 12.0 are the same 'N' key), everything else as str
+        def canonical(value):
+            if key_type != 'N':
+                return str(value)
+            try:
+                number = Decimal(str(value))
+            except ArithmeticError:
+                raise ValueError(f"Search id {value!r} is not a number")
+            if not number.is_finite():
+                raise ValueError(f"Search id {value!r} is not a number")
+            return number
+
+        search_ids_by_key = {}
+        for search_id in _unique_search_id_values(search_ids).values():
+            search_ids_by_key.setdefault(canonical(search_id), search_id)
+        keys = [{key_attribute: {key_type: str(search_id)}} for search_id in search_ids_by_key.values()]
+        unprocessed_keys = []
+        items = cls.batch_get_items(dynamodb_client, table_name, keys, unprocessed_keys=unprocessed_keys,
+                                    **batch_get_kwargs)
+        items_by_search_id = {}
+        for item in items:
+            if key_attribute not in item:
+                raise ValueError(f"Item returned by {table_name} has no '{key_attribute}' attribute")
+            key_value = canonical(item[key_attribute][key_type])
+            items_by_search_id[search_ids_by_key.get(key_value, item[key_attribute][key_type])] = item
+        unresolved = [search_ids_by_key[canonical(key[key_attribute][key_type])] for key in unprocessed_keys]
+        if unresolved:
+            logger.info(f"{len(unresolved)} search ids could not be looked up in {table_name}")
+        return items_by_search_id, unresolved
+
     @classmethod
     def get_item(cls, dynamodb_client, table_name, key):
         """
@@ -381,91 +1601,269 @@ class dynamodb_operations_manager:
 
 
     @classmethod
-    def query_table(cls, dynamodb_client, table_name, key_condition_expression, expression_attribute_values=None, filter_expression=None):
+    def _read_params(cls, table_name, filter_expression=None, expression_attribute_values=None,
+                     projection_expression=None, expression_attribute_names=None, index_name=None,
+                     consumed_capacity=None):
+        params = {'TableName': table_name}
+        if index_name:
+            params['IndexName'] = index_name
+        if filter_expression:
+            params['FilterExpression'] = filter_expression
+        if expression_attribute_values:
+            params['ExpressionAttributeValues'] = expression_attribute_values
+        if projection_expression:
+            params['ProjectionExpression'] = projection_expression
+        if expression_attribute_names:
+            params['ExpressionAttributeNames'] = expression_attribute_names
+        if consumed_capacity is not None:
+            params['ReturnConsumedCapacity'] = 'TOTAL'
+        return params
+
+    @classmethod
+    def _record_page(cls, consumed_capacity, response):
+        """Add the capacity units and item counts of one page to the consumed_capacity dict."""
+        if consumed_capacity is None:
+            return
+        with cls._capacity_lock:
+            consumed_capacity['CapacityUnits'] = (consumed_capacity.get('CapacityUnits', 0)
+                                                  + response.get('ConsumedCapacity', {}).get('CapacityUnits', 0))
+            consumed_capacity['Pages'] = consumed_capacity.get('Pages', 0) + 1
+            consumed_capacity['Count'] = consumed_capacity.get('Count', 0) + response.get('Count', 0)
+            consumed_capacity['ScannedCount'] = consumed_capacity.get('ScannedCount', 0) + response.get('ScannedCount', 0)
+
+    @classmethod
+    def _iter_pages(cls, read_page, params, page_size=None, limit=None, consumed_capacity=None):
+        # Follow LastEvaluatedKey until the table (or segment) is exhausted or limit items are yielded.
+        # DynamoDB applies Limit before the FilterExpression, so only page_size sets it; limit is counted here.
+        returned = 0
+        if page_size:
+            params['Limit'] = page_size
+        while True:
+            response = read_page(**params)
+            cls._record_page(consumed_capacity, response)
+            for item in response.get('Items', []):
+                yield item
+                returned += 1
+                if limit and returned >= limit:
+                    return
+            last_evaluated_key = response.get('LastEvaluatedKey')
+            if not last_evaluated_key:
+                return
+            params['ExclusiveStartKey'] = last_evaluated_key
+
+    @classmethod
+    def iter_query(cls, dynamodb_client, table_name, key_condition_expression, expression_attribute_values=None,
+                   filter_expression=None, projection_expression=None, expression_attribute_names=None,
+                   index_name=None, page_size=None, limit=None, consumed_capacity=None, raise_errors=True):
         """
-        Query items from DynamoDB table
+        Query items page by page, following LastEvaluatedKey
         :param dynamodb_client: Active DynamoDB client
         :param table_name: Name of the DynamoDB table
         :param key_condition_expression: Expression defining the query conditions
-        :param expression_attribute_values: Dictionary of values used in key condition expression
+        :param expression_attribute_values: Dictionary of values used in the expressions
         :param filter_expression: Optional filter expression for additional filtering
-        :return: List of items matching the query
+        :param projection_expression: Optional attributes to return, e.g. 'id, #st'
+        :param expression_attribute_names: Names used in the expressions, e.g. {'#st': 'status'}
+        :param index_name: Optional secondary index to query
+        :param page_size: Items evaluated per request (DynamoDB Limit)
+        :param limit: Maximum number of items to yield in total
+        :param consumed_capacity: Optional dict the read capacity units and item counts are added to
+        :param raise_errors: Raise errors (e.g. throttling on a later page) instead of logging them and
+                             stopping with partial results
+        :return: Generator of items
         """
+        params = cls._read_params(table_name, filter_expression, expression_attribute_values, projection_expression,
+                                  expression_attribute_names, index_name, consumed_capacity)
+        params['KeyConditionExpression'] = key_condition_expression
         try:
-            params = {
-                'TableName': table_name,
-                'KeyConditionExpression': key_condition_expression
-            }
-            if expression_attribute_values:
-                params['ExpressionAttributeValues'] = expression_attribute_values
-            if filter_expression:
-                params['FilterExpression'] = filter_expression
-
-            response = dynamodb_client.query(**params)
-            return response.get('Items', [])
-        except ClientError as e:
+            yield from cls._iter_pages(dynamodb_client.query, params, page_size, limit, consumed_capacity)
+        except (ClientError, BotoCoreError) as e:
             logger.info(f"Error querying table: {e}")
-            return []
+            if raise_errors:
+                raise
+
+    @classmethod
+    def iter_scan(cls, dynamodb_client, table_name, filter_expression=None, expression_attribute_values=None,
+                  projection_expression=None, expression_attribute_names=None, index_name=None, page_size=None,
+                  limit=None, segment=None, total_segments=None, consumed_capacity=None, raise_errors=True):
+        """
+        Scan items page by page, following LastEvaluatedKey
+        :param dynamodb_client: Active DynamoDB client
+        :param table_name: Name of the DynamoDB table
+        :param filter_expression: Expression defining the scan filter
+        :param expression_attribute_values: Dictionary of values used in the expressions
+        :param projection_expression: Optional attributes to return
+        :param expression_attribute_names: Names used in the expressions
+        :param index_name: Optional secondary index to scan
+        :param page_size: Items evaluated per request (DynamoDB Limit)
+        :param limit: Maximum number of items to yield in total
+        :param segment: Segment to scan when the table is scanned in parallel
+        :param total_segments: Number of parallel segments
+        :param consumed_capacity: Optional dict the read capacity units and item counts are added to
+        :param raise_errors: Raise errors (e.g. throttling on a later page) instead of logging them and
+                             stopping with partial results
+        :return: Generator of items
+        """
+        params = cls._read_params(table_name, filter_expression, expression_attribute_values, projection_expression,
+                                  expression_attribute_names, index_name, consumed_capacity)
+        if total_segments:
+            params['Segment'] = segment
+            params['TotalSegments'] = total_segments
+        try:
+            yield from cls._iter_pages(dynamodb_client.scan, params, page_size, limit, consumed_capacity)
+        except (ClientError, BotoCoreError) as e:
+            logger.info(f"Error scanning table: {e}")
+            if raise_errors:
+                raise
+
+    @classmethod
+    def parallel_scan(cls, dynamodb_client, table_name, total_segments=8, max_workers=None, **scan_kwargs):
+        """
+        Scan the whole table with total_segments Segment/TotalSegments scans run in a thread pool
+        :param dynamodb_client: Active DynamoDB client
+        :param table_name: Name of the DynamoDB table
+        :param total_segments: Number of segments the table is split into
+        :param max_workers: Number of concurrent segment scans (default: total_segments)
+        :param scan_kwargs: Passed to iter_scan (filter_expression, projection_expression, consumed_capacity, ...)
+        :return: List of items matching the scan (in no particular order)
+        :raises ClientError: When a segment fails, rather than returning the other segments' items
+        """
+        # A failed segment must not look like a smaller table
+        scan_kwargs['raise_errors'] = True
+
+        def scan_segment(segment):
+            return list(cls.iter_scan(dynamodb_client, table_name, segment=segment,
+                                      total_segments=total_segments, **scan_kwargs))
+
+        items = []
+        with ThreadPoolExecutor(max_workers=max_workers or total_segments) as executor:
+            for segment_items in executor.map(scan_segment, range(total_segments)):
+                items.extend(segment_items)
+        consumed_capacity = scan_kwargs.get('consumed_capacity')
+        if consumed_capacity is not None:
+            logger.info(f"Parallel scan of {table_name} over {total_segments} segments: {consumed_capacity}")
+        return items
+
+    @classmethod
+    def query_table(cls, dynamodb_client, table_name, key_condition_expression, expression_attribute_values=None,
+                    filter_expression=None, limit=None, **query_kwargs):
+        """
+        Query items from DynamoDB table, following all result pages
+        :param dynamodb_client: Active DynamoDB client
+        :param table_name: Name of the DynamoDB table
+        :param key_condition_expression: Expression defining the query conditions
+        :param expression_attribute_values: Dictionary of values used in key condition expression
+        :param filter_expression: Optional filter expression for additional filtering
+        :param limit: Maximum number of items to return
+        :param query_kwargs: Passed to iter_query (projection_expression, consumed_capacity, raise_errors, ...)
+        :return: List of items matching the query
+        """
+        items = list(cls.iter_query(dynamodb_client, table_name, key_condition_expression, expression_attribute_values,
+                                    filter_expression, limit=limit, **query_kwargs))
+        if query_kwargs.get('consumed_capacity') is not None:
+            logger.info(f"Query of {table_name}: {query_kwargs['consumed_capacity']}")
+        return items
 
     @classmethod
-    def scan_table(cls, dynamodb_client, table_name, filter_expression=None, expression_attribute_values=None, limit=None):
+    def scan_table(cls, dynamodb_client, table_name, filter_expression=None, expression_attribute_values=None, limit=None,
+                   **scan_kwargs):
         """
-        Scan items from DynamoDB table
+        Scan items from DynamoDB table, following all result pages
         :param dynamodb_client: Active DynamoDB client
         :param table_name: Name of the DynamoDB table
         :param filter_expression: Expression defining the scan filter
         :param expression_attribute_values: Dictionary of values used in filter expression
         :param limit: Maximum number of items to return
+        :param scan_kwargs: Passed to iter_scan (projection_expression, consumed_capacity, raise_errors, ...)
         :return: List of items matching the scan
         """
-        try:
-            params = {
-                'TableName': table_name
-            }
-            if filter_expression:
-                params['FilterExpression'] = filter_expression
-            if expression_attribute_values:
-                params['ExpressionAttributeValues'] = expression_attribute_values
-            if limit:
-                params['Limit'] = limit
-
-            response = dynamodb_client.scan(**params)
-            return response.get('Items', [])
-        except ClientError as e:
-            logger.info(f"Error scanning table: {e}")
-            return []
+        items = list(cls.iter_scan(dynamodb_client, table_name, filter_expression, expression_attribute_values,
+                                   limit=limit, **scan_kwargs))
+        if scan_kwargs.get('consumed_capacity') is not None:
+            logger.info(f"Scan of {table_name}: {scan_kwargs['consumed_capacity']}")
+        return items
+
+    @classmethod
+    def _convert_dynamodb_value(cls, value, use_decimal=False):
+        """
+        Convert one value from DynamoDB's typed wire format, e.g. {'N': '1.5'}, to Python
+        :param value: Single-key dict of type tag to value
+        :param use_decimal: Return numbers as Decimal instead of float
+        :return: Converted value; SS, NS and BS become sets
+        """
+        (type_tag, raw), = value.items()
+        if type_tag in ('S', 'BOOL', 'B'):
+            return raw
+        if type_tag == 'N':
+            return Decimal(raw) if use_decimal else float(raw)
+        if type_tag == 'NULL':
+            return None
+        if type_tag == 'M':
+            return {key: cls._convert_dynamodb_value(item, use_decimal) for key, item in raw.items()}
+        if type_tag == 'L':
+            return [cls._convert_dynamodb_value(item, use_decimal) for item in raw]
+        if type_tag == 'NS':
+            return {Decimal(item) if use_decimal else float(item) for item in raw}
+        if type_tag in ('SS', 'BS'):
+            return set(raw)
+        raise ValueError(f"Unsupported DynamoDB type '{type_tag}'")
 
     @classmethod
-    def query_results_to_df(cls, items):
+    def items_to_columns(cls, items, use_decimal=False):
+        """
+        Convert DynamoDB items to columns in one pass over the items
+        :param items: List of items from DynamoDB query/scan
+        :param use_decimal: Keep numbers as Decimal instead of float64
+        :return: Dict of attribute name to column values, in first-seen attribute order; missing
+                 attributes and NULLs are None, number columns are float64 arrays (NaN for None)
+        """
+        items = items if isinstance(items, list) else list(items)
+        item_count = len(items)
+        columns = {}
+        # Type tag of each scalar column, or None once a column needs the recursive converter
+        column_tags = {}
+        for row_index, item in enumerate(items):
+            for name, value in item.items():
+                try:
+                    columns[name][row_index] = value[column_tags[name]]
+                except KeyError:
+                    # New column, NULL value, or a value of another type than the column so far
+                    if name not in columns:
+                        columns[name] = [None] * item_count
+                    if 'NULL' in value:
+                        continue
+                    if name in column_tags:
+                        column_tags[name] = None
+                        continue
+                    type_tag = next(iter(value))
+                    if type_tag in cls.SCALAR_TYPE_TAGS:
+                        column_tags[name] = type_tag
+                        columns[name][row_index] = value[type_tag]
+                    else:
+                        column_tags[name] = None
+
+        for name, type_tag in column_tags.items():
+            if type_tag is None:
+                columns[name] = [
+                    cls._convert_dynamodb_value(item[name], use_decimal) if name in item else None for item in items
+                ]
+            elif type_tag == 'N':
+                if use_decimal:
+                    columns[name] = [None if value is None else Decimal(value) for value in columns[name]]
+                else:
+                    columns[name] = np.array(columns[name], dtype=np.float64)
+        return columns
+
+    @classmethod
+    def query_results_to_df(cls, items, use_decimal=False):
         """
         Convert DynamoDB query/scan results to pandas DataFrame
         :param items: List of items from DynamoDB query/scan
+        :param use_decimal: Keep numbers as Decimal instead of float64
         :return: pandas DataFrame containing the query results
         """
         try:
-            # Convert DynamoDB items to regular dictionaries
-            converted_items = []
-            for item in items:
-                converted_item = {}
-                for key, value in item.items():
-                    # Extract the value from DynamoDB's type format
-                    if 'S' in value:  # String
-                        converted_item[key] = value['S']
-                    elif 'N' in value:  # Number
-                        converted_item[key] = float(value['N'])
-                    elif 'BOOL' in value:  # Boolean
-                        converted_item[key] = value['BOOL']
-                    elif 'L' in value:  # List
-                        converted_item[key] = [cls._convert_dynamodb_value(v) for v in value['L']]
-                    elif 'M' in value:  # Map
-                        converted_item[key] = {k: cls._convert_dynamodb_value(v) for k, v in value['M'].items()}
-                    elif 'NULL' in value:  # Null
-                        converted_item[key] = None
-                converted_items.append(converted_item)
-            
-            # Create DataFrame
-            df = pd.DataFrame(converted_items)
-            return df
+            return pd.DataFrame(cls.items_to_columns(items, use_decimal))
         except Exception as e:
             logger.error(f"Error converting DynamoDB results to DataFrame: {str(e)}")
             return pd.DataFrame()
@@ -524,6 +1922,16 @@ class dynamodb_operations_manager:
     # for item in items:
     #     logger.info(item)
 
+    # # Example 4: Scan the whole table in 8 parallel segments, fetching only two attributes
+    # consumed_capacity = {}
+    # items = dynamodb_operations_manager.parallel_scan(
+    #     dynamodb_client, 'lookup', total_segments=8, projection_expression='#k, created_at',
+    #     expression_attribute_names={'#k': 'key'}, consumed_capacity=consumed_capacity)
+
+    # # Example 5: Verify many search ids with a few batch_get_item calls
+    # items_by_search_id, unresolved_search_ids = dynamodb_operations_manager.batch_lookup_search_ids(
+    #     dynamodb_client, 'lookup', dynamodb_query_tc_search_ids, key_attribute='key')
+
 
     # # Close all clients
     # aws_clien_manager.close_all_clients()
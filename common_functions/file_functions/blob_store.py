@@ -0,0 +1,116 @@
+import hashlib
+import os
+import tempfile
+import threading
+
+from common_functions.utils.logging_config import logger
+
+
+def get_content_sha256(data):
+    """
+    Hash a response body.
+
+    Args:
+        data (bytes): Content to hash.
+
+    Returns:
+        str: Hex SHA-256 digest, used as the blob name.
+    """
+    return hashlib.sha256(data).hexdigest()
+
+
+class LocalBlobStore:
+    """
+    Content-addressed blob store in a local directory.
+
+    Blobs are stored as ``<directory>/<sha256[:2]>/<sha256>``, so identical
+    bodies are written once no matter how many test cases return them.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _blob_path(self, sha256):
+        return os.path.join(self.directory, sha256[:2], sha256)
+
+    def put(self, data, sha256=None):
+        """
+        Store a blob unless it is already present.
+
+        Returns:
+            str: Local path of the blob.
+        """
+        sha256 = sha256 or get_content_sha256(data)
+        blob_path = self._blob_path(sha256)
+        if not os.path.exists(blob_path):
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(blob_path), suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, blob_path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+        return blob_path
+
+    def get(self, sha256):
+        """Read a blob back by its digest."""
+        with open(self._blob_path(sha256), "rb") as f:
+            return f.read()
+
+
+class S3BlobStore:
+    """
+    Content-addressed blob store under an S3 prefix.
+
+    Blobs are stored as ``<prefix>/<sha256[:2]>/<sha256>``. Digests already
+    uploaded (or found with head_object) in this process are remembered, so a
+    repeated body costs neither an upload nor a request.
+    """
+
+    def __init__(self, s3_client, bucket, prefix=""):
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.prefix = prefix.rstrip("/")
+        self._known_digests = set()
+        self._lock = threading.Lock()
+
+    def _blob_key(self, sha256):
+        blob_key = f"{sha256[:2]}/{sha256}"
+        return f"{self.prefix}/{blob_key}" if self.prefix else blob_key
+
+    def _exists(self, blob_key):
+        try:
+            self.s3_client.head_object(Bucket=self.bucket, Key=blob_key)
+            return True
+        except self.s3_client.exceptions.ClientError as e:
+            if e.response["Error"]["Code"] in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+
+    def put(self, data, sha256=None):
+        """
+        Upload a blob unless it is already present.
+
+        Returns:
+            str: ``s3://`` URI of the blob.
+        """
+        sha256 = sha256 or get_content_sha256(data)
+        blob_key = self._blob_key(sha256)
+        with self._lock:
+            known = sha256 in self._known_digests
+        if not known:
+            if not self._exists(blob_key):
+                self.s3_client.put_object(Bucket=self.bucket, Key=blob_key, Body=data)
+                logger.info(f"Stored response blob {sha256} ({len(data)} bytes) in s3://{self.bucket}/{blob_key}")
+            with self._lock:
+                self._known_digests.add(sha256)
+        return f"s3://{self.bucket}/{blob_key}"
+
+    def get(self, sha256):
+        """Read a blob back by its digest."""
+        response = self.s3_client.get_object(Bucket=self.bucket, Key=self._blob_key(sha256))
+        return response["Body"].read()
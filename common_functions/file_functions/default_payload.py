@@ -0,0 +1,114 @@
+import json
+import threading
+import weakref
+from types import MappingProxyType
+
+from common_functions.utils.logging_config import logger
+from common_functions.utils.payload_patch import freeze_payload, thaw_payload
+
+# Sheets holding the default payload of each api_name/environment
+DEFAULT_PAYLOAD_SHEET_NAMES = ("default_payload", "platform_api_default_payload")
+# Column of those sheets holding the payload as a JSON string
+DEFAULT_PAYLOAD_COLUMN = "default_api_payload"
+
+
+def get_default_payload_from_excel(excel_data, sheet_name):
+    # Extract providers field data from the Excel sheets
+
+    if sheet_name == "default_payload":
+
+        default_payload_sheet_data = excel_data[sheet_name]
+
+    elif sheet_name == "platform_api_default_payload":
+
+        default_payload_sheet_data = excel_data[sheet_name]
+
+    else:
+        logger.error(f" Sheet name --> {sheet_name} is not found")
+
+    return default_payload_sheet_data.to_dict('records')
+
+
+# Prebuilt (sheet_name, api_name, environment) --> payload indexes, one per loaded default payload sheet
+_default_payload_indexes = {}
+_default_payload_indexes_lock = threading.Lock()
+
+
+def _parse_payload_cell(value, index_key):
+    if not isinstance(value, str) or value == "nan":
+        return value
+    try:
+        return json.loads(value)
+    except ValueError as e:
+        # Left as the raw string, so the test cases using it fail as they did before
+        logger.error(f"Default payload of {index_key} is not valid JSON: {e}")
+        return value
+
+
+def build_default_payload_index(excel_data, sheet_name, payload_column=DEFAULT_PAYLOAD_COLUMN):
+    """
+    Build an immutable (sheet_name, api_name, environment) --> payload index for a default payload sheet.
+
+    The JSON in payload_column is parsed once here and the rows are frozen (see
+    freeze_payload), so test cases share one parsed template that they patch
+    with copy_on_write=True instead of running json.loads per test case. When a
+    sheet holds duplicate api_name/environment rows the first one wins,
+    matching the previous linear scan.
+    """
+    payload_index = {}
+    for payload in get_default_payload_from_excel(excel_data, sheet_name):
+        index_key = (sheet_name, payload['api_name'], payload['environment'])
+        if index_key not in payload_index:
+            if payload_column in payload:
+                payload[payload_column] = _parse_payload_cell(payload[payload_column], index_key)
+            payload_index[index_key] = freeze_payload(payload)
+    return MappingProxyType(payload_index)
+
+
+def get_default_payload_index(excel_data, sheet_name):
+    """
+    Get the payload index for a default payload sheet, building it once per loaded workbook.
+
+    The index is tied to the sheet's DataFrame and dropped when the DataFrame is
+    garbage collected, so reloading the workbook builds a fresh index.
+    """
+    sheet_data = excel_data[sheet_name]
+    index_key = (id(sheet_data), sheet_name)
+    payload_index = _default_payload_indexes.get(index_key)
+    if payload_index is None:
+        with _default_payload_indexes_lock:
+            payload_index = _default_payload_indexes.get(index_key)
+            if payload_index is None:
+                payload_index = build_default_payload_index(excel_data, sheet_name)
+                _default_payload_indexes[index_key] = payload_index
+                weakref.finalize(sheet_data, _default_payload_indexes.pop, index_key, None)
+    return payload_index
+
+
+def lookup_default_payload(api_name, excel_data, sheet_name, environment, deep_copy=True):
+    """
+    Get the default payload row of an api_name in an environment, with its
+    default_api_payload already parsed from JSON.
+
+    Args:
+        api_name (str): api_name of the row.
+        excel_data (dict): Loaded sheets, holding sheet_name.
+        sheet_name (str): One of DEFAULT_PAYLOAD_SHEET_NAMES.
+        environment (str): environment of the row, e.g. test_run_config["environment"].
+        deep_copy (bool): Return a mutable copy; False returns the shared, read-only
+            template (patch it with copy_on_write=True).
+
+    Returns:
+        dict: The payload row.
+
+    Raises:
+        ValueError: When the sheet is not a default payload sheet or has no such row.
+    """
+    if sheet_name not in DEFAULT_PAYLOAD_SHEET_NAMES:
+        raise ValueError(f"Sheet name '{sheet_name}' is not a default payload sheet")
+    default_payload = get_default_payload_index(excel_data, sheet_name).get((sheet_name, api_name, environment))
+    if default_payload is None:
+        raise ValueError(f"API name '{api_name}' not found in the default payload data for sheet '{sheet_name}'"
+                         f" and environment '{environment}'")
+    # Mutating the frozen template raises, so only deep copies are handed out as mutable payloads
+    return thaw_payload(default_payload) if deep_copy else default_payload
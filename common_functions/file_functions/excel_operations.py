@@ -2,16 +2,116 @@ import os
 import pandas as pd
 
 
-def multi_sheet_excel_reader(file_path):
-    excel_file = pd.ExcelFile(file_path)
-    sheets_dict = {}
-    for sheet_name in excel_file.sheet_names:
-        # Read the sheet and convert all columns to string type immediately
-        df = pd.read_excel(file_path, sheet_name=sheet_name)
-        sheets_dict[sheet_name] = df.astype(str)
+def _cast_columns_to_str(df, keep_dtypes=()):
+    """Cast every column not listed in keep_dtypes to str, one column at a time."""
+    for column in df.columns:
+        if column not in keep_dtypes:
+            df[column] = df[column].astype(str)
+    return df
+
+
+def _convert_read_only_cell(cell):
+    # Same conversion as pandas' openpyxl reader: empty -> "", errors -> NaN, whole floats -> int
+    if cell.value is None:
+        return ""
+    if cell.data_type == "e":
+        return float("nan")
+    if cell.data_type == "n":
+        value = int(cell.value)
+        return value if value == cell.value else float(cell.value)
+    return cell.value
+
+
+def _read_sheets_read_only(file_path, sheet_names, optional_sheet_names, dtype):
+    """Stream the requested sheets row by row with openpyxl's read-only mode."""
+    from openpyxl import load_workbook
+    from pandas.errors import EmptyDataError
+    from pandas.io.parsers import TextParser
+
+    workbook = load_workbook(file_path, read_only=True, data_only=True, keep_links=False)
+    try:
+        sheets_dict = {}
+        for sheet_name in _requested_sheet_names(workbook.sheetnames, sheet_names, optional_sheet_names):
+            sheet = workbook[sheet_name]
+            sheet.reset_dimensions()
+            data, blank_rows = [], []
+            for cells in sheet.iter_rows():
+                row = [_convert_read_only_cell(cell) for cell in cells]
+                while row and row[-1] == "":
+                    row.pop()
+                if not row:
+                    # Blank rows are kept only when more data follows, like pd.read_excel
+                    blank_rows.append(row)
+                    continue
+                data.extend(blank_rows)
+                blank_rows = []
+                data.append(row)
+            if data:
+                width = max(len(row) for row in data)
+                data = [row + [""] * (width - len(row)) for row in data]
+            try:
+                # The parser pandas uses for read_excel: it mangles duplicate headers
+                # ("col", "col.1") and infers the same column dtypes
+                parser = TextParser(data, header=0, dtype=dtype or None, skip_blank_lines=False)
+                sheets_dict[sheet_name] = parser.read()
+            except EmptyDataError:
+                sheets_dict[sheet_name] = pd.DataFrame()
+        return sheets_dict
+    finally:
+        workbook.close()
+
+
+def _requested_sheet_names(workbook_sheet_names, sheet_names, optional_sheet_names):
+    if not sheet_names:
+        return list(workbook_sheet_names)
+    # Missing optional sheets are skipped; missing required sheets raise in the reader
+    return [*sheet_names, *(name for name in optional_sheet_names
+                            if name in workbook_sheet_names and name not in sheet_names)]
+
+
+def load_workbook_sheets(file_path, sheet_names=None, dtype=None, cast_to_str=True,
+                         engine=None, read_only=False, optional_sheet_names=()):
+    """
+    Load sheets from an Excel workbook, parsing the file only once.
+
+    Args:
+        file_path (str): Path of the .xlsx workbook.
+        sheet_names (list, optional): Sheets to load, e.g. the tc sheet and the
+            default payload sheets. Defaults to every sheet in the workbook.
+        dtype (dict, optional): Per-column dtypes passed to the parser, e.g.
+            ``{"test_case_id": str}``. Columns listed here keep their dtype.
+        cast_to_str (bool): Cast the remaining columns to str so empty cells read
+            as "nan", which is what the test-case builders expect.
+        engine (str, optional): pandas Excel engine, e.g. "calamine" or "openpyxl".
+        read_only (bool): Stream rows with openpyxl's read-only mode instead of
+            building the full workbook tree in memory.
+        optional_sheet_names (tuple): Sheets loaded along with sheet_names only
+            when the workbook has them.
+
+    Returns:
+        dict: Mapping of sheet name to DataFrame.
+    """
+    dtype = dtype or {}
+    if read_only:
+        sheets_dict = _read_sheets_read_only(file_path, sheet_names, optional_sheet_names, dtype)
+    else:
+        with pd.ExcelFile(file_path, engine=engine) as excel_file:
+            sheets_dict = excel_file.parse(
+                sheet_name=_requested_sheet_names(excel_file.sheet_names, sheet_names, optional_sheet_names),
+                dtype=dtype or None,
+            )
+
+    if cast_to_str:
+        for df in sheets_dict.values():
+            _cast_columns_to_str(df, keep_dtypes=dtype)
     return sheets_dict
 
 
+def multi_sheet_excel_reader(file_path, sheet_names=None, optional_sheet_names=()):
+    # Read the workbook once and convert all columns to string type immediately
+    return load_workbook_sheets(file_path, sheet_names=sheet_names, optional_sheet_names=optional_sheet_names)
+
+
 def save_dataframe_to_csv(df, file_path):
     """Save a DataFrame to a CSV file, creating the directory if it doesn't exist."""
     # Get the directory from the file path
@@ -0,0 +1,308 @@
+import csv
+import glob
+import io
+import json
+import os
+import re
+import threading
+import time
+
+from common_functions.utils.logging_config import logger
+
+RESULT_SINK_FORMATS = ("jsonl", "csv", "parquet")
+
+# Columns that come first in CSV/Parquet files, in TestStatusUtility record order
+DEFAULT_RESULT_COLUMNS = ("test_case_id", "status", "response_data", "error")
+
+
+def _json_default(value):
+    # ResponseSnapshot and similar result objects serialize through to_dict()
+    if hasattr(value, "to_dict"):
+        return value.to_dict()
+    return str(value)
+
+
+def _to_text(value):
+    # Flat file cells hold text; nested response data is stored as JSON
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (dict, list)) or hasattr(value, "to_dict"):
+        return json.dumps(value, default=_json_default)
+    return str(value)
+
+
+def _read_recorded_test_case_ids(file_path, file_format):
+    """Return the test_case_ids stored in one result file (a truncated last line is ignored)."""
+    test_case_ids = set()
+    if file_format == "jsonl":
+        with open(file_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    test_case_ids.add(str(json.loads(line)["test_case_id"]))
+                except (ValueError, KeyError, TypeError):
+                    continue
+    elif file_format == "csv":
+        with open(file_path, "r", encoding="utf-8", newline="") as f:
+            for row in csv.DictReader(f):
+                if row.get("test_case_id"):
+                    test_case_ids.add(row["test_case_id"])
+    else:
+        import pyarrow.parquet as pq
+
+        column = pq.read_table(file_path, columns=["test_case_id"]).column("test_case_id")
+        test_case_ids.update(str(value) for value in column.to_pylist() if value is not None)
+    return test_case_ids
+
+
+class ResultSink:
+    """
+    Append-only writer for test result records.
+
+    Records are buffered and written every batch_size records (or every
+    flush_interval_s seconds), so a crash loses at most one batch and memory no
+    longer grows with the run. Output goes to numbered part files
+    ``<run_name>.part00000.<format>`` that are rotated by record count and size.
+
+    When an s3_client is given, JSONL and CSV parts are streamed to S3 with a
+    multipart upload while they are written; Parquet parts are uploaded when they
+    are rotated or closed. Resuming is opt-in: with resume=True the test_case_ids
+    of existing parts are loaded first, so an interrupted run can skip them (see
+    is_recorded) and continue in a new part. Without it, existing parts of the
+    run raise FileExistsError instead of being skipped or overwritten.
+    """
+
+    def __init__(self, directory, run_name="test_results", file_format="jsonl", batch_size=100,
+                 flush_interval_s=None, max_records_per_file=None, max_bytes_per_file=256 * 1024 * 1024,
+                 columns=DEFAULT_RESULT_COLUMNS, resume=False, fsync=False,
+                 s3_client=None, s3_bucket=None, s3_prefix=""):
+        if file_format not in RESULT_SINK_FORMATS:
+            raise ValueError(f"Invalid result format '{file_format}'. Please use one of {RESULT_SINK_FORMATS}.")
+        if s3_client is not None and not s3_bucket:
+            raise ValueError("s3_bucket is required when an s3_client is given")
+        self.directory = directory
+        self.run_name = run_name
+        self.file_format = file_format
+        self.batch_size = batch_size
+        self.flush_interval_s = flush_interval_s
+        self.max_records_per_file = max_records_per_file
+        self.max_bytes_per_file = max_bytes_per_file
+        self.columns = list(columns)
+        self.fsync = fsync
+        self.s3_client = s3_client
+        self.s3_bucket = s3_bucket
+        self.s3_prefix = s3_prefix.rstrip("/")
+
+        self.recorded_test_case_ids = set()
+        self.records_written = 0
+        self.files = []
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._part_index = 0
+        self._file = None
+        self._file_path = None
+        self._file_records = 0
+        self._file_columns = None
+        self._parquet_writer = None
+        self._s3_stream = None
+        self.closed = False
+
+        os.makedirs(directory, exist_ok=True)
+        if resume:
+            self._load_existing_parts()
+        elif self._part_paths():
+            raise FileExistsError(f"{directory} already has results of {run_name}; pass resume=True to continue "
+                                  f"that run, or use another directory or run_name")
+
+    def _part_paths(self):
+        pattern = os.path.join(glob.escape(self.directory), f"{glob.escape(self.run_name)}.part*.{self.file_format}")
+        part_pattern = re.compile(rf"{re.escape(self.run_name)}\.part(\d+)\.{self.file_format}$")
+        parts = []
+        for file_path in glob.glob(pattern):
+            match = part_pattern.search(os.path.basename(file_path))
+            if match:
+                parts.append((int(match.group(1)), file_path))
+        return sorted(parts)
+
+    def _load_existing_parts(self):
+        parts = self._part_paths()
+        for _, file_path in parts:
+            try:
+                self.recorded_test_case_ids |= _read_recorded_test_case_ids(file_path, self.file_format)
+            except Exception as e:
+                logger.info(f"Could not read previous results from {file_path}: {e}")
+        if parts:
+            # Never append to an existing part: its last batch may be incomplete
+            self._part_index = parts[-1][0] + 1
+            logger.info(f"Resuming {self.run_name}: {len(self.recorded_test_case_ids)} test cases already recorded "
+                        f"in {len(parts)} files")
+
+    def is_recorded(self, test_case_id):
+        """Return True when a result for test_case_id is already written (or buffered)."""
+        return str(test_case_id) in self.recorded_test_case_ids
+
+    def write(self, record):
+        """Add one result record; it is written with the next batch."""
+        self.write_many([record])
+
+    def write_many(self, records):
+        """Add several result records."""
+        with self._lock:
+            if self.closed:
+                raise ValueError(f"Write to closed result sink {self.run_name}")
+            for record in records:
+                self._buffer.append(record)
+                if record.get("test_case_id") is not None:
+                    self.recorded_test_case_ids.add(str(record["test_case_id"]))
+            interval_elapsed = (self.flush_interval_s is not None
+                                and time.monotonic() - self._last_flush >= self.flush_interval_s)
+            if len(self._buffer) >= self.batch_size or interval_elapsed:
+                self._flush_locked()
+
+    def flush(self):
+        """Write the buffered records now."""
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        self._last_flush = time.monotonic()
+        records, self._buffer = self._buffer, []
+        while records:
+            if self._file_path is None:
+                self._open_part(records)
+            if self.max_records_per_file:
+                batch = records[:self.max_records_per_file - self._file_records]
+            else:
+                batch = records
+            if self.file_format != "jsonl" and not self._has_file_columns(batch):
+                # New columns cannot be added to an open CSV/Parquet file; continue in a new part
+                self._close_part()
+                continue
+            records = records[len(batch):]
+            self._write_batch(batch)
+            self._file_records += len(batch)
+            self.records_written += len(batch)
+            if ((self.max_records_per_file and self._file_records >= self.max_records_per_file)
+                    or (self.max_bytes_per_file and self._part_size() >= self.max_bytes_per_file)):
+                self._close_part()
+
+    def _has_file_columns(self, records):
+        return all(key in self._file_columns for record in records for key in record)
+
+    def _open_part(self, records):
+        self._file_path = os.path.join(self.directory,
+                                       f"{self.run_name}.part{self._part_index:05d}.{self.file_format}")
+        self._part_index += 1
+        self._file_records = 0
+        self._file_columns = list(self.columns)
+        for record in records:
+            for key in record:
+                if key not in self._file_columns:
+                    self._file_columns.append(key)
+
+        if self.file_format == "parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            schema = pa.schema([(column, pa.string()) for column in self._file_columns])
+            self._parquet_writer = pq.ParquetWriter(self._file_path, schema)
+        else:
+            self._file = open(self._file_path, "wb")
+            if self.s3_client is not None:
+                from common_functions.aws_service.aws_common_function import s3_operations_manager
+
+                self._s3_stream = s3_operations_manager.create_multipart_stream(
+                    self.s3_client, self.s3_bucket, self._s3_key(self._file_path))
+            if self.file_format == "csv":
+                self._write_bytes(self._encode_csv_rows([self._file_columns]))
+        self.files.append(self._file_path)
+        logger.info(f"Writing results to {self._file_path}")
+
+    def _s3_key(self, file_path):
+        file_name = os.path.basename(file_path)
+        return f"{self.s3_prefix}/{file_name}" if self.s3_prefix else file_name
+
+    def _encode_csv_rows(self, rows):
+        text = io.StringIO()
+        csv.writer(text).writerows(rows)
+        return text.getvalue().encode("utf-8")
+
+    def _write_bytes(self, data):
+        self._file.write(data)
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        if self._s3_stream is not None:
+            try:
+                self._s3_stream.write(data)
+            except Exception as e:
+                logger.info(f"Stopped streaming {self._file_path} to S3: {e}")
+                self._s3_stream.abort()
+                self._s3_stream = None
+
+    def _write_batch(self, records):
+        if self.file_format == "jsonl":
+            lines = "".join(json.dumps(record, default=_json_default) + "\n" for record in records)
+            self._write_bytes(lines.encode("utf-8"))
+        elif self.file_format == "csv":
+            self._write_bytes(self._encode_csv_rows(
+                [[_to_text(record.get(column)) for column in self._file_columns] for record in records]))
+        else:
+            import pyarrow as pa
+
+            table = pa.table({
+                column: pa.array([_to_text(record.get(column)) for record in records], type=pa.string())
+                for column in self._file_columns
+            })
+            self._parquet_writer.write_table(table)
+
+    def _part_size(self):
+        return os.path.getsize(self._file_path) if self._file is None else self._file.tell()
+
+    def _close_part(self):
+        if self._file_path is None:
+            return
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+            self._parquet_writer = None
+            if self.s3_client is not None:
+                from common_functions.aws_service.aws_common_function import s3_operations_manager
+
+                s3_operations_manager.upload_file(self.s3_client, self._file_path, self.s3_bucket,
+                                                  self._s3_key(self._file_path))
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._s3_stream is not None:
+            try:
+                self._s3_stream.close()
+            except Exception as e:
+                logger.info(f"Error uploading {self._file_path} to S3: {e}")
+            self._s3_stream = None
+        logger.info(f"Closed {self._file_path} with {self._file_records} records")
+        self._file_path = None
+
+    def close(self):
+        """Write the remaining records and close (and upload) the current part."""
+        with self._lock:
+            if self.closed:
+                return
+            self._flush_locked()
+            self._close_part()
+            self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+
+### Usage example: ###
+# with ResultSink("results/run_2024_01_01", file_format="jsonl", batch_size=200, resume=True,
+#                 s3_client=s3_client, s3_bucket="my-bucket", s3_prefix="results/run_2024_01_01") as result_sink:
+#     for test_case in test_cases:
+#         if result_sink.is_recorded(test_case["test_case_id"]):
+#             continue
+#         result_sink.write(run_test_case(test_case))
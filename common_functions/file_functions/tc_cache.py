@@ -0,0 +1,125 @@
+import glob
+import hashlib
+import inspect
+import os
+import pickle
+import tempfile
+
+from common_functions.utils.logging_config import logger
+
+# Bump when the layout of the cached data changes so old entries are ignored
+TC_CACHE_VERSION = 1
+
+DEFAULT_TC_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "api_test_framework", "tc_cache")
+
+
+def get_file_content_hash(file_path, chunk_size=1024 * 1024):
+    """
+    Hash the content of a file in fixed-size chunks.
+
+    Args:
+        file_path (str): Path of the file to hash.
+        chunk_size (int): Bytes read per chunk.
+
+    Returns:
+        str: Hex digest of the file content.
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def get_code_version(*code_objects, extra=()):
+    """
+    Hash the source of the functions that build the cached data.
+
+    Args:
+        code_objects: Functions or modules whose source produces the cached data.
+        extra (tuple): Other values the cached data depends on, e.g. library versions.
+
+    Returns:
+        str: Short hex digest; it changes whenever one of the sources changes.
+    """
+    digest = hashlib.blake2b(digest_size=6)
+    digest.update(f"v{TC_CACHE_VERSION}".encode())
+    for code_object in code_objects:
+        digest.update(inspect.getsource(code_object).encode())
+    for value in extra:
+        digest.update(repr(value).encode())
+    return digest.hexdigest()
+
+
+def _cache_file_prefix(file_path, tc_master_column_data, tc_sheet_name):
+    # One prefix per workbook location and tc layout; the content hash follows it
+    digest = hashlib.blake2b(digest_size=8)
+    digest.update(f"v{TC_CACHE_VERSION}".encode())
+    digest.update(os.path.abspath(file_path).encode())
+    digest.update(repr(list(tc_master_column_data)).encode())
+    digest.update(str(tc_sheet_name).encode())
+    return f"{os.path.splitext(os.path.basename(file_path))[0]}-{digest.hexdigest()}"
+
+
+def get_tc_cache_file(file_path, tc_master_column_data, tc_sheet_name, cache_dir=DEFAULT_TC_CACHE_DIR,
+                      builder_version=""):
+    """
+    Get the cache file path for a compiled test-case workbook.
+
+    The path is keyed by the workbook content hash plus the tc_meta column list,
+    tc sheet name and builder_version (see get_code_version), so any change to
+    one of them points to a new entry.
+
+    Returns:
+        str: Path of the cache entry (it may not exist yet).
+    """
+    prefix = _cache_file_prefix(file_path, tc_master_column_data, tc_sheet_name)
+    # Entries of an older builder share the prefix, so save_tc_cache removes them as stale
+    return os.path.join(cache_dir, f"{prefix}.{get_file_content_hash(file_path)}-{builder_version}.pkl")
+
+
+def load_tc_cache(cache_file):
+    """
+    Load a cached compiled test-case entry.
+
+    Returns:
+        dict: The cached data, or None when the entry is missing or unreadable.
+    """
+    if not os.path.exists(cache_file):
+        return None
+    try:
+        with open(cache_file, "rb") as f:
+            return pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError) as e:
+        logger.info(f"Ignoring unreadable test case cache {cache_file}: {e}")
+        return None
+
+
+def save_tc_cache(cache_file, data):
+    """
+    Store compiled test-case data and drop stale entries of the same workbook.
+
+    The file is written to a temporary path first and renamed into place, so a
+    concurrent reader never sees a partially written cache entry.
+    """
+    cache_dir = os.path.dirname(cache_file)
+    os.makedirs(cache_dir, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_file)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    prefix = os.path.basename(cache_file).rsplit(".", 2)[0]
+    for stale_file in glob.glob(os.path.join(glob.escape(cache_dir), f"{glob.escape(prefix)}.*.pkl")):
+        if stale_file != cache_file:
+            try:
+                os.remove(stale_file)
+            except OSError:
+                pass
+    return cache_file
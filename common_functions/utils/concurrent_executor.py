@@ -0,0 +1,191 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from common_functions.utils.logging_config import logger
+from common_functions.utils.tset_ststus_utility import TestStatusUtility
+
+
+class TokenBucketRateLimiter:
+    """
+    Token-bucket rate limiter shared by all workers of a test run.
+
+    Replaces the fixed 3-second delay between test cases: requests may burst up
+    to ``capacity`` and are then smoothed to ``rate`` requests per second.
+    """
+
+    def __init__(self, rate, capacity=None):
+        """
+        Args:
+            rate (float): Tokens added per second (sustained requests per second).
+            capacity (int, optional): Maximum burst size. Defaults to ``max(1, rate)``.
+        """
+        if rate <= 0:
+            raise ValueError("rate must be greater than 0")
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, self.rate))
+        self._tokens = self.capacity
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self):
+        """Take one token, returning how long the caller must wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last_refill) * self.rate)
+            self._last_refill = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self):
+        """Block the calling thread until a token is available."""
+        wait_time = self._reserve()
+        if wait_time > 0:
+            time.sleep(wait_time)
+
+    async def acquire_async(self):
+        """Wait (without blocking the event loop) until a token is available."""
+        wait_time = self._reserve()
+        if wait_time > 0:
+            await asyncio.sleep(wait_time)
+
+
+def get_tc_api_name(test_case):
+    """Return the api_name of a test case built by get_tc_data_from_excel."""
+    tc_meta = test_case.get("tc_meta") or [{}]
+    return tc_meta[0].get("api_name")
+
+
+def _failed_result(test_case, error):
+    logger.info(f"Test case {test_case.get('test_case_id')} raised an unhandled error: {error}")
+    return TestStatusUtility.test_case_try_except_fail(test_case.get("test_case_id"), None, error)
+
+
+def run_test_cases_concurrently(test_cases, run_test_case, max_workers=8,
+                                api_concurrency_limits=None, rate_limiter=None):
+    """
+    Run test cases on a bounded thread pool instead of the serial loop.
+
+    Args:
+        test_cases (list): Test case dicts as returned by get_tc_data_from_excel.
+        run_test_case (callable): Executes one test case and returns its
+            TestStatusUtility result dict.
+        max_workers (int): Size of the worker pool.
+        api_concurrency_limits (dict, optional): Maximum number of in-flight
+            test cases per api_name, e.g. ``{"ais_jerry_transform_rates": 4}``.
+        rate_limiter (TokenBucketRateLimiter, optional): Shared limiter applied
+            before every test case.
+
+    Returns:
+        list: test_results in the same order as ``test_cases`` (test_case_id order).
+    """
+    api_limits = dict(api_concurrency_limits or {})
+    # Test cases of a capped API wait here, not on a pool worker, until one of its slots frees up
+    api_queues = {api_name: deque() for api_name in api_limits}
+    api_in_flight = {api_name: 0 for api_name in api_limits}
+    test_results = [None] * len(test_cases)
+    remaining = [len(test_cases)]
+    lock = threading.Lock()
+    all_done = threading.Event()
+
+    def execute(index, test_case):
+        try:
+            if rate_limiter is not None:
+                rate_limiter.acquire()
+            test_results[index] = run_test_case(test_case)
+        except Exception as e:
+            test_results[index] = _failed_result(test_case, e)
+        finally:
+            api_name = get_tc_api_name(test_case)
+            next_task = None
+            with lock:
+                if api_name in api_queues:
+                    # Hand the freed slot straight to the next queued test case of this API
+                    if api_queues[api_name]:
+                        next_task = api_queues[api_name].popleft()
+                    else:
+                        api_in_flight[api_name] -= 1
+                remaining[0] -= 1
+                if remaining[0] == 0:
+                    all_done.set()
+            if next_task is not None:
+                executor.submit(execute, *next_task)
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tc-worker") as executor:
+        for index, test_case in enumerate(test_cases):
+            api_name = get_tc_api_name(test_case)
+            with lock:
+                if api_name in api_limits and api_in_flight[api_name] >= api_limits[api_name]:
+                    api_queues[api_name].append((index, test_case))
+                    continue
+                if api_name in api_limits:
+                    api_in_flight[api_name] += 1
+            executor.submit(execute, index, test_case)
+        # Queued test cases are submitted by finishing workers, so wait for all of them before shutdown
+        if test_cases:
+            all_done.wait()
+
+    logger.info(f"Executed {len(test_results)} test cases with {max_workers} workers")
+    return test_results
+
+
+async def run_test_cases_async(test_cases, run_test_case, max_concurrency=32,
+                               api_concurrency_limits=None, rate_limiter=None):
+    """
+    Run test cases on the asyncio event loop with bounded concurrency.
+
+    Args:
+        test_cases (list): Test case dicts as returned by get_tc_data_from_excel.
+        run_test_case (coroutine function): Executes one test case and returns
+            its TestStatusUtility result dict.
+        max_concurrency (int): Maximum number of test cases in flight.
+        api_concurrency_limits (dict, optional): Maximum number of in-flight
+            test cases per api_name.
+        rate_limiter (TokenBucketRateLimiter, optional): Shared limiter applied
+            before every test case.
+
+    Returns:
+        list: test_results in the same order as ``test_cases`` (test_case_id order).
+    """
+    global_semaphore = asyncio.Semaphore(max_concurrency)
+    api_semaphores = {
+        api_name: asyncio.Semaphore(limit)
+        for api_name, limit in (api_concurrency_limits or {}).items()
+    }
+
+    async def execute(test_case):
+        api_semaphore = api_semaphores.get(get_tc_api_name(test_case))
+        # Take the per-API slot first so capped APIs don't hold global slots while waiting
+        if api_semaphore is not None:
+            await api_semaphore.acquire()
+        try:
+            async with global_semaphore:
+                if rate_limiter is not None:
+                    await rate_limiter.acquire_async()
+                return await run_test_case(test_case)
+        except Exception as e:
+            return _failed_result(test_case, e)
+        finally:
+            if api_semaphore is not None:
+                api_semaphore.release()
+
+    test_results = await asyncio.gather(*(execute(test_case) for test_case in test_cases))
+
+    logger.info(f"Executed {len(test_results)} test cases with concurrency {max_concurrency}")
+    return list(test_results)
+
+
+### Usage example: ###
+# test_cases = get_tc_data_from_excel(excel_data, tc_master_column_data, "ais_integration_tc")
+# rate_limiter = TokenBucketRateLimiter(rate=5, capacity=10)
+# test_results = run_test_cases_concurrently(
+#     test_cases,
+#     run_single_test_case,
+#     max_workers=16,
+#     api_concurrency_limits={"ais_jerry_transform_rates": 4},
+#     rate_limiter=rate_limiter,
+# )
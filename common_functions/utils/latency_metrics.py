@@ -0,0 +1,220 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+from common_functions.file_functions.excel_operations import save_dataframe_to_csv
+from common_functions.utils.logging_config import logger
+
+REPORT_PERCENTILES = (50, 90, 99)
+
+# httpcore trace events that open and close each network phase
+_TRACE_PHASES = {
+    "connection.connect_tcp": "connect",
+    "connection.start_tls": "tls",
+    "http11.receive_response_body": "body_read",
+    "http2.receive_response_body": "body_read",
+}
+
+
+class LatencyHistogram:
+    """
+    HDR-style log-linear histogram of nanosecond durations.
+
+    Each power-of-two range is split into ``2 ** (sub_bucket_bits - 1)`` linear
+    buckets, so recorded values keep a relative precision of about
+    ``1 / 2 ** (sub_bucket_bits - 1)`` (under 1% by default) in constant memory.
+    """
+
+    __slots__ = ("sub_bucket_bits", "_half", "counts", "count", "total", "min", "max")
+
+    def __init__(self, sub_bucket_bits=8):
+        self.sub_bucket_bits = sub_bucket_bits
+        self._half = 1 << (sub_bucket_bits - 1)
+        self.counts = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def _bucket_index(self, value):
+        if value < (1 << self.sub_bucket_bits):
+            return value
+        shift = value.bit_length() - self.sub_bucket_bits
+        return shift * self._half + (value >> shift)
+
+    def _bucket_upper_bound(self, index):
+        if index < (1 << self.sub_bucket_bits):
+            return index
+        shift = index // self._half - 1
+        return ((index - shift * self._half + 1) << shift) - 1
+
+    def record(self, value_ns):
+        """Record one duration in nanoseconds."""
+        value_ns = max(0, int(value_ns))
+        index = self._bucket_index(value_ns)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total += value_ns
+        self.min = value_ns if self.min is None else min(self.min, value_ns)
+        self.max = value_ns if self.max is None else max(self.max, value_ns)
+
+    def merge(self, other):
+        """Add the values of another histogram with the same bucket layout."""
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        if other.count:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def percentile(self, percentile):
+        """Return the value (ns) at or below which ``percentile`` percent of the values fall."""
+        if not self.count:
+            return None
+        target = max(1, -(-self.count * percentile // 100))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= target:
+                return min(self._bucket_upper_bound(index), self.max)
+        return self.max
+
+    def summary(self, percentiles=REPORT_PERCENTILES):
+        """Return count, mean, percentiles and max in milliseconds."""
+        summary = {"count": self.count}
+        if not self.count:
+            return summary
+        summary["mean_ms"] = round(self.total / self.count / 1e6, 3)
+        for percentile in percentiles:
+            summary[f"p{percentile}_ms"] = round(self.percentile(percentile) / 1e6, 3)
+        summary["max_ms"] = round(self.max / 1e6, 3)
+        return summary
+
+
+class LatencyRecorder:
+    """
+    Thread-safe recorder of per-phase API latencies.
+
+    Network phases (connect, tls, ttfb, body_read and total, per attempt) and
+    retry_backoff come from the API client; payload_prep, json_parse and
+    validation are timed by the calling test code with phase() (see the usage
+    example below).
+
+    Durations are measured with time.perf_counter_ns and aggregated into one
+    LatencyHistogram per (api_name, environment, phase). When a test_case_id is
+    given, the individual durations are also kept per test case so they can be
+    added to the results CSV.
+    """
+
+    def __init__(self):
+        self.histograms = {}
+        self.test_case_timings = {}
+        self._lock = threading.Lock()
+
+    def record(self, api_name, environment, phase, duration_ns, test_case_id=None):
+        """Record one phase duration in nanoseconds."""
+        with self._lock:
+            histogram = self.histograms.get((api_name, environment, phase))
+            if histogram is None:
+                histogram = self.histograms[(api_name, environment, phase)] = LatencyHistogram()
+            histogram.record(duration_ns)
+            if test_case_id is not None:
+                timings = self.test_case_timings.setdefault(test_case_id, {})
+                timings[phase] = timings.get(phase, 0) + duration_ns
+
+    @contextmanager
+    def phase(self, api_name, environment, phase, test_case_id=None):
+        """
+        Time the enclosed block as one phase.
+
+        Example:
+            with latency_recorder.phase(api_name, env, "json_parse", test_case_id):
+                response_json = response.json()
+        """
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.record(api_name, environment, phase, time.perf_counter_ns() - start, test_case_id)
+
+    def _trace_handler(self, api_name, environment, test_case_id):
+        started = {}
+
+        def handle(event_name, info):
+            now = time.perf_counter_ns()
+            prefix, _, stage = event_name.rpartition(".")
+            if prefix.endswith("send_request_headers") and stage == "started":
+                started["ttfb"] = now
+            elif prefix.endswith("receive_response_headers") and stage == "complete" and "ttfb" in started:
+                self.record(api_name, environment, "ttfb", now - started.pop("ttfb"), test_case_id)
+            elif prefix in _TRACE_PHASES:
+                phase = _TRACE_PHASES[prefix]
+                if stage == "started":
+                    started[phase] = now
+                elif stage == "complete" and phase in started:
+                    self.record(api_name, environment, phase, now - started.pop(phase), test_case_id)
+
+        return handle
+
+    def httpx_trace(self, api_name, environment, test_case_id=None):
+        """
+        Build an httpx ``trace`` extension that records connect (DNS + TCP), TLS,
+        TTFB and body read phases, e.g. ``client.post(url, extensions={"trace": ...})``.
+        """
+        return self._trace_handler(api_name, environment, test_case_id)
+
+    def httpx_async_trace(self, api_name, environment, test_case_id=None):
+        """Async variant of httpx_trace() for httpx.AsyncClient."""
+        handle = self._trace_handler(api_name, environment, test_case_id)
+
+        async def trace(event_name, info):
+            handle(event_name, info)
+
+        return trace
+
+    def summary_rows(self):
+        """Return one dict per (api_name, environment, phase) with count, percentiles and max."""
+        with self._lock:
+            items = sorted(self.histograms.items(), key=lambda item: tuple(str(part) for part in item[0]))
+            return [
+                {"api_name": api_name, "environment": environment, "phase": phase, **histogram.summary()}
+                for (api_name, environment, phase), histogram in items
+            ]
+
+    def add_timings_to_results(self, test_results):
+        """Add per-phase ``<phase>_ms`` columns to the test_results records, in place."""
+        with self._lock:
+            for result in test_results:
+                for phase, duration_ns in self.test_case_timings.get(result.get("test_case_id"), {}).items():
+                    result[f"{phase}_ms"] = round(duration_ns / 1e6, 3)
+        return test_results
+
+    def save_summary(self, csv_path=None, json_path=None):
+        """Write the latency summary to a CSV file and/or a JSON file."""
+        rows = self.summary_rows()
+        if csv_path:
+            save_dataframe_to_csv(pd.DataFrame(rows), csv_path)
+        if json_path:
+            directory = os.path.dirname(json_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(json_path, "w") as f:
+                json.dump(rows, f, indent=4)
+            logger.info(f"Latency summary saved to {json_path}")
+        return rows
+
+
+### Usage example: ###
+# latency_recorder = LatencyRecorder()
+# with latency_recorder.phase(api_name, env, "payload_prep", test_case_id):
+#     payload = update_json_data_with_new_json(tc_modify_data, default_payload)
+# response = api_client_manager.request(test_run_config, "POST", api_url, json=payload,
+#                                       latency_recorder=latency_recorder, api_name=api_name,
+#                                       test_case_id=test_case_id)
+# latency_recorder.add_timings_to_results(test_results)
+# latency_recorder.save_summary("results/latency_summary.csv", "results/latency_summary.json")
@@ -0,0 +1,313 @@
+from functools import lru_cache
+from operator import getitem
+
+from common_functions.utils.logging_config import logger
+
+# Rows drop their "nan" cells, so rows of one sheet have different key sets. Parsed
+# operations are therefore cached per key (sized for every column of a run's sheets)
+# and plans per sheet column set (see compile_patch_plan), not per row.
+PATCH_PLAN_CACHE_SIZE = 256
+KEY_PATH_CACHE_SIZE = 4096
+
+
+class PatchPlan:
+    """
+    Pre-parsed key paths for a fixed, ordered set of tc_modify_data keys.
+
+    Strict plans reproduce update_json_data_with_new_json (missing paths are
+    skipped with a warning); auto-vivifying plans reproduce
+    new_update_json_data_with_new_json (missing paths are created).
+    """
+
+    __slots__ = ("keys", "auto_vivify", "operations")
+
+    def __init__(self, keys, auto_vivify, operations):
+        self.keys = keys
+        self.auto_vivify = auto_vivify
+        self.operations = operations
+
+    def __repr__(self):
+        return f"PatchPlan(keys={len(self.keys)}, auto_vivify={self.auto_vivify})"
+
+
+def _read_only_payload(*args, **kwargs):
+    raise TypeError("Default payload templates are read-only; patch them with copy_on_write=True "
+                    "or get a copy with get_default_payload_by_api_name(deep_copy=True)")
+
+
+class FrozenPayloadDict(dict):
+    """
+    Read-only dict for shared default payload templates.
+
+    Reads and json.dumps work as on a dict; every mutation raises TypeError.
+    copy() returns a plain, mutable dict, which is what CopyOnWriteTracker uses.
+    """
+
+    __slots__ = ()
+
+    __setitem__ = __delitem__ = __ior__ = _read_only_payload
+    clear = pop = popitem = setdefault = update = _read_only_payload
+
+    def __deepcopy__(self, memo):
+        return thaw_payload(self)
+
+    def __reduce__(self):
+        return dict, (thaw_payload(self),)
+
+
+class FrozenPayloadList(list):
+    """Read-only list for shared default payload templates; copy() returns a plain list."""
+
+    __slots__ = ()
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _read_only_payload
+    append = extend = insert = pop = remove = clear = sort = reverse = _read_only_payload
+
+    def __deepcopy__(self, memo):
+        return thaw_payload(self)
+
+    def __reduce__(self):
+        return list, (thaw_payload(self),)
+
+
+def freeze_payload(value):
+    """Return a recursively read-only copy of a payload (dicts and lists are frozen)."""
+    if isinstance(value, dict):
+        return FrozenPayloadDict((key, freeze_payload(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return FrozenPayloadList(freeze_payload(item) for item in value)
+    return value
+
+
+def thaw_payload(value):
+    """Return a recursively mutable copy of a (frozen) payload, like copy.deepcopy."""
+    if isinstance(value, dict):
+        return {key: thaw_payload(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [thaw_payload(item) for item in value]
+    return value
+
+
+class CopyOnWriteTracker:
+    """
+    Copies containers of a shared payload template only along the paths being patched.
+
+    The patched payload shares every untouched subtree with the template, so the
+    cost per test case scales with the size of the patch, not of the payload.
+    """
+
+    __slots__ = ("owned",)
+
+    def __init__(self):
+        self.owned = set()
+
+    def own(self, container):
+        """Return a shallow copy of ``container`` that may be mutated freely."""
+        container_copy = container.copy()
+        self.owned.add(id(container_copy))
+        return container_copy
+
+    def descend(self, parent, key):
+        """Return ``parent[key]``, replacing it with a private copy first if it is still shared."""
+        child = parent[key]
+        if isinstance(child, (dict, list)) and id(child) not in self.owned:
+            child = self.own(child)
+            parent[key] = child
+        return child
+
+
+@lru_cache(maxsize=KEY_PATH_CACHE_SIZE)
+def compile_strict_key_path(key_path):
+    """
+    Split a bracket-notation key the way update_json_data_with_new_json does.
+
+    Returns:
+        tuple: Path segments as strings.
+    """
+    return tuple(key_path.replace('][', ' ').replace('[', '').replace(']', '').split())
+
+
+@lru_cache(maxsize=KEY_PATH_CACHE_SIZE)
+def compile_auto_vivify_key_path(key_path):
+    """
+    Split a bracket/dot-notation key the way new_update_json_data_with_new_json does.
+
+    Returns:
+        tuple: ``(raw_keys, segments)`` where ``raw_keys`` are the original string
+        segments (used in error messages) and each segment is ``(is_index, key)``
+        with list indexes already converted to int.
+    """
+    raw_keys = tuple(key_path.replace('][', '.').replace('[', '.').replace(']', '').split('.'))
+    segments = []
+    for key in raw_keys:
+        is_index = key.isdigit()
+        # int() fails on digit characters that are not decimals; keep those as str so
+        # the conversion raises at apply time, exactly where the original code raised
+        segments.append((is_index, int(key) if is_index and key.isdecimal() else key))
+    return raw_keys, tuple(segments)
+
+
+@lru_cache(maxsize=KEY_PATH_CACHE_SIZE)
+def compile_patch_operation(key, auto_vivify=False):
+    """
+    Compile one tc_modify_data key into a ``(key, parsed_path)`` plan operation.
+
+    Returns:
+        tuple: ``(key, path)`` where path is None for a top-level strict key.
+    """
+    if auto_vivify:
+        return key, compile_auto_vivify_key_path(key)
+    if '[' in key and ']' in key:
+        return key, compile_strict_key_path(key)
+    return key, None
+
+
+def build_patch_plan(keys, auto_vivify=False):
+    """Assemble an uncached plan for ``keys`` from the per-key operation cache."""
+    return PatchPlan(keys, auto_vivify, tuple(compile_patch_operation(key, auto_vivify) for key in keys))
+
+
+@lru_cache(maxsize=PATCH_PLAN_CACHE_SIZE)
+def compile_patch_plan(keys, auto_vivify=False):
+    """
+    Compile an ordered tuple of tc_modify_data keys into a reusable patch plan.
+
+    Compile one plan per sheet from its tc_modify_data columns and pass it to
+    every row of that sheet: keys a row does not have are skipped when the plan
+    is applied.
+
+    Args:
+        keys (tuple): Keys of the update dict, in iteration order.
+        auto_vivify (bool): Create missing paths instead of skipping them.
+
+    Returns:
+        PatchPlan: Cached plan for the given keys.
+    """
+    return build_patch_plan(keys, auto_vivify)
+
+
+def _set_strict_nested_value(current, key_path, keys, value, descend):
+    # Navigate through existing structure
+    for key in keys[:-1]:
+        if key in current:
+            current = descend(current, key)
+        else:
+            logger.info(f"Warning: Key path '{key_path}' not found in the dictionary structure")
+            return
+    # Update the value at the final level
+    if keys[-1] in current:
+        current[keys[-1]] = value
+    else:
+        logger.info(f"Warning: Final key '{keys[-1]}' not found in the dictionary structure")
+
+
+def _apply_strict_plan(plan, new_data, payload, descend):
+    # Strict updates only replace existing keys, so the top-level membership checks
+    # hold for the whole pass; the values themselves are re-read per key.
+    has_input_data = "input_data" in payload
+    has_data = "data" in payload
+
+    for key, keys in plan.operations:
+        if key not in new_data:
+            continue
+        value = new_data[key]
+        if keys is not None:
+            # Handle nested dictionary access
+            if has_input_data:
+                root = descend(payload, "input_data")
+            elif has_data:
+                root = descend(payload, "data")
+            else:
+                root = payload
+            _set_strict_nested_value(root, key, keys, value, descend)
+        elif key in payload:
+            # If the key is at the top level, replace its value
+            payload[key] = value
+        elif has_input_data and key in payload["input_data"]:
+            # If the key is nested in "input_data", replace its value
+            descend(payload, "input_data")[key] = value
+        elif has_data and key in payload["data"]:
+            # If the key is nested in "data", replace its value
+            descend(payload, "data")[key] = value
+        else:
+            # Log if the key is not found in Temp_data
+            logger.info(f"Warning --> Iam update_json_data_with_new_json function: Key '{key}' from New_data is not available in Temp_data")
+    return payload
+
+
+def _set_auto_vivify_value(current, raw_keys, segments, value, descend):
+    for i, (is_index, key) in enumerate(segments[:-1]):
+        if is_index:
+            # Handle numeric keys for lists
+            key = int(key)
+            if not isinstance(current, list):
+                raise TypeError(f"Expected list at '{list(raw_keys[:i])}' but found {type(current)}.")
+            while len(current) <= key:
+                current.append({})
+        else:
+            # Ensure intermediate keys exist as dictionaries
+            if key not in current:
+                current[key] = {}
+        current = descend(current, key)
+
+    # Set the final value
+    is_index, last_key = segments[-1]
+    if is_index:
+        last_key = int(last_key)
+        if not isinstance(current, list):
+            raise TypeError(f"Expected list at '{list(raw_keys)}' but found {type(current)}.")
+        while len(current) <= last_key:
+            current.append({})
+    current[last_key] = value
+
+
+def _apply_auto_vivify_plan(plan, new_data, payload, descend):
+    for key, (raw_keys, segments) in plan.operations:
+        if key not in new_data:
+            continue
+        try:
+            _set_auto_vivify_value(payload, raw_keys, segments, new_data[key], descend)
+        except Exception as e:
+            logger.info(f"Error updating key '{key}': {e}")
+    return payload
+
+
+def apply_patch_plan(plan, new_data, payload, copy_on_write=False):
+    """
+    Apply a compiled patch plan to a payload in one pass.
+
+    Args:
+        plan (PatchPlan): Plan compiled from the keys of ``new_data``, or from
+            a superset of them such as the sheet's tc_modify_data columns.
+        new_data (dict): Values to write; plan keys it does not have are skipped.
+        payload (dict): Payload to update.
+        copy_on_write (bool): Leave ``payload`` untouched and return a patched
+            payload that shares every unpatched subtree with it. The shared
+            subtrees must be treated as read-only; the result is a plain dict
+            and serializes directly with json.dumps.
+
+    Returns:
+        dict: The updated payload.
+    """
+    if isinstance(payload, FrozenPayloadDict) and not copy_on_write:
+        raise TypeError("Default payload templates are read-only; apply patches with copy_on_write=True")
+    if copy_on_write:
+        tracker = CopyOnWriteTracker()
+        payload = tracker.own(payload)
+        descend = tracker.descend
+    else:
+        descend = getitem
+
+    if plan.auto_vivify:
+        return _apply_auto_vivify_plan(plan, new_data, payload, descend)
+    return _apply_strict_plan(plan, new_data, payload, descend)
+
+
+def patch_payload(new_data, payload, auto_vivify=False, copy_on_write=False, plan=None):
+    """
+    Apply ``new_data`` to ``payload`` with ``plan``, or with a plan assembled
+    from the cached operations of its keys when no plan is given.
+    """
+    if plan is None:
+        plan = build_patch_plan(tuple(new_data), auto_vivify)
+    return apply_patch_plan(plan, new_data, payload, copy_on_write)
@@ -1,22 +1,122 @@
+import json
+
+from common_functions.file_functions.blob_store import get_content_sha256
+
+
+class ResponseSnapshot:
+    """
+    Bounded stand-in for a response body in a test result record.
+
+    Keeps a text preview plus the SHA-256 and size of the full body, and the
+    blob URI when the body was spilled to a blob store. str() returns the
+    preview, so snapshots drop into f-strings and CSV exports unchanged.
+    """
+
+    __slots__ = ("preview", "sha256", "size", "blob_uri", "truncated")
+
+    def __init__(self, preview, sha256, size, blob_uri=None, truncated=False):
+        self.preview = preview
+        self.sha256 = sha256
+        self.size = size
+        self.blob_uri = blob_uri
+        self.truncated = truncated
+
+    def __str__(self):
+        return self.preview
+
+    def __repr__(self):
+        return f"ResponseSnapshot(sha256={self.sha256[:12]}, size={self.size}, truncated={self.truncated})"
+
+    def to_dict(self):
+        return {"preview": self.preview, "sha256": self.sha256, "size": self.size,
+                "blob_uri": self.blob_uri, "truncated": self.truncated}
+
+
+def _response_body_bytes(response_data):
+    # httpx/requests responses carry the raw body; parsed JSON is re-serialized
+    if hasattr(response_data, "status_code") and hasattr(response_data, "content"):
+        return response_data.content
+    if isinstance(response_data, bytes):
+        return response_data
+    if isinstance(response_data, str):
+        return response_data.encode("utf-8")
+    try:
+        return json.dumps(response_data, default=str).encode("utf-8")
+    except (TypeError, ValueError):
+        return str(response_data).encode("utf-8")
 
 
 class TestStatusUtility:
 
+    # Response storage, see configure_response_storage(); None keeps whole responses in the records
+    response_preview_chars = None
+    response_blob_store = None
+
+    @classmethod
+    def configure_response_storage(cls, preview_chars=2048, blob_store=None):
+        """
+        Store bounded ResponseSnapshot objects instead of whole response bodies.
+
+        Args:
+            preview_chars (int): Characters of the body kept in the record, or None
+                to restore the default of storing the whole response.
+            blob_store: Optional LocalBlobStore/S3BlobStore that receives the full
+                body of truncated responses; identical bodies are stored once.
+        """
+        cls.response_preview_chars = preview_chars
+        cls.response_blob_store = blob_store
+
+    @classmethod
+    def snapshot_response(cls, response_data):
+        """Return a ResponseSnapshot of response_data (needs configure_response_storage)."""
+        body = _response_body_bytes(response_data)
+        preview_chars = cls.response_preview_chars
+        # A UTF-8 character is at most 4 bytes, so this prefix covers the preview
+        window = body[:preview_chars * 4]
+        text = window.decode("utf-8", errors="replace")
+        preview = text[:preview_chars]
+        # Judged on body bytes, not re-encoded text: invalid bytes decode to U+FFFD (3 bytes in UTF-8)
+        truncated = len(body) > len(window) or len(text) > preview_chars
+        sha256 = get_content_sha256(body)
+        blob_uri = None
+        if truncated and cls.response_blob_store is not None:
+            blob_uri = cls.response_blob_store.put(body, sha256)
+        return ResponseSnapshot(preview, sha256, len(body), blob_uri, truncated)
+
     def test_case_try_except_pass(test_case_id, response_data):
+        if TestStatusUtility.response_preview_chars is not None:
+            response_data = TestStatusUtility.snapshot_response(response_data)
         return{
             "test_case_id": test_case_id,"status": "Passed",
                 "response_data": response_data}
-    
+
     def test_case_try_except_fail(test_case_id, response_data, e ):
+        if TestStatusUtility.response_preview_chars is not None:
+            response_data = TestStatusUtility.snapshot_response(response_data)
+        else:
+            response_data = f"{response_data}"
         return{
                 "test_case_id": test_case_id,"status": "Failed",
-                "response_data": f"{response_data}",
+                "response_data": response_data,
                 "error": f"Test case {test_case_id} failed. Validation failed: {e}"}
-    
+
     def test_case_not_equal_200_status(test_case_id, response_data):
+        if TestStatusUtility.response_preview_chars is not None:
+            response_snapshot = TestStatusUtility.snapshot_response(response_data)
+            return{
+                    "test_case_id": test_case_id,
+                    "status": "Failed",
+                    "response_data": response_snapshot,
+                    "error": f"Status code: {response_data.status_code} - {response_snapshot} "
+            }
 
         return{
                 "test_case_id": test_case_id,
                 "status": "Failed",
                 "error": f"Status code: {response_data.status_code} - {response_data.text} "
-        }
\ No newline at end of file
+        }
+
+
+### Usage example: ###
+# TestStatusUtility.configure_response_storage(preview_chars=2048, blob_store=LocalBlobStore("results/response_blobs"))
+# TestStatusUtility.configure_response_storage(blob_store=S3BlobStore(s3_client, "my-bucket", "results/response_blobs"))
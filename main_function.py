@@ -1,19 +1,26 @@
 import json
+import pandas as pd
 from datetime import datetime
 from test_config import test_run_config
+from common_functions.file_functions import excel_operations
+from common_functions.file_functions.default_payload import (DEFAULT_PAYLOAD_SHEET_NAMES, build_default_payload_index,
+                                                             get_default_payload_from_excel, get_default_payload_index,
+                                                             lookup_default_payload)
 from common_functions.file_functions.excel_operations import multi_sheet_excel_reader
+from common_functions.file_functions.tc_cache import DEFAULT_TC_CACHE_DIR, get_code_version, get_tc_cache_file, load_tc_cache, save_tc_cache
 # from common_functions.db_service.mysql_db_service import my_sql_databasefrom common_functions.aws_service.aws_common_function import (s3_operations_manager)
 
 
 from common_functions.utils.logging_config import logger
+from common_functions.utils.payload_patch import patch_payload
 
 
 
 
 ### Excel Operations ###
-def read_source_tc_file(file_path):
-    # Read the Excel file
-    excel_data = multi_sheet_excel_reader(file_path)
+def read_source_tc_file(file_path, sheet_names=None, optional_sheet_names=()):
+    # Read the Excel file (only the requested sheets, plus the optional ones it has, when sheet_names is given)
+    excel_data = multi_sheet_excel_reader(file_path, sheet_names=sheet_names, optional_sheet_names=optional_sheet_names)
     
     # # Convert all values to strings in each sheet's DataFrame
     # for sheet_name in excel_data:
@@ -29,21 +36,27 @@ def get_tc_data_from_excel(excel_data, tc_master_column_data, tc_sheet_name):
     #drop the rows where to_process is     
     tc_master_data = tc_master_data[tc_master_data['to_process'] == 'Yes']
 
-    tc_meta_columns = tc_master_column_data
+    tc_meta_columns = [col for col in tc_master_column_data if col in tc_master_data.columns]
 
     tc_modify_data_columns = [
-        col for col in tc_master_data.columns if col not in tc_meta_columns
+        col for col in tc_master_data.columns if col not in tc_master_column_data
     ]
 
+    # Split the meta and modify columns once for the whole sheet instead of per row
+    test_case_ids = tc_master_data['test_case_id'].tolist()
+    tc_meta_rows = tc_master_data[tc_meta_columns].to_dict('records')
+
+    tc_modify_values = tc_master_data[tc_modify_data_columns].to_numpy(dtype=object)
+    # Mask out the cells where the value is "nan" in one vectorized comparison
+    tc_modify_keep = tc_modify_values != "nan"
+
     # Transform each row into the desired JSON structure
     json_data = []
-    for _, row in tc_master_data.iterrows():
-        test_case_id = row['test_case_id']
-        tc_meta = {col: row[col] for col in tc_meta_columns if col in row}
-        tc_modify_data = {col: row[col] for col in tc_modify_data_columns if col in row}
-        
-        # Filter out keys where the value is "nan"
-        tc_modify_data = {key: value for key, value in tc_modify_data.items() if value != "nan"}
+    for test_case_id, tc_meta, row_values, row_keep in zip(
+            test_case_ids, tc_meta_rows, tc_modify_values.tolist(), tc_modify_keep.tolist()):
+        tc_modify_data = {
+            col: value for col, value, keep in zip(tc_modify_data_columns, row_values, row_keep) if keep
+        }
 
         # Create the JSON structure
         json_row = {
@@ -52,12 +65,6 @@ def get_tc_data_from_excel(excel_data, tc_master_column_data, tc_sheet_name):
             "tc_modify_data": [tc_modify_data]
         }
 
-        # Format the JSON with indent=4
-        # formatted_json_row = json.dumps(json_row, indent=4)
-        # formatted_json_row = json.dumps(json_row)
-
-        # formatted_json_row = json_row
-
         json_data.append(json_row)
         
     final_tc_json_data = json_data
@@ -65,43 +72,66 @@ def get_tc_data_from_excel(excel_data, tc_master_column_data, tc_sheet_name):
     return final_tc_json_data
 
 
-def get_default_payload_from_excel(excel_data, sheet_name):
-    # Extract providers field data from the Excel sheets
-    
-    if sheet_name == "default_payload":
-    
-        default_payload_sheet_data = excel_data[sheet_name]
-    
-    elif sheet_name == "platform_api_default_payload":
-
-        default_payload_sheet_data = excel_data[sheet_name]
-    
-    else:
-        logger.error(f" Sheet name --> {sheet_name} is not found")
-
-    return default_payload_sheet_data.to_dict('records')
-
-
+def load_compiled_tc_data(file_path, tc_master_column_data, tc_sheet_name,
+                          default_payload_sheet_names=DEFAULT_PAYLOAD_SHEET_NAMES,
+                          cache_dir=DEFAULT_TC_CACHE_DIR):
+    """
+    Load the compiled test cases and default payload sheets, using the on-disk cache when possible.
 
-def get_default_payload_by_api_name(api_name, excel_data, sheet_name):
+    The cache entry is keyed by the workbook content hash, the tc_meta column list,
+    the tc sheet name and the source of the sheet reader and test case builder, so
+    an edited workbook or builder is re-read automatically.
 
-    default_payload_data = get_default_payload_from_excel(excel_data, sheet_name)
-        
-    if sheet_name == "platform_api_default_payload" or sheet_name == "default_payload":
-        try:
-            default_payload = next(payload for payload in default_payload_data 
-                                if payload['api_name'] == api_name and payload['environment'] == test_run_config["environment"])
-        except StopIteration:
-            raise ValueError(f"API name '{api_name}' not found in the default payload data for sheet '{sheet_name}'")
-    else:
-        logger.error(f" Sheet name --> {sheet_name} is not found")
+    Args:
+        file_path (str): Path of the test case workbook.
+        tc_master_column_data (list): tc_meta column names.
+        tc_sheet_name (str): Name of the test case sheet.
+        default_payload_sheet_names (tuple): Default payload sheets to keep; sheets
+            the workbook does not have are skipped.
+        cache_dir (str): Cache directory, or None to disable caching.
 
-    return default_payload
+    Returns:
+        tuple: (final_tc_json_data, excel_data) where excel_data only holds the
+        default payload sheets.
+    """
+    cache_file = None
+    if cache_dir:
+        builder_version = get_code_version(excel_operations, get_tc_data_from_excel, load_compiled_tc_data,
+                                           extra=(default_payload_sheet_names, pd.__version__))
+        cache_file = get_tc_cache_file(file_path, tc_master_column_data, tc_sheet_name, cache_dir, builder_version)
+        cached_data = load_tc_cache(cache_file)
+        if cached_data is not None:
+            logger.info(f"Loaded compiled test cases from cache {cache_file}")
+            return cached_data["tc_data"], cached_data["excel_data"]
+
+    excel_data = read_source_tc_file(file_path, sheet_names=[tc_sheet_name],
+                                     optional_sheet_names=default_payload_sheet_names)
+    tc_data = get_tc_data_from_excel(excel_data, tc_master_column_data, tc_sheet_name)
+    payload_excel_data = {
+        sheet_name: excel_data[sheet_name] for sheet_name in default_payload_sheet_names if sheet_name in excel_data
+    }
+
+    if cache_file:
+        save_tc_cache(cache_file, {"tc_data": tc_data, "excel_data": payload_excel_data})
+    return tc_data, payload_excel_data
+
+
+def get_default_payload_by_api_name(api_name, excel_data, sheet_name, deep_copy=True, environment=None):
+    # The row's default_api_payload is already parsed from JSON (once per loaded sheet)
+    # deep_copy=False returns the shared, read-only template; patch it with copy_on_write=True
+    # environment defaults to the current test run's environment
+
+    if environment is None:
+        environment = test_run_config["environment"]
+    return lookup_default_payload(api_name, excel_data, sheet_name, environment, deep_copy=deep_copy)
 
 
 # new_data_str is the new data to be updated in the temp_data_str
-def update_json_data_with_new_json(new_data_str, temp_data_str):
+def update_json_data_with_new_json(new_data_str, temp_data_str, copy_on_write=False, patch_plan=None):
     # new_data_str is the new data to be updated in the temp_data_str
+    # copy_on_write=True leaves temp_data_str untouched and returns a patched payload
+    # that shares every unpatched subtree with it (treat the result as read-only)
+    # patch_plan: compile_patch_plan(tuple(tc_modify_data_columns)) compiled once per sheet
     
     # Convert string inputs to Python dictionaries
     # Ensure New_data and Temp_data are dictionaries
@@ -110,50 +140,8 @@ def update_json_data_with_new_json(new_data_str, temp_data_str):
     # if isinstance(temp_data_str, str):
     #     temp_data = json.loads(temp_data_str.strip('"'))
 
-    def set_nested_value(d, key_path, value):
-        # Handle bracket notation by removing brackets and splitting
-        keys = key_path.replace('][', ' ').replace('[', '').replace(']', '').split()
-        
-        current = d
-        # Navigate through existing structure
-        for key in keys[:-1]:
-            if key in current:
-                current = current[key]
-            else:
-                logger.info(f"Warning: Key path '{key_path}' not found in the dictionary structure")
-                return
-        # Update the value at the final level
-        if keys[-1] in current:
-            current[keys[-1]] = value
-        else:
-            logger.info(f"Warning: Final key '{keys[-1]}' not found in the dictionary structure")
-
-    # Update Temp_data with New_data values
-    for key, value in new_data_str.items():
-        if '[' in key and ']' in key:
-            # Handle nested dictionary access
-            if "input_data" in temp_data_str:
-                set_nested_value(temp_data_str["input_data"], key, value)
-            elif "data" in temp_data_str:
-                set_nested_value(temp_data_str["data"], key, value)
-            else:
-                set_nested_value(temp_data_str, key, value)
-        else:
-            # Original logic for non-nested keys
-            if key in temp_data_str:
-                # If the key is at the top level, replace its value
-                temp_data_str[key] = value
-            elif "input_data" in temp_data_str and key in temp_data_str["input_data"]:  # this input key is for currier_int curd  api
-                # If the key is nested in "input_data", replace its value
-                temp_data_str["input_data"][key] = value
-            elif "data" in temp_data_str and key in temp_data_str["data"]: # this input key is for platform  api (places )
-                # If the key is nested in "data", replace its value
-                temp_data_str["data"][key] = value
-            else:
-                # Log if the key is not found in Temp_data
-                logger.info(f"Warning --> Iam update_json_data_with_new_json function: Key '{key}' from New_data is not available in Temp_data")
-    
-    return temp_data_str
+    # Key paths are parsed once per tc_modify_data column and cached
+    return patch_payload(new_data_str, temp_data_str, copy_on_write=copy_on_write, plan=patch_plan)
 
     # # Example usage
     # New_data = '"{"provider_id": 1177, "username": "PPPP", "password": "384783", "env": "QA", "AA":"23"}"'
@@ -165,7 +153,7 @@ def update_json_data_with_new_json(new_data_str, temp_data_str):
     # print(json.dumps(updated_data, indent=4))
 
 
-def new_update_json_data_with_new_json(new_data_str, temp_data_str):
+def new_update_json_data_with_new_json(new_data_str, temp_data_str, copy_on_write=False, patch_plan=None):
     """
     Updates a nested JSON object (`temp_data_str`) with values from another JSON object (`new_data_str`).
     Supports nested keys in bracket notation (e.g., "key1[key2][key3]").
@@ -173,53 +161,16 @@ def new_update_json_data_with_new_json(new_data_str, temp_data_str):
     Args:
         new_data_str (dict): Dictionary containing updates in key-value pairs.
         temp_data_str (dict): Target dictionary to be updated.
+        copy_on_write (bool): Leave `temp_data_str` untouched and return a patched copy
+            that shares every unpatched subtree with it, so large templates are not
+            deep-copied per test case. Treat the shared subtrees as read-only.
+        patch_plan (PatchPlan, optional): compile_patch_plan(tuple(columns), auto_vivify=True)
+            compiled once for the sheet's tc_modify_data columns; keys a row lacks are skipped.
 
     Returns:
         dict: Updated dictionary.
     """
 
-    def set_nested_value(data, key_path, value):
-        """
-        Navigates to a nested key in a dictionary (or list) using bracket notation
-        and sets its value, creating intermediate levels as needed.
-        """
-        keys = key_path.replace('][', '.').replace('[', '.').replace(']', '').split('.')
-        current = data
-
-        for i, key in enumerate(keys[:-1]):
-            if key.isdigit():
-                # Handle numeric keys for lists
-                key = int(key)
-                if not isinstance(current, list):
-                    raise TypeError(f"Expected list at '{keys[:i]}' but found {type(current)}.")
-                while len(current) <= key:
-                    current.append({})
-            else:
-                # Ensure intermediate keys exist as dictionaries
-                if key not in current:
-                    current[key] = {}
-            current = current[key]
-
-        # Set the final value
-        last_key = keys[-1]
-        if last_key.isdigit():
-            last_key = int(last_key)
-            if not isinstance(current, list):
-                raise TypeError(f"Expected list at '{keys}' but found {type(current)}.")
-            while len(current) <= last_key:
-                current.append({})
-            current[last_key] = value
-        else:
-            current[last_key] = value
-
-    # Iterate through each key-value pair in new_data_str
-    for key, value in new_data_str.items():
-        try:
-            set_nested_value(temp_data_str, key, value)
-        except Exception as e:
-            print(f"Error updating key '{key}': {e}")
-
-    return temp_data_str
-
-
-
+    # Key paths are parsed once per tc_modify_data column and cached
+    return patch_payload(new_data_str, temp_data_str, auto_vivify=True, copy_on_write=copy_on_write,
+                         plan=patch_plan)
@@ -0,0 +1,100 @@
+import asyncio
+import os
+import sys
+
+import httpx
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api_functions.api_client import api_client_manager
+
+TEST_RUN_CONFIG = {"environment": "qa", "api_base_url": "http://mock.test"}
+
+
+@pytest.fixture
+def serve(monkeypatch):
+    """Serve the given responses (or exceptions) in order and return the list of requests sent."""
+    monkeypatch.setitem(api_client_manager.settings, "backoff_base", 0.001)
+    monkeypatch.setitem(api_client_manager.settings, "max_retries", 3)
+    api_client_manager.close_all_clients()
+    requests = []
+    responses = []
+
+    def handler(request):
+        requests.append(request)
+        result = responses.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    client_kwargs = api_client_manager._client_kwargs.__func__
+
+    def mocked_client_kwargs(cls, test_run_config, base_url):
+        return {**client_kwargs(cls, test_run_config, base_url), "transport": httpx.MockTransport(handler)}
+
+    monkeypatch.setattr(api_client_manager, "_client_kwargs", classmethod(mocked_client_kwargs))
+
+    def set_responses(*results):
+        responses.extend(results)
+        return requests
+
+    yield set_responses
+    api_client_manager.close_all_clients()
+
+
+@pytest.mark.parametrize("method", ["GET", "POST"])
+def test_429_is_retried_for_every_method(serve, method):
+    requests = serve(httpx.Response(429, headers={"Retry-After": "0"}), httpx.Response(200))
+
+    assert api_client_manager.request(TEST_RUN_CONFIG, method, "/orders").status_code == 200
+    assert len(requests) == 2
+
+
+def test_503_is_retried_for_post_only_with_retry_after(serve):
+    requests = serve(httpx.Response(503, headers={"Retry-After": "0"}), httpx.Response(201))
+    assert api_client_manager.request(TEST_RUN_CONFIG, "POST", "/orders").status_code == 201
+    assert len(requests) == 2
+
+    requests = serve(httpx.Response(503), httpx.Response(201))
+    assert api_client_manager.request(TEST_RUN_CONFIG, "POST", "/orders").status_code == 503
+    assert len(requests) == 3
+
+
+def test_5xx_is_retried_for_idempotent_methods_only(serve):
+    requests = serve(httpx.Response(500), httpx.Response(502), httpx.Response(200))
+    assert api_client_manager.request(TEST_RUN_CONFIG, "GET", "/orders").status_code == 200
+    assert len(requests) == 3
+
+    requests = serve(httpx.Response(500), httpx.Response(200))
+    assert api_client_manager.request(TEST_RUN_CONFIG, "PATCH", "/orders/1").status_code == 500
+    assert len(requests) == 4
+
+
+def test_transport_errors_after_send_are_not_retried_for_post(serve):
+    serve(httpx.ConnectError("refused"), httpx.Response(201))
+    assert api_client_manager.request(TEST_RUN_CONFIG, "POST", "/orders").status_code == 201
+
+    serve(httpx.ReadTimeout("slow"), httpx.Response(201))
+    with pytest.raises(httpx.ReadTimeout):
+        api_client_manager.request(TEST_RUN_CONFIG, "POST", "/orders")
+
+
+def test_retries_stop_at_max_retries(serve):
+    requests = serve(*[httpx.Response(429, headers={"Retry-After": "0"})] * 3)
+
+    assert api_client_manager.request(TEST_RUN_CONFIG, "GET", "/orders", max_retries=2).status_code == 429
+    assert len(requests) == 3
+
+
+def test_async_request_retries_429(serve):
+    requests = serve(httpx.Response(429, headers={"Retry-After": "0"}), httpx.Response(200))
+
+    async def run():
+        try:
+            return await api_client_manager.arequest(TEST_RUN_CONFIG, "POST", "/orders")
+        finally:
+            await api_client_manager.aclose_all_clients()
+
+    assert asyncio.run(run()).status_code == 200
+    assert len(requests) == 2
@@ -0,0 +1,151 @@
+import os
+import sys
+from decimal import Decimal
+
+import numpy as np
+import pytest
+from botocore.exceptions import ClientError
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common_functions.aws_service.aws_common_function import athena_operations_manager
+
+FAST_POLLING = {"initial_interval": 0, "max_interval": 0}
+
+
+class StubAthenaClient:
+    """
+    Answers batch_get_query_execution from a list of states per query, one state per poll
+    (the last state repeats); queries without states come back unprocessed
+    """
+
+    def __init__(self, states):
+        self.states = {query_id: list(query_states) for query_id, query_states in states.items()}
+        self.batch_sizes = []
+        self.stopped = []
+
+    def batch_get_query_execution(self, QueryExecutionIds):
+        self.batch_sizes.append(len(QueryExecutionIds))
+        executions, unprocessed = [], []
+        for query_id in QueryExecutionIds:
+            query_states = self.states.get(query_id)
+            if not query_states:
+                unprocessed.append({"QueryExecutionId": query_id, "ErrorCode": "InvalidRequestException"})
+                continue
+            state = query_states.pop(0) if len(query_states) > 1 else query_states[0]
+            executions.append({"QueryExecutionId": query_id, "Status": {"State": state}})
+        return {"QueryExecutions": executions, "UnprocessedQueryExecutionIds": unprocessed}
+
+    def stop_query_execution(self, QueryExecutionId):
+        self.stopped.append(QueryExecutionId)
+
+
+def test_completions_are_yielded_as_queries_finish():
+    athena_client = StubAthenaClient({"fast": ["SUCCEEDED"], "slow": ["QUEUED", "RUNNING", "FAILED"]})
+
+    completions = list(athena_operations_manager.iter_query_completions(
+        athena_client, ["slow", "fast", None], **FAST_POLLING))
+
+    assert completions == [("fast", "SUCCEEDED"), ("slow", "FAILED")]
+
+
+def test_status_lookups_are_batched():
+    query_ids = [f"q{i}" for i in range(120)]
+    athena_client = StubAthenaClient({query_id: ["SUCCEEDED"] for query_id in query_ids})
+
+    states = athena_operations_manager.wait_for_queries_completion(athena_client, query_ids, **FAST_POLLING)
+
+    assert states == {query_id: "SUCCEEDED" for query_id in query_ids}
+    assert sorted(athena_client.batch_sizes) == [20, 50, 50]
+
+
+def test_unprocessed_queries_are_reported_instead_of_polled_forever():
+    athena_client = StubAthenaClient({"known": ["SUCCEEDED"]})
+
+    states = athena_operations_manager.wait_for_queries_completion(athena_client, ["known", "unknown"],
+                                                                   timeout=None, **FAST_POLLING)
+
+    assert states == {"known": "SUCCEEDED", "unknown": "ERROR"}
+    assert len(athena_client.batch_sizes) == athena_operations_manager.MAX_UNPROCESSED_POLLS
+
+
+def test_queries_running_at_the_deadline_time_out():
+    athena_client = StubAthenaClient({"done": ["SUCCEEDED"], "stuck": ["RUNNING"]})
+
+    states = athena_operations_manager.wait_for_queries_completion(
+        athena_client, ["done", "stuck"], timeout=0.05, cancel_on_timeout=True, **FAST_POLLING)
+
+    assert states == {"done": "SUCCEEDED", "stuck": "TIMEOUT"}
+    assert athena_client.stopped == ["stuck"]
+
+
+def test_polling_errors_count_as_unprocessed():
+    class FailingAthenaClient(StubAthenaClient):
+        def batch_get_query_execution(self, QueryExecutionIds):
+            raise ClientError({"Error": {"Code": "ThrottlingException", "Message": "slow down"}},
+                              "BatchGetQueryExecution")
+
+    states = athena_operations_manager.wait_for_queries_completion(FailingAthenaClient({}), ["q1"],
+                                                                   timeout=None, **FAST_POLLING)
+
+    assert states == {"q1": "ERROR"}
+
+
+COLUMN_INFO = [{"Name": "id", "Type": "integer"}, {"Name": "score", "Type": "double"},
+               {"Name": "passed", "Type": "boolean"}, {"Name": "amount", "Type": "decimal"},
+               {"Name": "name", "Type": "varchar"}]
+
+
+def make_row(*values):
+    return {"Data": [{} if value is None else {"VarCharValue": value} for value in values]}
+
+
+class StubResultsClient:
+    """
+    Serves get_query_results pages through a paginator, optionally failing after some pages
+    """
+
+    def __init__(self, pages, fail_after=None):
+        self.pages = pages
+        self.fail_after = fail_after
+
+    def get_paginator(self, operation_name):
+        return self
+
+    def paginate(self, QueryExecutionId, PaginationConfig):
+        for index, rows in enumerate(self.pages):
+            if index == self.fail_after:
+                raise ClientError({"Error": {"Code": "InternalServerException", "Message": "x"}}, "GetQueryResults")
+            yield {"ResultSet": {"Rows": rows, "ResultSetMetadata": {"ColumnInfo": COLUMN_INFO}}}
+
+
+RESULT_PAGES = [
+    [make_row("id", "score", "passed", "amount", "name"), make_row("1", "0.5", "true", "1.10", "a")],
+    [make_row("2", None, "false", None, None), make_row("3", "2", "true", "3", "c")],
+]
+
+
+def test_columnar_results_are_typed_and_skip_the_header_row():
+    columns = athena_operations_manager.get_query_results_columnar(StubResultsClient(RESULT_PAGES), "q1")
+
+    assert columns == {"id": [1, 2, 3], "score": [0.5, None, 2.0], "passed": [True, False, True],
+                       "amount": [Decimal("1.10"), None, Decimal("3")], "name": ["a", None, "c"]}
+
+
+def test_columnar_results_as_numpy():
+    columns = athena_operations_manager.get_query_results_columnar(StubResultsClient(RESULT_PAGES), "q1",
+                                                                   as_numpy=True)
+
+    assert columns["id"].dtype == np.int64 and columns["passed"].dtype == np.bool_
+    assert np.isnan(columns["score"][1]) and columns["name"].dtype == object
+    assert athena_operations_manager.get_query_results_df(StubResultsClient(RESULT_PAGES), "q1").shape == (3, 5)
+
+
+def test_page_errors_are_raised_on_request():
+    partial = athena_operations_manager.get_query_results_columnar(StubResultsClient(RESULT_PAGES, fail_after=1), "q1")
+    assert partial["id"] == [1]
+
+    with pytest.raises(ClientError):
+        athena_operations_manager.get_query_results_columnar(StubResultsClient(RESULT_PAGES, fail_after=1), "q1",
+                                                             raise_errors=True)
+    assert athena_operations_manager.get_query_results_columnar(StubResultsClient(RESULT_PAGES, fail_after=0), "q1") == {}
@@ -0,0 +1,53 @@
+import gc
+import os
+import sys
+
+import boto3
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common_functions.aws_service.aws_common_function import aws_clien_manager
+
+
+def make_session(access_key="AKIATEST"):
+    return boto3.Session(aws_access_key_id=access_key, aws_secret_access_key="secret", region_name="us-east-1")
+
+
+@pytest.fixture(autouse=True)
+def clean_pool():
+    aws_clien_manager.close_all_clients()
+    yield
+    aws_clien_manager.close_all_clients()
+
+
+def test_clients_are_shared_per_session_and_settings():
+    session = make_session()
+
+    s3_client = aws_clien_manager.activate_s3_client(session)
+    assert aws_clien_manager.activate_s3_client(session) is s3_client
+    assert aws_clien_manager.get_client(session, "s3", client_settings={"read_timeout": 300}) is not s3_client
+    assert aws_clien_manager.get_client(session, "s3", client_settings={"read_timeout": 300}) is \
+        aws_clien_manager.get_client(session, "s3", client_settings={"read_timeout": 300})
+    # Another session with the same credentials gets its own clients
+    assert aws_clien_manager.activate_s3_client(make_session()) is not s3_client
+
+
+def test_unknown_client_settings_are_rejected():
+    with pytest.raises(ValueError):
+        aws_clien_manager.get_client(make_session(), "s3", client_settings={"retries": 3})
+
+
+def test_collected_session_clients_are_closed_without_deadlock():
+    session = make_session()
+    aws_clien_manager.activate_dynamodb_client(session)
+    other_session = make_session("AKIAOTHER")
+    other_client = aws_clien_manager.activate_dynamodb_client(other_session)
+
+    # The finalizer runs while the pool lock is held, as when the GC collects a session mid get_client
+    with aws_clien_manager._clients_lock:
+        del session
+        gc.collect()
+
+    aws_clien_manager.activate_dynamodb_client(other_session)
+    assert list(aws_clien_manager.clients.values()) == [other_client]
@@ -0,0 +1,94 @@
+import os
+import sys
+
+import boto3
+import pytest
+from botocore.exceptions import ClientError
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common_functions.aws_service.aws_common_function import athena_operations_manager, dynamodb_operations_manager
+
+moto = pytest.importorskip("moto")
+
+
+@pytest.fixture
+def dynamodb_client(monkeypatch):
+    for name in ("AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY"):
+        monkeypatch.setenv(name, "testing")
+    with moto.mock_aws():
+        client = boto3.client("dynamodb", region_name="us-east-1")
+        for table_name, key_type in (("lookup_s", "S"), ("lookup_n", "N")):
+            client.create_table(TableName=table_name, BillingMode="PAY_PER_REQUEST",
+                                KeySchema=[{"AttributeName": "search_id", "KeyType": "HASH"}],
+                                AttributeDefinitions=[{"AttributeName": "search_id", "AttributeType": key_type}])
+            for i in range(1, 151):
+                client.put_item(TableName=table_name,
+                                Item={"search_id": {key_type: str(i)}, "status": {"S": "done"}})
+        yield client
+
+
+def test_dynamodb_lookup_keeps_the_requested_id_types(dynamodb_client):
+    items, unresolved = dynamodb_operations_manager.batch_lookup_search_ids(
+        dynamodb_client, "lookup_n", [1, "2", 3.0, 3, 999], key_type="N")
+
+    assert set(items) == {1, "2", 3.0}
+    assert items[1]["status"] == {"S": "done"}
+    assert unresolved == []
+
+    items, _ = dynamodb_operations_manager.batch_lookup_search_ids(
+        dynamodb_client, "lookup_s", list(range(1, 121)) + ["nan", None, "missing"])
+    assert len(items) == 120 and 120 in items
+
+
+def test_dynamodb_lookup_reports_unreadable_ids_separately(dynamodb_client):
+    items, unresolved = dynamodb_operations_manager.batch_lookup_search_ids(dynamodb_client, "no_such_table", [1, 2])
+
+    assert items == {}
+    assert unresolved == [1, 2]
+
+
+def test_dynamodb_lookup_rejects_projections_without_the_key(dynamodb_client):
+    with pytest.raises(ValueError):
+        dynamodb_operations_manager.batch_lookup_search_ids(dynamodb_client, "lookup_s", [1],
+                                                            projection_expression="#st",
+                                                            expression_attribute_names={"#st": "status"})
+    items, _ = dynamodb_operations_manager.batch_lookup_search_ids(
+        dynamodb_client, "lookup_s", [1], projection_expression="search_id, #st",
+        expression_attribute_names={"#st": "status"})
+    assert list(items) == [1]
+    with pytest.raises(ValueError):
+        dynamodb_operations_manager.batch_lookup_search_ids(dynamodb_client, "lookup_n", ["1; x"], key_type="N")
+
+
+def test_in_list_queries_quote_only_strings():
+    queries = athena_operations_manager.build_in_list_queries(
+        "SELECT * FROM t WHERE id IN ({search_ids})", [1, "2", "o'k", 2.5, 1], chunk_size=2)
+
+    assert queries == ["SELECT * FROM t WHERE id IN (1, '2')", "SELECT * FROM t WHERE id IN ('o''k', 2.5)"]
+    assert athena_operations_manager.build_in_list_queries("{search_ids}", ["7"], search_id_type="number") == ["7"]
+    with pytest.raises(ValueError):
+        athena_operations_manager.build_in_list_queries("{search_ids}", ["7 OR 1=1"], search_id_type="number")
+
+
+def test_athena_lookup_reports_failed_chunks_as_unresolved(monkeypatch):
+    def execute_queries(athena_client, queries, database, s3_output, max_workers):
+        return ["q1", None, "q3", "q4"][:len(queries)]
+
+    def iter_query_completions(athena_client, query_ids, timeout):
+        yield from [("q1", "SUCCEEDED"), ("q3", "TIMEOUT"), ("q4", "SUCCEEDED")]
+
+    def get_query_results_columnar(athena_client, query_id, raise_errors):
+        if query_id == "q4":
+            raise ClientError({"Error": {"Code": "InternalServerException", "Message": "x"}}, "GetQueryResults")
+        return {"search_id": ["a"], "status": ["done"]}
+
+    monkeypatch.setattr(athena_operations_manager, "execute_queries", execute_queries)
+    monkeypatch.setattr(athena_operations_manager, "iter_query_completions", iter_query_completions)
+    monkeypatch.setattr(athena_operations_manager, "get_query_results_columnar", get_query_results_columnar)
+
+    rows, unresolved = athena_operations_manager.batch_lookup_search_ids(
+        None, "SELECT * FROM t WHERE search_id IN ({search_ids})", list("abcdefgh"), "db", "s3://out/", chunk_size=2)
+
+    assert rows == {"a": [{"search_id": "a", "status": "done"}]}
+    assert sorted(unresolved) == list("cdefgh")
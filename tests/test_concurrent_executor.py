@@ -0,0 +1,90 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common_functions.utils.concurrent_executor import (TokenBucketRateLimiter, run_test_cases_async,
+                                                        run_test_cases_concurrently)
+
+
+def make_test_case(test_case_id, api_name):
+    return {"test_case_id": test_case_id, "tc_meta": [{"api_name": api_name}]}
+
+
+class InFlightCounter:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.in_flight = {}
+        self.peak = {}
+
+    def enter(self, api_name):
+        with self.lock:
+            self.in_flight[api_name] = self.in_flight.get(api_name, 0) + 1
+            self.peak[api_name] = max(self.peak.get(api_name, 0), self.in_flight[api_name])
+
+    def exit(self, api_name):
+        with self.lock:
+            self.in_flight[api_name] -= 1
+
+
+TEST_CASES = [make_test_case(i, "capped" if i % 2 else "open") for i in range(20)]
+
+
+def test_thread_pool_keeps_order_and_per_api_limits():
+    counter = InFlightCounter()
+
+    def run_test_case(test_case):
+        api_name = test_case["tc_meta"][0]["api_name"]
+        counter.enter(api_name)
+        time.sleep(0.01)
+        counter.exit(api_name)
+        if test_case["test_case_id"] == 5:
+            raise RuntimeError("boom")
+        return {"test_case_id": test_case["test_case_id"], "status": "Passed"}
+
+    test_results = run_test_cases_concurrently(TEST_CASES, run_test_case, max_workers=8,
+                                               api_concurrency_limits={"capped": 2})
+
+    assert [result["test_case_id"] for result in test_results] == list(range(20))
+    assert test_results[5]["status"] != "Passed"
+    assert counter.peak["capped"] <= 2 < counter.peak["open"]
+    assert run_test_cases_concurrently([], run_test_case) == []
+
+
+def test_async_runner_keeps_order_and_per_api_limits():
+    counter = InFlightCounter()
+
+    async def run_test_case(test_case):
+        api_name = test_case["tc_meta"][0]["api_name"]
+        counter.enter(api_name)
+        await asyncio.sleep(0.01)
+        counter.exit(api_name)
+        return {"test_case_id": test_case["test_case_id"], "status": "Passed"}
+
+    test_results = asyncio.run(run_test_cases_async(TEST_CASES, run_test_case, max_concurrency=6,
+                                                    api_concurrency_limits={"capped": 1}))
+
+    assert [result["test_case_id"] for result in test_results] == list(range(20))
+    assert counter.peak["capped"] == 1 and counter.peak["open"] <= 6
+
+
+def test_rate_limiter_allows_a_burst_then_smooths():
+    rate_limiter = TokenBucketRateLimiter(rate=50, capacity=5)
+
+    start = time.monotonic()
+    for _ in range(5):
+        rate_limiter.acquire()
+    burst_seconds = time.monotonic() - start
+    for _ in range(5):
+        rate_limiter.acquire()
+    total_seconds = time.monotonic() - start
+
+    assert burst_seconds < 0.05
+    assert total_seconds >= 0.09
+    with pytest.raises(ValueError):
+        TokenBucketRateLimiter(rate=0)
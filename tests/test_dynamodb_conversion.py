@@ -0,0 +1,43 @@
+import os
+import sys
+from decimal import Decimal
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common_functions.aws_service.aws_common_function import dynamodb_operations_manager
+
+ITEMS = [
+    {"id": {"S": "a"}, "amount": {"N": "1.5"}, "tags": {"SS": ["x"]}},
+    {"id": {"S": "b"}, "amount": {"NULL": True}, "extra": {"BOOL": True}},
+    {"id": {"S": "c"}, "amount": {"N": "3"}, "tags": {"L": [{"N": "1"}, {"M": {"k": {"S": "v"}}}]}},
+]
+
+
+def test_items_to_columns_fills_missing_attributes_and_nulls():
+    columns = dynamodb_operations_manager.items_to_columns(ITEMS)
+
+    assert list(columns) == ["id", "amount", "tags", "extra"]
+    assert columns["id"] == ["a", "b", "c"]
+    assert columns["amount"].dtype == np.float64
+    assert columns["amount"][0] == 1.5 and np.isnan(columns["amount"][1])
+    assert columns["extra"] == [None, True, None]
+    # A column whose values change type falls back to the recursive converter
+    assert columns["tags"] == [{"x"}, None, [1.0, {"k": "v"}]]
+
+
+def test_items_to_columns_can_keep_decimals():
+    columns = dynamodb_operations_manager.items_to_columns(iter(ITEMS), use_decimal=True)
+
+    assert columns["amount"] == [Decimal("1.5"), None, Decimal("3")]
+    assert columns["tags"][2] == [Decimal("1"), {"k": "v"}]
+
+
+def test_query_results_to_df():
+    df = dynamodb_operations_manager.query_results_to_df(ITEMS)
+
+    assert df.shape == (3, 4)
+    assert df["amount"].dtype == np.float64
+    assert dynamodb_operations_manager.query_results_to_df([]).empty
+    assert dynamodb_operations_manager.query_results_to_df([{"id": {"X": "bad"}}, {"id": {"S": "a"}}]).empty
@@ -0,0 +1,74 @@
+import os
+import sys
+
+import pytest
+from botocore.exceptions import ClientError
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common_functions.aws_service.aws_common_function import dynamodb_operations_manager
+
+
+def throttling_error(operation_name):
+    return ClientError({"Error": {"Code": "ProvisionedThroughputExceededException", "Message": "slow down"}},
+                       operation_name)
+
+
+class PagedClient:
+    """Stub DynamoDB client serving pages of 2 items, failing on the given page of a scan segment"""
+
+    def __init__(self, item_count=10, fail_page=None, fail_segment=None):
+        self.items = [{"id": {"S": str(i)}, "v": {"N": str(i % 2)}} for i in range(item_count)]
+        self.fail_page = fail_page
+        self.fail_segment = fail_segment
+        self.calls = []
+
+    def _page(self, operation_name, **params):
+        self.calls.append(params)
+        start = params.get("ExclusiveStartKey", {}).get("offset", 0)
+        page = start // 2
+        if page == self.fail_page and params.get("Segment") in (None, self.fail_segment):
+            raise throttling_error(operation_name)
+        items = self.items[start:start + 2]
+        if params.get("TotalSegments"):
+            items = [item for item in items if int(item["id"]["S"]) % params["TotalSegments"] == params["Segment"]]
+        response = {"Items": items}
+        if start + 2 < len(self.items):
+            response["LastEvaluatedKey"] = {"offset": start + 2}
+        return response
+
+    def query(self, **params):
+        return self._page("Query", **params)
+
+    def scan(self, **params):
+        return self._page("Scan", **params)
+
+
+def test_iter_scan_follows_pages_and_stops_at_limit():
+    client = PagedClient()
+
+    assert len(list(dynamodb_operations_manager.iter_scan(client, "t"))) == 10
+    client.calls.clear()
+    items = list(dynamodb_operations_manager.iter_scan(client, "t", limit=3, page_size=2))
+    assert [item["id"]["S"] for item in items] == ["0", "1", "2"]
+    # Limit is the page size, not the items still wanted (it applies before FilterExpression)
+    assert [call["Limit"] for call in client.calls] == [2, 2]
+
+
+def test_iter_query_and_scan_raise_on_a_later_page():
+    with pytest.raises(ClientError):
+        list(dynamodb_operations_manager.iter_query(PagedClient(fail_page=2), "t", "id = :id"))
+    with pytest.raises(ClientError):
+        dynamodb_operations_manager.scan_table(PagedClient(fail_page=2), "t")
+
+
+def test_iter_scan_can_return_partial_results():
+    items = list(dynamodb_operations_manager.iter_scan(PagedClient(fail_page=2), "t", raise_errors=False))
+    assert len(items) == 4
+
+
+def test_parallel_scan_surfaces_a_failed_segment():
+    assert len(dynamodb_operations_manager.parallel_scan(PagedClient(), "t", total_segments=3)) == 10
+    with pytest.raises(ClientError):
+        dynamodb_operations_manager.parallel_scan(PagedClient(fail_page=1, fail_segment=1), "t", total_segments=3,
+                                                  raise_errors=False)
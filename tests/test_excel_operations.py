@@ -0,0 +1,61 @@
+import datetime
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common_functions.file_functions.excel_operations import load_workbook_sheets
+
+
+@pytest.fixture
+def workbook_path(tmp_path):
+    from openpyxl import Workbook
+
+    workbook = Workbook()
+    tc_sheet = workbook.active
+    tc_sheet.title = "tc"
+    # Duplicate and missing headers, blank rows inside and after the data, int columns with gaps
+    tc_sheet.append(["test_case_id", "api_name", "api_name", "quantity", "rate", "flag", None, "run_date"])
+    tc_sheet.append([1, "orders", "users", 1, 1.5, "yes", None, datetime.datetime(2024, 1, 1)])
+    tc_sheet.append([])
+    tc_sheet.append([2, None, "users", None, 2, "#N/A", None, None])
+    tc_sheet.append([3, "orders", None, 3, None, True, None, None])
+    tc_sheet.append([])
+    tc_sheet.append([])
+    workbook.create_sheet("empty")
+    workbook.create_sheet("header_only").append(["payload_key", "payload"])
+
+    file_path = tmp_path / "test_cases.xlsx"
+    workbook.save(file_path)
+    return str(file_path)
+
+
+@pytest.mark.parametrize("dtype", [None, {"test_case_id": str}])
+@pytest.mark.parametrize("cast_to_str", [True, False])
+def test_read_only_matches_read_excel(workbook_path, dtype, cast_to_str):
+    expected = load_workbook_sheets(workbook_path, dtype=dtype, cast_to_str=cast_to_str)
+    actual = load_workbook_sheets(workbook_path, dtype=dtype, cast_to_str=cast_to_str, read_only=True)
+
+    assert list(actual) == list(expected)
+    for sheet_name, expected_df in expected.items():
+        pd.testing.assert_frame_equal(actual[sheet_name], expected_df)
+
+
+def test_read_only_matches_pandas_read_excel(workbook_path):
+    expected = pd.read_excel(workbook_path, sheet_name=None)
+    actual = load_workbook_sheets(workbook_path, cast_to_str=False, read_only=True)
+
+    for sheet_name, expected_df in expected.items():
+        pd.testing.assert_frame_equal(actual[sheet_name], expected_df)
+
+
+def test_read_only_mangles_duplicate_headers_and_keeps_float_strings(workbook_path):
+    df = load_workbook_sheets(workbook_path, sheet_names=["tc"], read_only=True)["tc"]
+
+    assert list(df.columns[:3]) == ["test_case_id", "api_name", "api_name.1"]
+    assert len(df) == 4
+    # Integer columns with empty cells are floats in pd.read_excel, so they stringify as "1.0"
+    assert df["quantity"].iloc[[0, 3]].tolist() == ["1.0", "3.0"]
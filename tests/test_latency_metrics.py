@@ -0,0 +1,78 @@
+import os
+import random
+import sys
+
+import httpx
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api_functions.api_client import api_client_manager
+from common_functions.utils.latency_metrics import LatencyHistogram, LatencyRecorder
+
+
+def exact_percentile(values, percentile):
+    values = sorted(values)
+    return values[max(1, -(-len(values) * percentile // 100)) - 1]
+
+
+def test_histogram_percentiles_stay_within_relative_precision():
+    rng = random.Random(7)
+    values = [int(rng.lognormvariate(16, 1)) for _ in range(10000)]
+    histogram = LatencyHistogram()
+    for value in values:
+        histogram.record(value)
+
+    for percentile in (50, 90, 99, 100):
+        expected = exact_percentile(values, percentile)
+        assert expected <= histogram.percentile(percentile) <= expected * 1.01
+    assert histogram.min == min(values) and histogram.max == max(values)
+    assert histogram.summary()["count"] == 10000
+
+
+def test_histogram_small_values_are_exact_and_merge_adds_counts():
+    first, second = LatencyHistogram(), LatencyHistogram()
+    for value in range(1, 101):
+        (first if value % 2 else second).record(value)
+    first.merge(second)
+
+    assert first.count == 100
+    assert first.percentile(50) == 50
+    assert LatencyHistogram().percentile(50) is None
+    assert LatencyHistogram().summary() == {"count": 0}
+
+
+def test_recorder_keeps_phases_per_api_and_test_case():
+    latency_recorder = LatencyRecorder()
+    latency_recorder.record("orders", "qa", "total", 2_000_000, test_case_id=1)
+    latency_recorder.record("orders", "qa", "total", 4_000_000, test_case_id=1)
+    with latency_recorder.phase("orders", "qa", "json_parse", test_case_id=2):
+        pass
+
+    rows = {(row["api_name"], row["phase"]): row for row in latency_recorder.summary_rows()}
+    assert rows[("orders", "total")]["count"] == 2
+    assert rows[("orders", "json_parse")]["count"] == 1
+    results = latency_recorder.add_timings_to_results([{"test_case_id": 1}, {"test_case_id": 3}])
+    assert results == [{"test_case_id": 1, "total_ms": 6.0}, {"test_case_id": 3}]
+
+
+def test_api_client_records_each_attempt_and_the_backoff(monkeypatch):
+    monkeypatch.setitem(api_client_manager.settings, "backoff_base", 0.001)
+    responses = [httpx.Response(500), httpx.Response(200)]
+    client_kwargs = api_client_manager._client_kwargs.__func__
+
+    def mocked_client_kwargs(cls, test_run_config, base_url):
+        transport = httpx.MockTransport(lambda request: responses.pop(0))
+        return {**client_kwargs(cls, test_run_config, base_url), "transport": transport}
+
+    monkeypatch.setattr(api_client_manager, "_client_kwargs", classmethod(mocked_client_kwargs))
+    api_client_manager.close_all_clients()
+    latency_recorder = LatencyRecorder()
+    try:
+        api_client_manager.request({"environment": "qa", "api_base_url": "http://mock.test"}, "GET", "/orders",
+                                   latency_recorder=latency_recorder, api_name="orders", test_case_id=1)
+    finally:
+        api_client_manager.close_all_clients()
+
+    rows = {row["phase"]: row for row in latency_recorder.summary_rows()}
+    assert rows["total"]["count"] == 2
+    assert rows["retry_backoff"]["count"] == 1
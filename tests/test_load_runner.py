@@ -0,0 +1,83 @@
+import json
+import os
+import sys
+
+import httpx
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api_functions.api_client import api_client_manager
+from api_functions.load_runner import LoadStats, build_load_request, check_load_thresholds, run_load_test
+
+
+@pytest.fixture
+def excel_data():
+    return {"default_payload": pd.DataFrame([
+        {"api_name": "create_order", "environment": "dev", "default_api_payload": json.dumps({"qty": 1, "env": "dev"})},
+        {"api_name": "create_order", "environment": "qa", "default_api_payload": json.dumps({"qty": 1, "env": "qa"})},
+    ])}
+
+
+def make_test_case(test_case_id, **tc_modify_data):
+    return {
+        "test_case_id": test_case_id,
+        "tc_meta": [{"api_name": "create_order", "api_method": "POST", "api_url": "/orders",
+                     "default_api_payload": "nan"}],
+        "tc_modify_data": [tc_modify_data],
+    }
+
+
+@pytest.fixture
+def mock_transport(monkeypatch):
+    requests = []
+
+    def handler(request):
+        requests.append(json.loads(request.content))
+        status_code = 500 if requests[-1]["qty"] == 500 else 200
+        return httpx.Response(status_code, json={})
+
+    client_kwargs = api_client_manager._client_kwargs.__func__
+
+    def mocked_client_kwargs(cls, test_run_config, base_url):
+        return {**client_kwargs(cls, test_run_config, base_url), "transport": httpx.MockTransport(handler)}
+
+    monkeypatch.setattr(api_client_manager, "_client_kwargs", classmethod(mocked_client_kwargs))
+    return requests
+
+
+def test_build_load_request_uses_the_given_environment(excel_data):
+    method, url, payload = build_load_request(make_test_case(1, qty=5), excel_data, "qa")
+
+    assert (method, url) == ("POST", "/orders")
+    assert payload == {"qty": 5, "env": "qa"}
+    # The shared template is patched copy-on-write, so the next test case starts from the original
+    assert build_load_request(make_test_case(2), excel_data, "qa")[2] == {"qty": 1, "env": "qa"}
+
+
+def test_load_stats_counts_dropped_arrivals_as_errors():
+    stats = LoadStats(window_s=1.0)
+    stats.start = 0.0
+    stats.end = 2.0
+    stats.record(0.1, 0.2, is_error=False)
+    stats.record(1.1, 1.2, is_error=True)
+    stats.record_dropped(1.5)
+
+    report = stats.report()
+    assert report["summary"]["error_rate"] == round(2 / 3, 4)
+    assert [window["dropped"] for window in report["timeline"]] == [0, 1]
+    assert check_load_thresholds(report, max_error_rate=0.5) == ["error_rate 0.6667 > 0.5"]
+
+
+def test_run_load_test_sends_each_request_once(excel_data, mock_transport):
+    test_run_config = {"environment": "qa", "api_base_url": "http://mock.test"}
+    test_cases = [make_test_case(1, qty=2), make_test_case(2, qty=500)]
+
+    report = run_load_test(test_cases, excel_data, test_run_config, mode="closed", vus=1, duration_s=0.2)
+
+    summary = report["summary"]
+    assert summary["requests"] == len(mock_transport) > 0
+    assert {request["env"] for request in mock_transport} == {"qa"}
+    # The 500s are not retried, so they count as errors
+    assert summary["errors"] == sum(1 for request in mock_transport if request["qty"] == 500)
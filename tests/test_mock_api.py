@@ -0,0 +1,87 @@
+import os
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api_functions import mock_api
+
+HEADERS = {"X-API-Key": "test-key"}
+
+
+def make_order(order_id, user_id=1, product_id=2):
+    return {"order_id": order_id, "user_id": user_id, "product_id": product_id, "quantity": 1,
+            "address": "Chennai", "payment_method": "card"}
+
+
+@pytest.fixture
+def client(request, monkeypatch, tmp_path):
+    monkeypatch.setattr(mock_api, "API_KEY", "test-key")
+    monkeypatch.setattr(mock_api, "SNAPSHOT_DIR", str(tmp_path / "snapshots"))
+    monkeypatch.setattr(mock_api, "db", mock_api.create_database("memory", f"orders_{id(request)}"))
+    os.makedirs(mock_api.SNAPSHOT_DIR)
+    with TestClient(mock_api.app) as test_client:
+        yield test_client
+
+
+def test_requests_need_the_api_key(client):
+    assert client.get("/api/fixeddata").status_code == 403
+    assert client.get("/api/fixeddata", headers={"X-API-Key": "wrong"}).status_code == 403
+    assert client.get("/api/fixeddata", headers=HEADERS).json()["data"]["name"] == "Karthick"
+
+
+def test_create_and_page_orders(client):
+    assert client.post("/api/orders", headers=HEADERS, json=make_order(1)).status_code == 200
+    assert client.post("/api/orders", headers=HEADERS, json=make_order(1)).status_code == 400
+    assert client.post("/api/orders", headers=HEADERS, json=make_order(2, user_id=9)).status_code == 400
+
+    response = client.post("/api/orders/bulk", headers=HEADERS,
+                           json=[make_order(i) for i in range(2, 6)] + [make_order(2), make_order(9, product_id=9)])
+    assert response.json()["data"]["created"] == 4
+    assert [error["index"] for error in response.json()["data"]["errors"]] == [4, 5]
+
+    page = client.get("/api/orders", headers=HEADERS, params={"limit": 2, "after_order_id": 1}).json()
+    assert [order["order_id"] for order in page["data"]] == [2, 3]
+    assert page["pagination"]["next_after_order_id"] == 3
+
+
+def test_stream_orders_reads_in_batches(client, monkeypatch):
+    monkeypatch.setattr(mock_api, "ORDERS_STREAM_BATCH_SIZE", 3)
+    client.post("/api/orders/bulk", headers=HEADERS, json=[make_order(i) for i in range(1, 11)])
+
+    streamed = client.get("/api/orders", headers=HEADERS, params={"stream": True}).json()["data"]
+    assert [order["order_id"] for order in streamed] == list(range(1, 11))
+    limited = client.get("/api/orders", headers=HEADERS, params={"stream": True, "limit": 4, "after_order_id": 5})
+    assert [order["order_id"] for order in limited.json()["data"]] == [6, 7, 8, 9]
+
+
+def test_snapshot_restore_and_reset(client):
+    client.post("/api/orders", headers=HEADERS, json=make_order(1))
+    assert client.post("/api/admin/snapshot", headers=HEADERS, json={"name": "one"}).status_code == 200
+    assert client.post("/api/admin/snapshot", headers=HEADERS,
+                       json={"name": "file", "path": "one.db"}).status_code == 200
+    client.post("/api/orders", headers=HEADERS, json=make_order(2))
+
+    client.post("/api/admin/restore", headers=HEADERS, json={"name": "one"})
+    assert len(client.get("/api/orders", headers=HEADERS).json()["data"]) == 1
+    client.post("/api/admin/reset", headers=HEADERS)
+    assert client.get("/api/orders", headers=HEADERS).json()["data"] == []
+    client.post("/api/admin/restore", headers=HEADERS, json={"path": "one.db"})
+    assert len(client.get("/api/orders", headers=HEADERS).json()["data"]) == 1
+    assert client.post("/api/admin/restore", headers=HEADERS, json={"name": "missing"}).status_code == 404
+
+
+@pytest.mark.parametrize("path", ["../escape.db", "/tmp/escape.db", "."])
+def test_snapshot_paths_stay_in_the_snapshot_dir(client, path):
+    response = client.post("/api/admin/snapshot", headers=HEADERS, json={"name": "x", "path": path})
+
+    assert response.status_code == 400
+    assert client.post("/api/admin/restore", headers=HEADERS, json={"path": path}).status_code == 400
+
+
+def test_snapshot_files_are_disabled_without_a_snapshot_dir(client, monkeypatch):
+    monkeypatch.setattr(mock_api, "SNAPSHOT_DIR", None)
+
+    assert client.post("/api/admin/snapshot", headers=HEADERS, json={"path": "one.db"}).status_code == 400
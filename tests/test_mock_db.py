@@ -0,0 +1,98 @@
+import os
+import sqlite3
+import sys
+import threading
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api_functions.mock_db import MockDatabase
+
+SCHEMA_SQL = """
+    CREATE TABLE parents (parent_id INTEGER PRIMARY KEY);
+    CREATE TABLE children (
+        child_id INTEGER PRIMARY KEY,
+        parent_id INTEGER REFERENCES parents(parent_id) DEFERRABLE INITIALLY DEFERRED
+    );
+    INSERT INTO parents VALUES (1);
+"""
+
+
+@pytest.fixture(params=["file", "memory"])
+def db(request, tmp_path):
+    if request.param == "memory":
+        database = MockDatabase.in_memory(f"test_{id(request)}", pragmas={"foreign_keys": "ON"})
+    else:
+        database = MockDatabase(str(tmp_path / "test.db"), pragmas={"foreign_keys": "ON"})
+    database.executescript(SCHEMA_SQL)
+    yield database
+    database.shutdown()
+
+
+def child_count(db):
+    return db.fetchone("SELECT COUNT(*) FROM children")[0]
+
+
+def test_write_transaction_rolls_back_on_error(db):
+    with pytest.raises(ValueError):
+        with db.write_transaction() as conn:
+            conn.execute("INSERT INTO children VALUES (1, 1)")
+            raise ValueError("boom")
+
+    assert child_count(db) == 0
+    assert not db.connection().in_transaction
+
+
+def test_failed_commit_leaves_no_open_transaction(db):
+    # The deferred foreign key is only checked at COMMIT
+    with pytest.raises(sqlite3.IntegrityError):
+        with db.write_transaction() as conn:
+            conn.execute("INSERT INTO children VALUES (1, 99)")
+
+    assert not db.connection().in_transaction
+    with db.write_transaction() as conn:
+        conn.execute("INSERT INTO children VALUES (2, 1)")
+    assert child_count(db) == 1
+
+
+def test_snapshot_restore_round_trip(db, tmp_path):
+    db.snapshot("empty")
+    snapshot_file = str(tmp_path / "snapshot.db")
+    with db.write_transaction() as conn:
+        conn.execute("INSERT INTO children VALUES (1, 1)")
+    db.snapshot("one", path=snapshot_file)
+
+    db.restore("empty")
+    assert child_count(db) == 0
+    db.restore(path=snapshot_file)
+    assert child_count(db) == 1
+    assert db.snapshot_names() == ["empty", "one"]
+    with pytest.raises(KeyError):
+        db.restore("missing")
+
+
+def test_concurrent_reads_writes_and_restores(db):
+    db.snapshot("start")
+    errors = []
+
+    def worker(worker_index):
+        for i in range(50):
+            try:
+                if i % 10 == 9:
+                    db.restore("start")
+                elif i % 3 == 0:
+                    with db.write_transaction() as conn:
+                        conn.execute("INSERT INTO children (parent_id) VALUES (1)")
+                else:
+                    db.fetchall("SELECT * FROM children")
+            except sqlite3.Error as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
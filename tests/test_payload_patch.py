@@ -0,0 +1,81 @@
+import json
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common_functions.file_functions.default_payload import lookup_default_payload
+from common_functions.utils.payload_patch import (compile_patch_plan, freeze_payload, patch_payload,
+                                                  thaw_payload)
+
+TEMPLATE = {
+    "provider_id": 1,
+    "input_data": {"username": "user", "type": "export", "settings": {"retries": 1}},
+    "lanes": [{"origin": "A"}],
+}
+
+
+def test_strict_patch_replaces_existing_keys_only():
+    payload = patch_payload({"provider_id": 2, "username": "qa", "[settings][retries]": 3, "missing": 1},
+                            thaw_payload(TEMPLATE))
+
+    assert payload["provider_id"] == 2
+    assert payload["input_data"]["username"] == "qa"
+    assert payload["input_data"]["settings"]["retries"] == 3
+    assert "missing" not in payload
+
+
+def test_auto_vivify_patch_creates_missing_paths():
+    payload = patch_payload({"lanes[1].origin": "B", "extra.flag": True}, thaw_payload(TEMPLATE), auto_vivify=True)
+
+    assert payload["lanes"] == [{"origin": "A"}, {"origin": "B"}]
+    assert payload["extra"] == {"flag": True}
+
+
+def test_auto_vivify_errors_are_logged_not_raised():
+    payload = patch_payload({"provider_id.0": "x"}, thaw_payload(TEMPLATE), auto_vivify=True)
+
+    assert payload["provider_id"] == 1
+
+
+def test_sheet_plan_skips_keys_a_row_does_not_have():
+    plan = compile_patch_plan(("provider_id", "username"))
+
+    assert compile_patch_plan(("provider_id", "username")) is plan
+    assert patch_payload({"username": "qa"}, thaw_payload(TEMPLATE), plan=plan)["provider_id"] == 1
+
+
+def test_copy_on_write_leaves_the_frozen_template_untouched():
+    template = freeze_payload(TEMPLATE)
+
+    payload = patch_payload({"username": "qa"}, template, copy_on_write=True)
+
+    assert payload["input_data"]["username"] == "qa"
+    assert template["input_data"]["username"] == "user"
+    # Unpatched subtrees are shared, not copied
+    assert payload["lanes"] is template["lanes"]
+    assert json.loads(json.dumps(payload))["provider_id"] == 1
+    with pytest.raises(TypeError):
+        patch_payload({"username": "qa"}, template)
+    with pytest.raises(TypeError):
+        template["input_data"]["username"] = "qa"
+
+
+def test_default_payload_is_parsed_once_per_sheet():
+    excel_data = {"default_payload": pd.DataFrame([
+        {"api_name": "rates", "environment": "qa", "default_api_payload": json.dumps(TEMPLATE)},
+        {"api_name": "rates", "environment": "qa", "default_api_payload": "{}"},
+    ])}
+
+    template = lookup_default_payload("rates", excel_data, "default_payload", "qa", deep_copy=False)
+    row = lookup_default_payload("rates", excel_data, "default_payload", "qa")
+
+    assert template["default_api_payload"] == TEMPLATE
+    assert lookup_default_payload("rates", excel_data, "default_payload", "qa", deep_copy=False) is template
+    row["default_api_payload"]["provider_id"] = 5
+    assert template["default_api_payload"]["provider_id"] == 1
+    with pytest.raises(ValueError):
+        lookup_default_payload("rates", excel_data, "default_payload", "prod")
@@ -0,0 +1,48 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common_functions.file_functions.blob_store import LocalBlobStore, get_content_sha256
+from common_functions.utils import tset_ststus_utility
+
+# Aliased so pytest does not collect the Test* class
+StatusUtility = tset_ststus_utility.TestStatusUtility
+
+
+@pytest.fixture
+def blob_store(tmp_path):
+    store = LocalBlobStore(str(tmp_path / "blobs"))
+    StatusUtility.configure_response_storage(preview_chars=100, blob_store=store)
+    yield store
+    StatusUtility.configure_response_storage(preview_chars=None)
+
+
+@pytest.mark.parametrize("body, truncated", [
+    (b"x" * 100, False),
+    (b"x" * 101, True),
+    ("é".encode("utf-8") * 100, False),
+    ("é".encode("utf-8") * 101, True),
+    (b"\xff" * 300, True),
+    (b"\xff" * 99, False),
+])
+def test_truncation_is_decided_on_body_bytes(blob_store, body, truncated):
+    snapshot = StatusUtility.snapshot_response(body)
+
+    assert snapshot.truncated is truncated
+    assert snapshot.size == len(body)
+    assert snapshot.sha256 == get_content_sha256(body)
+    if truncated:
+        assert blob_store.get(snapshot.sha256) == body
+    else:
+        assert snapshot.blob_uri is None
+
+
+def test_failed_record_keeps_a_bounded_preview(blob_store):
+    record = StatusUtility.test_case_try_except_fail(7, {"items": list(range(100))}, "mismatch")
+
+    assert record["status"] == "Failed"
+    assert len(str(record["response_data"])) == 100
+    assert record["response_data"].blob_uri is not None
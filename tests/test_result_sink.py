@@ -0,0 +1,64 @@
+import csv
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common_functions.file_functions.result_sink import ResultSink
+
+
+def make_record(test_case_id, status="Passed", **extra):
+    return {"test_case_id": test_case_id, "status": status, "response_data": {"id": test_case_id}, **extra}
+
+
+def read_jsonl(file_paths):
+    records = []
+    for file_path in file_paths:
+        with open(file_path, encoding="utf-8") as f:
+            records.extend(json.loads(line) for line in f)
+    return records
+
+
+def test_records_are_batched_and_rotated(tmp_path):
+    sink = ResultSink(str(tmp_path), batch_size=3, max_records_per_file=4)
+    for i in range(10):
+        sink.write(make_record(i))
+    assert sink.records_written == 9
+    sink.close()
+
+    assert [os.path.basename(path) for path in sink.files] == [
+        "test_results.part00000.jsonl", "test_results.part00001.jsonl", "test_results.part00002.jsonl"]
+    assert [record["test_case_id"] for record in read_jsonl(sink.files)] == list(range(10))
+    with pytest.raises(ValueError):
+        sink.write(make_record(10))
+
+
+def test_csv_continues_in_a_new_part_for_new_columns(tmp_path):
+    with ResultSink(str(tmp_path), file_format="csv", batch_size=1) as sink:
+        sink.write(make_record(1))
+        sink.write(make_record(2, "Failed", error="mismatch", duration_ms=12))
+
+    with open(sink.files[1], encoding="utf-8", newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert len(sink.files) == 2
+    assert rows == [{"test_case_id": "2", "status": "Failed", "response_data": '{"id": 2}', "error": "mismatch",
+                     "duration_ms": "12"}]
+
+
+def test_resume_is_opt_in(tmp_path):
+    with ResultSink(str(tmp_path)) as sink:
+        sink.write_many([make_record(1), make_record(2)])
+
+    with pytest.raises(FileExistsError):
+        ResultSink(str(tmp_path))
+    # Another run_name in the same directory is a fresh run
+    ResultSink(str(tmp_path), run_name="other_run").close()
+
+    with ResultSink(str(tmp_path), resume=True) as resumed:
+        assert resumed.is_recorded(1) and resumed.is_recorded("2")
+        assert not resumed.is_recorded(3)
+        resumed.write(make_record(3))
+    assert os.path.basename(resumed.files[0]) == "test_results.part00001.jsonl"
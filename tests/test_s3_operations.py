@@ -0,0 +1,84 @@
+import os
+import sys
+
+import boto3
+import pytest
+from botocore.exceptions import ClientError
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common_functions.aws_service.aws_common_function import s3_operations_manager
+
+moto = pytest.importorskip("moto")
+
+BUCKET = "test-bucket"
+
+
+@pytest.fixture
+def s3_client(monkeypatch):
+    for name in ("AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY"):
+        monkeypatch.setenv(name, "testing")
+    with moto.mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+
+def put_files(s3_client, keys, body=b"data"):
+    for key in keys:
+        s3_client.put_object(Bucket=BUCKET, Key=key, Body=body)
+
+
+def test_listing_follows_continuation_tokens(s3_client):
+    keys = [f"results/part{i:04d}.json" for i in range(1005)]
+    put_files(s3_client, keys)
+
+    assert s3_operations_manager.list_files(s3_client, BUCKET, "results/") == keys
+    assert list(s3_operations_manager.iter_files(s3_client, BUCKET, "results/", page_size=100)) == keys
+
+
+def test_fan_out_lists_every_sub_prefix(s3_client):
+    keys = ["runs/top.json"] + [f"runs/run{run}/part{i}.json" for run in range(3) for i in range(4)]
+    put_files(s3_client, keys)
+
+    assert sorted(s3_operations_manager.list_files(s3_client, BUCKET, "runs/", fan_out=True)) == sorted(keys)
+    assert s3_operations_manager.list_files(s3_client, BUCKET, "runs/", delimiter="/") == ["runs/top.json"]
+
+
+def test_listing_errors_are_raised_on_request(s3_client):
+    assert s3_operations_manager.list_files(s3_client, "missing-bucket") == []
+    with pytest.raises(ClientError):
+        s3_operations_manager.list_files(s3_client, "missing-bucket", raise_errors=True)
+    with pytest.raises(ClientError):
+        s3_operations_manager.list_files(s3_client, "missing-bucket", fan_out=True, raise_errors=True)
+
+
+def test_download_prefix_keeps_the_layout_and_stays_in_local_dir(s3_client, tmp_path):
+    put_files(s3_client, ["results/run1/a.json", "results/run1/sub/b.json", "results/run1_extra/c.json",
+                          "results/run1/../../escape.json"])
+
+    summary = s3_operations_manager.download_prefix(s3_client, BUCKET, "results/run1", str(tmp_path / "out"))
+
+    downloaded = sorted(os.path.relpath(os.path.join(root, name), tmp_path / "out")
+                        for root, _, names in os.walk(tmp_path / "out") for name in names)
+    assert downloaded == ["a.json", os.path.join("sub", "b.json")]
+    assert [s3_key for s3_key, _ in summary["failed"]] == ["results/run1/../../escape.json"]
+    assert summary["bytes"] == 8
+    assert not (tmp_path / "escape.json").exists()
+
+
+def test_bulk_transfers_report_failures(s3_client, tmp_path):
+    local_file = tmp_path / "upload.json"
+    local_file.write_bytes(b"0123456789")
+
+    upload = s3_operations_manager.bulk_upload_files(
+        s3_client, [(str(local_file), "up/one.json"), (str(tmp_path / "missing.json"), "up/two.json")], BUCKET)
+    assert upload["succeeded"] == [(str(local_file), "up/one.json")]
+    assert len(upload["failed"]) == 1 and upload["bytes"] == 10
+
+    download = s3_operations_manager.bulk_download_files(
+        s3_client, BUCKET, [("up/one.json", str(tmp_path / "down" / "one.json")),
+                            ("up/missing.json", str(tmp_path / "down" / "missing.json"))])
+    assert [s3_key for s3_key, _ in download["succeeded"]] == ["up/one.json"]
+    assert [s3_key for s3_key, _ in download["failed"]] == ["up/missing.json"]
+    assert (tmp_path / "down" / "one.json").read_bytes() == b"0123456789"
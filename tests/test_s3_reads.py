@@ -0,0 +1,53 @@
+import os
+import sys
+
+import boto3
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common_functions.aws_service.aws_common_function import s3_operations_manager
+
+moto = pytest.importorskip("moto")
+
+BUCKET = "test-bucket"
+CSV_BODY = b"id,status\r\n1,done\n2,failed\n"
+
+
+@pytest.fixture
+def s3_client(monkeypatch):
+    for name in ("AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY"):
+        monkeypatch.setenv(name, "testing")
+    with moto.mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        client.put_object(Bucket=BUCKET, Key="results.csv", Body=CSV_BODY)
+        yield client
+
+
+def test_read_file_range(s3_client):
+    assert s3_operations_manager.read_file_range(s3_client, BUCKET, "results.csv", 0, 1) == b"id"
+    assert s3_operations_manager.read_file_range(s3_client, BUCKET, "results.csv", 18) == b"2,failed\n"
+    assert s3_operations_manager.read_file_range(s3_client, BUCKET, "missing.csv", 0, 1) is None
+
+
+def test_read_file_header_line_probes_until_the_newline(s3_client):
+    assert s3_operations_manager.read_file_header_line(s3_client, BUCKET, "results.csv") == "id,status"
+    assert s3_operations_manager.read_file_header_line(s3_client, BUCKET, "results.csv", probe_size=3) == "id,status"
+
+    s3_client.put_object(Bucket=BUCKET, Key="one_line.csv", Body=b"a,b,c")
+    s3_client.put_object(Bucket=BUCKET, Key="empty.csv", Body=b"")
+    assert s3_operations_manager.read_file_header_line(s3_client, BUCKET, "one_line.csv", probe_size=2) == "a,b,c"
+    assert s3_operations_manager.read_file_header_line(s3_client, BUCKET, "empty.csv") == ""
+    assert s3_operations_manager.read_file_header_line(s3_client, BUCKET, "missing.csv") is None
+
+
+def test_streamed_reads_match_the_file(s3_client):
+    lines = list(s3_operations_manager.iter_file_lines(s3_client, BUCKET, "results.csv", chunk_size=4))
+    chunks = list(s3_operations_manager.iter_file_chunks(s3_client, BUCKET, "results.csv", chunk_size=4))
+
+    assert [line.rstrip("\r") for line in lines] == ["id,status", "1,done", "2,failed"]
+    assert b"".join(chunks) == CSV_BODY and max(len(chunk) for chunk in chunks) == 4
+    assert bytes(s3_operations_manager.read_file_into_buffer(s3_client, BUCKET, "results.csv",
+                                                             bytearray(64), chunk_size=5)) == CSV_BODY
+    assert list(s3_operations_manager.iter_file_lines(s3_client, BUCKET, "missing.csv")) == []
@@ -0,0 +1,56 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common_functions.file_functions.tc_cache import get_code_version, get_tc_cache_file, load_tc_cache, save_tc_cache
+
+TC_COLUMNS = ["test_case_id", "api_name"]
+
+
+def cache_file_for(workbook, cache_dir, tc_columns=TC_COLUMNS, builder_version="b1"):
+    return get_tc_cache_file(str(workbook), tc_columns, "tc_sheet", str(cache_dir), builder_version)
+
+
+def test_cache_key_follows_content_layout_and_builder(tmp_path):
+    workbook = tmp_path / "my.workbook.xlsx"
+    workbook.write_bytes(b"v1")
+    first = cache_file_for(workbook, tmp_path / "cache")
+
+    assert cache_file_for(workbook, tmp_path / "cache") == first
+    assert cache_file_for(workbook, tmp_path / "cache", tc_columns=["test_case_id"]) != first
+    assert cache_file_for(workbook, tmp_path / "cache", builder_version="b2") != first
+    workbook.write_bytes(b"v2")
+    assert cache_file_for(workbook, tmp_path / "cache") != first
+
+
+def test_save_and_load_round_trip_and_drop_stale_entries(tmp_path):
+    workbook = tmp_path / "my.workbook.xlsx"
+    workbook.write_bytes(b"v1")
+    old_file = save_tc_cache(cache_file_for(workbook, tmp_path / "cache"), {"tc_data": [1]})
+    assert load_tc_cache(old_file) == {"tc_data": [1]}
+
+    workbook.write_bytes(b"v2")
+    new_file = save_tc_cache(cache_file_for(workbook, tmp_path / "cache"), {"tc_data": [2]})
+
+    assert os.listdir(tmp_path / "cache") == [os.path.basename(new_file)]
+    assert load_tc_cache(old_file) is None
+
+
+def test_unreadable_entries_are_ignored(tmp_path):
+    cache_file = tmp_path / "broken.pkl"
+    cache_file.write_bytes(b"not a pickle")
+
+    assert load_tc_cache(str(cache_file)) is None
+
+
+def test_code_version_changes_with_the_source():
+    def builder():
+        return 1
+
+    def other_builder():
+        return 2
+
+    assert get_code_version(builder) == get_code_version(builder)
+    assert get_code_version(builder) != get_code_version(other_builder)
+    assert get_code_version(builder) != get_code_version(builder, extra=("pandas 3",))